@@ -0,0 +1,284 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "affordance-file.hh"
+
+#include <coal/BVH/BVH_model.h>
+#include <coal/collision_object.h>
+#include <fcntl.h>
+#include <stdint.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <cstdio>
+#include <cstring>
+#include <fstream>
+#include <sstream>
+#include <stdexcept>
+
+#include "hpp/affordance/affordance-extraction.hh"
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+const char magic[8] = {'H', 'P', 'P', 'A', 'F', 'F', '\0', '\n'};
+const uint32_t version = 2;
+
+void writeUInt(std::ostream& os, uint32_t value) {
+  char bytes[4];
+  for (std::size_t i = 0; i < 4; ++i) bytes[i] = (char)(value >> (8 * i));
+  os.write(bytes, 4);
+}
+
+void writeUInt64(std::ostream& os, uint64_t value) {
+  char bytes[8];
+  for (std::size_t i = 0; i < 8; ++i) bytes[i] = (char)(value >> (8 * i));
+  os.write(bytes, 8);
+}
+
+void writeDouble(std::ostream& os, double value) {
+  uint64_t bits;
+  std::memcpy(&bits, &value, sizeof(bits));
+  char bytes[8];
+  for (std::size_t i = 0; i < 8; ++i) bytes[i] = (char)(bits >> (8 * i));
+  os.write(bytes, 8);
+}
+
+void writeString(std::ostream& os, const std::string& value) {
+  writeUInt(os, (uint32_t)value.size());
+  os.write(value.data(), value.size());
+}
+
+void writeObject(std::ostream& os, const coal::CollisionObject& object) {
+  affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(&object);
+  const coal::Matrix3f& R = object.getRotation();
+  const coal::Vec3f& t = object.getTranslation();
+  for (int i = 0; i < 3; ++i) {
+    for (int j = 0; j < 3; ++j) writeDouble(os, R(i, j));
+  }
+  for (int i = 0; i < 3; ++i) writeDouble(os, t[i]);
+  writeUInt(os, (uint32_t)model->num_vertices);
+  writeUInt(os, (uint32_t)model->num_tris);
+  for (unsigned int vIdx = 0; vIdx < model->num_vertices; ++vIdx) {
+    const coal::Vec3f& v = (*model->vertices)[vIdx];
+    for (int i = 0; i < 3; ++i) writeDouble(os, v[i]);
+  }
+  for (unsigned int triIdx = 0; triIdx < model->num_tris; ++triIdx) {
+    const coal::Triangle& tri = (*model->tri_indices)[triIdx];
+    for (int i = 0; i < 3; ++i) writeUInt(os, (uint32_t)tri[i]);
+  }
+}
+
+/// Bound-checked sequential reader of a buffer.
+class Reader {
+ public:
+  Reader(const char* data, std::size_t size)
+      : data_(data), size_(size), pos_(0) {}
+
+  const char* read(std::size_t size) {
+    if (size > size_ - pos_) {
+      throw std::runtime_error("Truncated affordance file.");
+    }
+    const char* res = data_ + pos_;
+    pos_ += size;
+    return res;
+  }
+
+  uint32_t readUInt() {
+    const unsigned char* bytes = (const unsigned char*)read(4);
+    uint32_t value = 0;
+    for (std::size_t i = 0; i < 4; ++i) value |= (uint32_t)bytes[i] << (8 * i);
+    return value;
+  }
+
+  uint64_t readUInt64() {
+    const unsigned char* bytes = (const unsigned char*)read(8);
+    uint64_t value = 0;
+    for (std::size_t i = 0; i < 8; ++i) value |= (uint64_t)bytes[i] << (8 * i);
+    return value;
+  }
+
+  double readDouble() {
+    uint64_t bits = readUInt64();
+    double value;
+    std::memcpy(&value, &bits, sizeof(value));
+    return value;
+  }
+
+  std::string readString() {
+    uint32_t size = readUInt();
+    return std::string(read(size), size);
+  }
+
+  std::size_t remaining() const { return size_ - pos_; }
+
+ private:
+  const char* data_;
+  std::size_t size_;
+  std::size_t pos_;
+};  // class Reader
+
+affordance::CollisionObjectPtr_t readObject(Reader& reader) {
+  coal::Matrix3f R;
+  coal::Vec3f t;
+  for (int i = 0; i < 3; ++i) {
+    for (int j = 0; j < 3; ++j) R(i, j) = reader.readDouble();
+  }
+  for (int i = 0; i < 3; ++i) t[i] = reader.readDouble();
+  uint32_t nbVertices = reader.readUInt();
+  uint32_t nbTris = reader.readUInt();
+  // check sizes before allocating
+  if ((std::size_t)nbVertices * 24 + (std::size_t)nbTris * 12 >
+      reader.remaining()) {
+    throw std::runtime_error("Truncated affordance file.");
+  }
+  std::vector<coal::Vec3f> vertices(nbVertices);
+  for (uint32_t vIdx = 0; vIdx < nbVertices; ++vIdx) {
+    for (int i = 0; i < 3; ++i) vertices[vIdx][i] = reader.readDouble();
+  }
+  std::vector<coal::Triangle> triangles(nbTris);
+  for (uint32_t triIdx = 0; triIdx < nbTris; ++triIdx) {
+    uint32_t idx[3];
+    for (int i = 0; i < 3; ++i) {
+      idx[i] = reader.readUInt();
+      if (idx[i] >= nbVertices) {
+        throw std::runtime_error("Invalid triangle in affordance file.");
+      }
+    }
+    triangles[triIdx].set(idx[0], idx[1], idx[2]);
+  }
+  affordance::BVHModelOB_Ptr_t model(new affordance::BVHModelOB());
+  model->beginModel(nbTris, nbVertices);
+  model->addSubModel(vertices, triangles);
+  model->endModel();
+  return affordance::CollisionObjectPtr_t(
+      new coal::CollisionObject(model, coal::Transform3s(R, t)));
+}
+}  // namespace
+
+void writeAffordanceRecords(std::ostream& os,
+                            const AffordanceRecords_t& records) {
+  os.write(magic, sizeof(magic));
+  writeUInt(os, version);
+  writeUInt(os, (uint32_t)records.size());
+  for (std::size_t recIdx = 0; recIdx < records.size(); ++recIdx) {
+    const AffordanceRecord& record = records[recIdx];
+    if (record.types.size() != record.objects.size()) {
+      throw std::invalid_argument(
+          "Affordance record should have one type per list of objects.");
+    }
+    writeString(os, record.obstacleName);
+    writeUInt64(os, record.geometry);
+    writeUInt64(os, record.fingerprint);
+    writeUInt(os, (uint32_t)record.reduceSizes.size());
+    for (std::size_t idx = 0; idx < record.reduceSizes.size(); ++idx) {
+      writeDouble(os, record.reduceSizes[idx]);
+    }
+    writeUInt(os, (uint32_t)record.types.size());
+    for (std::size_t opIdx = 0; opIdx < record.types.size(); ++opIdx) {
+      writeString(os, record.types[opIdx]);
+      writeUInt(os, (uint32_t)record.objects[opIdx].size());
+      for (std::size_t objIdx = 0; objIdx < record.objects[opIdx].size();
+           ++objIdx) {
+        writeObject(os, *record.objects[opIdx][objIdx]);
+      }
+    }
+  }
+}
+
+void readAffordanceRecords(const char* data, std::size_t size,
+                           AffordanceRecords_t& records) {
+  Reader reader(data, size);
+  if (std::memcmp(reader.read(sizeof(magic)), magic, sizeof(magic)) != 0) {
+    throw std::runtime_error("Not an affordance file.");
+  }
+  if (reader.readUInt() != version) {
+    throw std::runtime_error("Unsupported affordance file version.");
+  }
+  uint32_t nbRecords = reader.readUInt();
+  records.clear();
+  for (uint32_t recIdx = 0; recIdx < nbRecords; ++recIdx) {
+    AffordanceRecord record;
+    record.obstacleName = reader.readString();
+    record.geometry = reader.readUInt64();
+    record.fingerprint = reader.readUInt64();
+    uint32_t nbReduceSizes = reader.readUInt();
+    if ((std::size_t)nbReduceSizes * 8 > reader.remaining()) {
+      throw std::runtime_error("Truncated affordance file.");
+    }
+    for (uint32_t idx = 0; idx < nbReduceSizes; ++idx) {
+      record.reduceSizes.push_back(reader.readDouble());
+    }
+    uint32_t nbTypes = reader.readUInt();
+    for (uint32_t opIdx = 0; opIdx < nbTypes; ++opIdx) {
+      record.types.push_back(reader.readString());
+      uint32_t nbObjects = reader.readUInt();
+      affordance::CollisionObjects_t objects;
+      for (uint32_t objIdx = 0; objIdx < nbObjects; ++objIdx) {
+        objects.push_back(readObject(reader));
+      }
+      record.objects.push_back(objects);
+    }
+    records.push_back(record);
+  }
+}
+
+void saveAffordanceFile(const std::string& filename,
+                        const AffordanceRecords_t& records) {
+  std::ostringstream tmpName;
+  tmpName << filename << ".tmp" << getpid();
+  {
+    std::ofstream os(tmpName.str().c_str(),
+                     std::ios_base::out | std::ios_base::binary);
+    if (!os) {
+      throw std::runtime_error("Unable to write affordance file " +
+                               tmpName.str());
+    }
+    writeAffordanceRecords(os, records);
+    if (!os) {
+      std::remove(tmpName.str().c_str());
+      throw std::runtime_error("Unable to write affordance file " +
+                               tmpName.str());
+    }
+  }
+  if (std::rename(tmpName.str().c_str(), filename.c_str()) != 0) {
+    std::remove(tmpName.str().c_str());
+    throw std::runtime_error("Unable to write affordance file " + filename);
+  }
+}
+
+void loadAffordanceFile(const std::string& filename,
+                        AffordanceRecords_t& records) {
+  int fd = open(filename.c_str(), O_RDONLY);
+  if (fd < 0) {
+    throw std::runtime_error("Unable to open affordance file " + filename);
+  }
+  struct stat st;
+  if (fstat(fd, &st) != 0 || st.st_size == 0) {
+    close(fd);
+    throw std::runtime_error("Unable to read affordance file " + filename);
+  }
+  std::size_t size = (std::size_t)st.st_size;
+  void* data = mmap(NULL, size, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);
+  if (data == MAP_FAILED) {
+    throw std::runtime_error("Unable to map affordance file " + filename);
+  }
+  try {
+    readAffordanceRecords(static_cast<const char*>(data), size, records);
+  } catch (const std::exception& exc) {
+    munmap(data, size);
+    throw std::runtime_error(filename + ": " + exc.what());
+  }
+  munmap(data, size);
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
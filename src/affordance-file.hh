@@ -0,0 +1,78 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_AFFORDANCE_FILE_HH
+#define HPP_AFFORDANCE_CORBA_AFFORDANCE_FILE_HH
+
+#include <stdint.h>
+
+#include <hpp/affordance/fwd.hh>
+#include <iosfwd>
+#include <string>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Affordance objects found for one obstacle.
+struct AffordanceRecord {
+  /// Name of the analysed obstacle.
+  std::string obstacleName;
+  /// Hash of the geometry and global pose of the obstacle, see
+  /// geometryFingerprint, 0 if unknown.
+  uint64_t geometry = 0;
+  /// Fingerprint of the analysis, see fingerprint, 0 if unknown.
+  uint64_t fingerprint = 0;
+  /// Reduce size of each operation.
+  std::vector<double> reduceSizes;
+  /// Affordance type of each operation, in the order of the analysis.
+  std::vector<std::string> types;
+  /// Affordance objects found for each operation.
+  std::vector<affordance::CollisionObjects_t> objects;
+};  // struct AffordanceRecord
+
+typedef std::vector<AffordanceRecord> AffordanceRecords_t;
+
+/// Write affordance records in the compact binary affordance format.
+///
+/// The file starts with a header (magic string, format version and number
+/// of records). Each record stores the obstacle name, the hash of its
+/// geometry and pose, the fingerprint and reduce sizes of the analysis, then
+/// for each affordance type its name and its objects. An object is stored as
+/// its transform (row-major rotation and translation), followed by the
+/// vertices and triangle indices of its mesh. Values are stored in
+/// little-endian byte order, as 64 bit floats and 32 or 64 bit unsigned
+/// integers.
+void writeAffordanceRecords(std::ostream& os,
+                            const AffordanceRecords_t& records);
+
+/// Read affordance records from a buffer in the binary affordance format.
+///
+/// \throw std::runtime_error if the buffer is not a valid affordance file.
+void readAffordanceRecords(const char* data, std::size_t size,
+                           AffordanceRecords_t& records);
+
+/// Write affordance records to a file.
+///
+/// The records are first written to a temporary file which is then renamed,
+/// so that readers never see a partially written file.
+/// \throw std::runtime_error if the file cannot be written.
+void saveAffordanceFile(const std::string& filename,
+                        const AffordanceRecords_t& records);
+
+/// Read affordance records from a memory-mapped file.
+///
+/// \throw std::runtime_error if the file cannot be read or is not a valid
+///        affordance file.
+void loadAffordanceFile(const std::string& filename,
+                        AffordanceRecords_t& records);
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_AFFORDANCE_FILE_HH
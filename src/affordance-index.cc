@@ -0,0 +1,281 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "affordance-index.hh"
+
+#include <coal/BVH/BVH_model.h>
+
+#include <algorithm>
+#include <cmath>
+
+#include "hpp/affordance/affordance-extraction.hh"
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+// maximal number of boxes in a leaf of a BoxTree
+const std::size_t leafSize = 4;
+
+// squared distance between a point and a box
+double squaredDistance(const coal::Vec3f& p, const coal::AABB& box) {
+  double res = 0;
+  for (int i = 0; i < 3; ++i) {
+    double d = std::max(std::max(box.min_[i] - p[i], p[i] - box.max_[i]), 0.);
+    res += d * d;
+  }
+  return res;
+}
+
+// point of triangle (a, b, c) closest to p, from Ericson, Real-Time Collision
+// Detection, 5.1.5.
+coal::Vec3f closestPointOnTriangle(const coal::Vec3f& p, const coal::Vec3f& a,
+                                   const coal::Vec3f& b, const coal::Vec3f& c) {
+  coal::Vec3f ab(b - a), ac(c - a), ap(p - a);
+  double d1 = ab.dot(ap), d2 = ac.dot(ap);
+  if (d1 <= 0 && d2 <= 0) return a;
+  coal::Vec3f bp(p - b);
+  double d3 = ab.dot(bp), d4 = ac.dot(bp);
+  if (d3 >= 0 && d4 <= d3) return b;
+  double vc = d1 * d4 - d3 * d2;
+  if (vc <= 0 && d1 >= 0 && d3 <= 0) return a + d1 / (d1 - d3) * ab;
+  coal::Vec3f cp(p - c);
+  double d5 = ab.dot(cp), d6 = ac.dot(cp);
+  if (d6 >= 0 && d5 <= d6) return c;
+  double vb = d5 * d2 - d1 * d6;
+  if (vb <= 0 && d2 >= 0 && d6 <= 0) return a + d2 / (d2 - d6) * ac;
+  double va = d3 * d6 - d5 * d4;
+  if (va <= 0 && (d4 - d3) >= 0 && (d5 - d6) >= 0) {
+    return b + (d4 - d3) / ((d4 - d3) + (d5 - d6)) * (c - b);
+  }
+  double denom = 1 / (va + vb + vc);
+  return a + ab * (vb * denom) + ac * (vc * denom);
+}
+
+// whether the projections of triangle (v0, v1, v2) and of a box centered at
+// the origin with half extents h on axis are disjoint.
+bool separates(const coal::Vec3f& axis, const coal::Vec3f& v0,
+               const coal::Vec3f& v1, const coal::Vec3f& v2,
+               const coal::Vec3f& h) {
+  double p0 = axis.dot(v0), p1 = axis.dot(v1), p2 = axis.dot(v2);
+  double r = h.dot(axis.cwiseAbs());
+  return std::min(std::min(p0, p1), p2) > r ||
+         std::max(std::max(p0, p1), p2) < -r;
+}
+
+// whether triangle (a, b, c) overlaps box, using the separating axis test
+// of Akenine-Moller.
+bool overlaps(const coal::AABB& box, const coal::Vec3f& a, const coal::Vec3f& b,
+              const coal::Vec3f& c) {
+  if (!box.overlap(coal::AABB(a, b, c))) return false;
+  const coal::Vec3f center(box.center());
+  const coal::Vec3f h((box.max_ - box.min_) * 0.5);
+  const coal::Vec3f v0(a - center), v1(b - center), v2(c - center);
+  const coal::Vec3f edges[3] = {v1 - v0, v2 - v1, v0 - v2};
+  if (separates(edges[0].cross(edges[1]), v0, v1, v2, h)) return false;
+  for (int i = 0; i < 3; ++i) {
+    for (int j = 0; j < 3; ++j) {
+      coal::Vec3f axis(coal::Vec3f::Zero());
+      axis[i] = 1;
+      if (separates(axis.cross(edges[j]), v0, v1, v2, h)) return false;
+    }
+  }
+  return true;
+}
+}  // namespace
+
+void BoxTree::build(const std::vector<coal::AABB>& boxes) {
+  nodes_.clear();
+  boxes_ = boxes;
+  indices_.resize(boxes.size());
+  for (std::size_t idx = 0; idx < boxes.size(); ++idx) indices_[idx] = idx;
+  if (!boxes.empty()) build(0, boxes.size());
+}
+
+std::size_t BoxTree::build(std::size_t first, std::size_t last) {
+  std::size_t nodeIdx = nodes_.size();
+  nodes_.push_back(Node());
+  coal::AABB box(boxes_[indices_[first]]);
+  coal::AABB centers(box.center());
+  for (std::size_t idx = first + 1; idx < last; ++idx) {
+    box += boxes_[indices_[idx]];
+    centers += boxes_[indices_[idx]].center();
+  }
+  nodes_[nodeIdx].box = box;
+  if (last - first <= leafSize) {
+    nodes_[nodeIdx].first = (uint32_t)first;
+    nodes_[nodeIdx].count = (uint32_t)(last - first);
+    nodes_[nodeIdx].right = 0;
+    return nodeIdx;
+  }
+  // split at the median of the box centers along the longest axis
+  int axis;
+  (centers.max_ - centers.min_).maxCoeff(&axis);
+  std::size_t middle = (first + last) / 2;
+  std::nth_element(indices_.begin() + first, indices_.begin() + middle,
+                   indices_.begin() + last,
+                   [this, axis](std::size_t i, std::size_t j) {
+                     return boxes_[i].center()[axis] < boxes_[j].center()[axis];
+                   });
+  build(first, middle);
+  std::size_t right = build(middle, last);
+  nodes_[nodeIdx].first = 0;
+  nodes_[nodeIdx].count = 0;
+  nodes_[nodeIdx].right = (uint32_t)right;
+  return nodeIdx;
+}
+
+void AffordanceIndex::insert(const std::string& type, const std::string& name,
+                             const coal::CollisionObject& object) {
+  affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(&object);
+  const coal::Matrix3f& R = object.getRotation();
+  const coal::Vec3f& t = object.getTranslation();
+  Objects& objects = types_[type];
+  Object& entry = objects.byName[name];
+  entry.name = name;
+  entry.box = coal::AABB();
+  entry.vertices.resize(3 * model->num_tris);
+  std::vector<coal::AABB> boxes(model->num_tris);
+  for (unsigned int triIdx = 0; triIdx < model->num_tris; ++triIdx) {
+    const coal::Triangle& tri = (*model->tri_indices)[triIdx];
+    for (unsigned int vertIdx = 0; vertIdx < 3; ++vertIdx) {
+      entry.vertices[3 * triIdx + vertIdx] =
+          R * (*model->vertices)[tri[vertIdx]] + t;
+    }
+    boxes[triIdx] =
+        coal::AABB(entry.vertices[3 * triIdx], entry.vertices[3 * triIdx + 1],
+                   entry.vertices[3 * triIdx + 2]);
+    entry.box += boxes[triIdx];
+  }
+  entry.triangles.build(boxes);
+  objects.dirty = true;
+}
+
+void AffordanceIndex::remove(const std::string& type, const std::string& name) {
+  std::map<std::string, Objects>::iterator it = types_.find(type);
+  if (it == types_.end()) return;
+  if (it->second.byName.erase(name) > 0) it->second.dirty = true;
+}
+
+void AffordanceIndex::removeType(const std::string& type) {
+  types_.erase(type);
+}
+
+void AffordanceIndex::clear() { types_.clear(); }
+
+const AffordanceIndex::Objects* AffordanceIndex::objects(
+    const std::string& type) {
+  std::map<std::string, Objects>::iterator it = types_.find(type);
+  if (it == types_.end()) return NULL;
+  Objects& objects = it->second;
+  if (objects.dirty) {
+    objects.ordered.clear();
+    std::vector<coal::AABB> boxes;
+    for (std::map<std::string, Object>::const_iterator obj =
+             objects.byName.begin();
+         obj != objects.byName.end(); ++obj) {
+      // objects without triangles cannot match a query
+      if (obj->second.vertices.empty()) continue;
+      objects.ordered.push_back(&obj->second);
+      boxes.push_back(obj->second.box);
+    }
+    objects.tree.build(boxes);
+    objects.dirty = false;
+  }
+  return &objects;
+}
+
+void AffordanceIndex::queryBox(const std::string& type, const coal::AABB& box,
+                               Matches_t& matches) {
+  matches.clear();
+  const Objects* objs = objects(type);
+  if (objs == NULL) return;
+  const auto overlapsBox = [&box](const coal::AABB& other) {
+    return box.overlap(other);
+  };
+  objs->tree.traverse(overlapsBox, [&](std::size_t objIdx) {
+    const Object& object = *objs->ordered[objIdx];
+    Match match;
+    object.triangles.traverse(overlapsBox, [&](std::size_t triIdx) {
+      const coal::Vec3f* v = &object.vertices[3 * triIdx];
+      if (overlaps(box, v[0], v[1], v[2])) {
+        match.vertices.insert(match.vertices.end(), v, v + 3);
+      }
+    });
+    if (!match.vertices.empty()) {
+      match.name = object.name;
+      matches.push_back(match);
+    }
+  });
+}
+
+void AffordanceIndex::querySphere(const std::string& type,
+                                  const coal::Vec3f& center, double radius,
+                                  Matches_t& matches) {
+  matches.clear();
+  const Objects* objs = objects(type);
+  if (objs == NULL || radius < 0) return;
+  const double sqrRadius = radius * radius;
+  const auto overlapsSphere = [&](const coal::AABB& other) {
+    return squaredDistance(center, other) <= sqrRadius;
+  };
+  objs->tree.traverse(overlapsSphere, [&](std::size_t objIdx) {
+    const Object& object = *objs->ordered[objIdx];
+    Match match;
+    object.triangles.traverse(overlapsSphere, [&](std::size_t triIdx) {
+      const coal::Vec3f* v = &object.vertices[3 * triIdx];
+      if ((closestPointOnTriangle(center, v[0], v[1], v[2]) - center)
+              .squaredNorm() <= sqrRadius) {
+        match.vertices.insert(match.vertices.end(), v, v + 3);
+      }
+    });
+    if (!match.vertices.empty()) {
+      match.name = object.name;
+      matches.push_back(match);
+    }
+  });
+}
+
+void AffordanceIndex::nearest(const std::string& type,
+                              const std::vector<coal::Vec3f>& points,
+                              double maxDistance,
+                              std::vector<Nearest>& results) {
+  results.resize(points.size());
+  const Objects* objs = objects(type);
+  for (std::size_t idx = 0; idx < points.size(); ++idx) {
+    const coal::Vec3f& p = points[idx];
+    Nearest& res = results[idx];
+    res.name = NULL;
+    res.distance = std::numeric_limits<double>::infinity();
+    if (objs == NULL) continue;
+    // squared distances are compared to avoid square roots
+    double bound = maxDistance * maxDistance;
+    const auto boxDistance = [&p](const coal::AABB& box) {
+      return squaredDistance(p, box);
+    };
+    objs->tree.traverseClosest(boxDistance, bound, [&](std::size_t objIdx) {
+      const Object& object = *objs->ordered[objIdx];
+      object.triangles.traverseClosest(
+          boxDistance, bound, [&](std::size_t triIdx) {
+            const coal::Vec3f* v = &object.vertices[3 * triIdx];
+            coal::Vec3f closest(closestPointOnTriangle(p, v[0], v[1], v[2]));
+            double sqrDistance = (closest - p).squaredNorm();
+            if (sqrDistance <= bound) {
+              bound = sqrDistance;
+              res.name = &object.name;
+              res.point = closest;
+              res.normal = (v[1] - v[0]).cross(v[2] - v[0]).normalized();
+            }
+          });
+    });
+    if (res.name != NULL) res.distance = (res.point - p).norm();
+  }
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,210 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_AFFORDANCE_INDEX_HH
+#define HPP_AFFORDANCE_CORBA_AFFORDANCE_INDEX_HH
+
+#include <coal/BV/AABB.h>
+#include <coal/collision_object.h>
+#include <stdint.h>
+
+#include <functional>
+#include <limits>
+#include <map>
+#include <queue>
+#include <string>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Bounding volume hierarchy of axis-aligned boxes.
+class BoxTree {
+ public:
+  /// Build the hierarchy of boxes.
+  ///
+  /// The boxes are identified by their index in boxes.
+  void build(const std::vector<coal::AABB>& boxes);
+
+  bool empty() const { return nodes_.empty(); }
+
+  /// Call visit(idx) for the index of each box that overlaps a region.
+  ///
+  /// \param overlaps returns whether a box overlaps the region. Boxes and
+  ///        hierarchy nodes the box of which does not overlap the region are
+  ///        skipped.
+  template <typename Overlaps, typename Visit>
+  void traverse(const Overlaps& overlaps, const Visit& visit) const {
+    if (nodes_.empty()) return;
+    std::vector<std::size_t> stack(1, 0);
+    while (!stack.empty()) {
+      std::size_t nodeIdx = stack.back();
+      stack.pop_back();
+      const Node& node = nodes_[nodeIdx];
+      if (!overlaps(node.box)) continue;
+      if (node.count > 0) {
+        for (std::size_t idx = node.first; idx < node.first + node.count;
+             ++idx) {
+          if (overlaps(boxes_[indices_[idx]])) visit(indices_[idx]);
+        }
+      } else {
+        stack.push_back(node.right);
+        stack.push_back(nodeIdx + 1);
+      }
+    }
+  }
+
+  /// Call visit(idx) for the indices of boxes by increasing distance.
+  ///
+  /// Boxes and hierarchy nodes at a distance greater than bound are
+  /// skipped. visit may decrease bound to prune the remaining boxes.
+  /// \param distance returns a lower bound of the distance to the content
+  ///        of a box.
+  template <typename Distance, typename Visit>
+  void traverseClosest(const Distance& distance, double& bound,
+                       const Visit& visit) const {
+    if (nodes_.empty()) return;
+    typedef std::pair<double, std::size_t> Item_t;
+    std::priority_queue<Item_t, std::vector<Item_t>, std::greater<Item_t> >
+        queue;
+    queue.push(Item_t(distance(nodes_[0].box), 0));
+    while (!queue.empty() && queue.top().first <= bound) {
+      const Node& node = nodes_[queue.top().second];
+      std::size_t nodeIdx = queue.top().second;
+      queue.pop();
+      if (node.count > 0) {
+        for (std::size_t idx = node.first; idx < node.first + node.count;
+             ++idx) {
+          if (distance(boxes_[indices_[idx]]) <= bound) visit(indices_[idx]);
+        }
+      } else {
+        queue.push(Item_t(distance(nodes_[nodeIdx + 1].box), nodeIdx + 1));
+        queue.push(Item_t(distance(nodes_[node.right].box), node.right));
+      }
+    }
+  }
+
+ private:
+  struct Node {
+    coal::AABB box;
+    /// first box of a leaf in indices_.
+    uint32_t first;
+    /// number of boxes of a leaf, 0 for an inner node.
+    uint32_t count;
+    /// index of the right child of an inner node, the left child following
+    /// its parent.
+    uint32_t right;
+  };  // struct Node
+
+  std::size_t build(std::size_t first, std::size_t last);
+
+  std::vector<Node> nodes_;
+  std::vector<coal::AABB> boxes_;
+  std::vector<std::size_t> indices_;
+};  // class BoxTree
+
+/// Spatial index of the triangles of affordance objects.
+///
+/// Affordance objects are indexed per affordance type. Each object stores
+/// its triangles in the world frame with a hierarchy of their bounding
+/// boxes, and the objects of each type are organised in a hierarchy of
+/// their bounding boxes, which is rebuilt at the first query following a
+/// modification.
+class AffordanceIndex {
+ public:
+  /// Triangles of an affordance object found by a query.
+  struct Match {
+    /// name of the affordance object.
+    std::string name;
+    /// vertices of the triangles in the world frame, three per triangle.
+    std::vector<coal::Vec3f> vertices;
+  };  // struct Match
+
+  typedef std::vector<Match> Matches_t;
+
+  /// Point of the affordance objects closest to a query point.
+  struct Nearest {
+    /// name of the affordance object the point belongs to, NULL if no point
+    /// was found. Valid until the index is modified.
+    const std::string* name;
+    coal::Vec3f point;
+    /// unit normal of the triangle the point belongs to.
+    coal::Vec3f normal;
+    double distance;
+  };  // struct Nearest
+
+  /// Add an affordance object, replacing any object of the same name.
+  void insert(const std::string& type, const std::string& name,
+              const coal::CollisionObject& object);
+
+  /// Remove an affordance object, if indexed.
+  void remove(const std::string& type, const std::string& name);
+
+  /// Remove all affordance objects of a type.
+  void removeType(const std::string& type);
+
+  /// Remove all affordance objects.
+  void clear();
+
+  /// Find the triangles of the objects of a type that overlap a box.
+  ///
+  /// \param type affordance type of the objects,
+  /// \param box axis-aligned box in the world frame,
+  /// \retval matches triangles found for each object with at least one
+  ///         triangle overlapping the box.
+  void queryBox(const std::string& type, const coal::AABB& box,
+                Matches_t& matches);
+
+  /// Find the triangles of the objects of a type that overlap a sphere.
+  ///
+  /// \param type affordance type of the objects,
+  /// \param center center of the sphere in the world frame,
+  /// \param radius radius of the sphere,
+  /// \retval matches triangles found for each object with at least one
+  ///         triangle overlapping the sphere.
+  void querySphere(const std::string& type, const coal::Vec3f& center,
+                   double radius, Matches_t& matches);
+
+  /// Find the points of the objects of a type closest to query points.
+  ///
+  /// \param type affordance type of the objects,
+  /// \param points query points in the world frame,
+  /// \param maxDistance points further than maxDistance from the query
+  ///        points are ignored, may be infinite,
+  /// \retval results closest point to each query point.
+  void nearest(const std::string& type, const std::vector<coal::Vec3f>& points,
+               double maxDistance, std::vector<Nearest>& results);
+
+ private:
+  struct Object {
+    std::string name;
+    coal::AABB box;
+    std::vector<coal::Vec3f> vertices;
+    BoxTree triangles;
+  };  // struct Object
+
+  struct Objects {
+    Objects() : dirty(true) {}
+
+    std::map<std::string, Object> byName;
+    /// objects in the order of the hierarchy.
+    std::vector<const Object*> ordered;
+    BoxTree tree;
+    bool dirty;
+  };  // struct Objects
+
+  /// Return the objects of type, with an up to date hierarchy, or NULL.
+  const Objects* objects(const std::string& type);
+
+  std::map<std::string, Objects> types_;
+};  // class AffordanceIndex
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_AFFORDANCE_INDEX_HH
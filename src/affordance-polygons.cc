@@ -0,0 +1,213 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "affordance-polygons.hh"
+
+#include <coal/BVH/BVH_model.h>
+
+#include <algorithm>
+#include <cmath>
+#include <utility>
+
+#include "hpp/affordance/affordance-extraction.hh"
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+// squared distance under which vertices are merged, as in
+// affordance::searchLinkedTriangles.
+const double vertexMargin = 1e-15;
+// distance under which vertices are considered aligned.
+const double minTolerance = 1e-12;
+
+typedef std::pair<std::size_t, std::size_t> Edge_t;
+
+double distanceToSegment(const coal::Vec3f& p, const coal::Vec3f& a,
+                         const coal::Vec3f& b) {
+  const coal::Vec3f ab(b - a);
+  const double length = ab.squaredNorm();
+  double t = 0;
+  if (length > 0) t = std::min(std::max((p - a).dot(ab) / length, 0.), 1.);
+  return (p - (a + t * ab)).norm();
+}
+
+std::size_t findRoot(std::vector<std::size_t>& parents, std::size_t idx) {
+  while (parents[idx] != idx) {
+    parents[idx] = parents[parents[idx]];
+    idx = parents[idx];
+  }
+  return idx;
+}
+
+// give the same identifier to points closer than vertexMargin, and return
+// the identifier of each point. positions receives the position of each
+// identifier.
+std::vector<std::size_t> weld(const std::vector<coal::Vec3f>& points,
+                              std::vector<coal::Vec3f>& positions) {
+  std::vector<std::pair<double, std::size_t> > order;
+  order.reserve(points.size());
+  for (std::size_t idx = 0; idx < points.size(); ++idx) {
+    order.push_back(std::make_pair(points[idx][0], idx));
+  }
+  std::sort(order.begin(), order.end());
+  std::vector<std::size_t> parents(points.size());
+  for (std::size_t idx = 0; idx < points.size(); ++idx) parents[idx] = idx;
+  const double maxDx = std::sqrt(vertexMargin);
+  for (std::size_t i = 0; i < order.size(); ++i) {
+    const std::size_t a = order[i].second;
+    for (std::size_t j = i + 1;
+         j < order.size() && order[j].first - order[i].first < maxDx; ++j) {
+      const std::size_t b = order[j].second;
+      if ((points[a] - points[b]).squaredNorm() < vertexMargin) {
+        parents[findRoot(parents, b)] = findRoot(parents, a);
+      }
+    }
+  }
+  std::vector<std::size_t> ids(points.size());
+  std::vector<std::size_t> rootIds(points.size(), points.size());
+  positions.clear();
+  for (std::size_t idx = 0; idx < points.size(); ++idx) {
+    const std::size_t root = findRoot(parents, idx);
+    if (rootIds[root] == points.size()) {
+      rootIds[root] = positions.size();
+      positions.push_back(points[root]);
+    }
+    ids[idx] = rootIds[root];
+  }
+  return ids;
+}
+}  // namespace
+
+std::vector<coal::Vec3f> simplifyLoop(const std::vector<coal::Vec3f>& loop,
+                                      double tolerance) {
+  const std::size_t n = loop.size();
+  if (n < 3) return loop;
+  tolerance = std::max(tolerance, minTolerance);
+  // split the loop at the vertex farthest from the first one, and simplify
+  // both halves as chains with fixed ends
+  std::size_t farthest = 0;
+  double farthestDistance = -1;
+  for (std::size_t idx = 1; idx < n; ++idx) {
+    const double d = (loop[idx] - loop[0]).squaredNorm();
+    if (d > farthestDistance) {
+      farthest = idx;
+      farthestDistance = d;
+    }
+  }
+  std::vector<bool> keep(n, false);
+  keep[0] = keep[farthest] = true;
+  // chains are given by the indices of their ends, index n being vertex 0
+  std::vector<Edge_t> stack;
+  stack.push_back(Edge_t(0, farthest));
+  stack.push_back(Edge_t(farthest, n));
+  while (!stack.empty()) {
+    const Edge_t chain = stack.back();
+    stack.pop_back();
+    if (chain.second - chain.first < 2) continue;
+    const coal::Vec3f& a = loop[chain.first];
+    const coal::Vec3f& b = loop[chain.second % n];
+    std::size_t worst = chain.first;
+    double worstDistance = -1;
+    for (std::size_t idx = chain.first + 1; idx < chain.second; ++idx) {
+      const double d = distanceToSegment(loop[idx], a, b);
+      if (d > worstDistance) {
+        worst = idx;
+        worstDistance = d;
+      }
+    }
+    if (worstDistance > tolerance) {
+      keep[worst] = true;
+      stack.push_back(Edge_t(chain.first, worst));
+      stack.push_back(Edge_t(worst, chain.second));
+    }
+  }
+  std::vector<coal::Vec3f> res;
+  for (std::size_t idx = 0; idx < n; ++idx) {
+    if (keep[idx]) res.push_back(loop[idx]);
+  }
+  return res;
+}
+
+AffordancePolygons computePolygons(const coal::CollisionObject& object,
+                                   double tolerance) {
+  affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(&object);
+  const coal::Matrix3f& R = object.getRotation();
+  const coal::Vec3f& t = object.getTranslation();
+  AffordancePolygons res;
+  res.normal.setZero();
+  std::vector<coal::Vec3f> corners;
+  corners.reserve(3 * model->num_tris);
+  for (unsigned int triIdx = 0; triIdx < model->num_tris; ++triIdx) {
+    const coal::Triangle& tri = (*model->tri_indices)[triIdx];
+    for (unsigned int vertIdx = 0; vertIdx < 3; ++vertIdx) {
+      corners.push_back(R * (*model->vertices)[tri[vertIdx]] + t);
+    }
+    const std::size_t first = corners.size() - 3;
+    // twice the area times the normal of the triangle
+    res.normal += (corners[first + 1] - corners[first])
+                      .cross(corners[first + 2] - corners[first]);
+  }
+  if (res.normal.norm() > 0) res.normal.normalize();
+
+  std::vector<coal::Vec3f> positions;
+  const std::vector<std::size_t> ids = weld(corners, positions);
+  std::vector<Edge_t> edges;
+  edges.reserve(corners.size());
+  for (std::size_t first = 0; first < corners.size(); first += 3) {
+    const std::size_t a = ids[first], b = ids[first + 1], c = ids[first + 2];
+    if (a == b || b == c || c == a) continue;
+    edges.push_back(Edge_t(a, b));
+    edges.push_back(Edge_t(b, c));
+    edges.push_back(Edge_t(c, a));
+  }
+  std::sort(edges.begin(), edges.end());
+  // edges of the boundary are those that are not matched by an edge of
+  // opposite direction
+  std::vector<Edge_t> boundary;
+  for (std::size_t i = 0; i < edges.size();) {
+    std::size_t j = i;
+    while (j < edges.size() && edges[j] == edges[i]) ++j;
+    const Edge_t reverse(edges[i].second, edges[i].first);
+    const std::size_t nbReverse =
+        std::upper_bound(edges.begin(), edges.end(), reverse) -
+        std::lower_bound(edges.begin(), edges.end(), reverse);
+    for (std::size_t k = nbReverse; k < j - i; ++k) {
+      boundary.push_back(edges[i]);
+    }
+    i = j;
+  }
+
+  // chain the edges of the boundary, boundary being sorted by first vertex
+  std::vector<bool> used(boundary.size(), false);
+  for (std::size_t start = 0; start < boundary.size(); ++start) {
+    if (used[start]) continue;
+    std::vector<coal::Vec3f> loop;
+    std::size_t edge = start;
+    while (true) {
+      used[edge] = true;
+      loop.push_back(positions[boundary[edge].first]);
+      const std::size_t next = boundary[edge].second;
+      if (next == boundary[start].first) break;
+      std::vector<Edge_t>::const_iterator it =
+          std::lower_bound(boundary.begin(), boundary.end(), Edge_t(next, 0));
+      while (it != boundary.end() && it->first == next &&
+             used[it - boundary.begin()]) {
+        ++it;
+      }
+      if (it == boundary.end() || it->first != next) break;
+      edge = it - boundary.begin();
+    }
+    loop = simplifyLoop(loop, tolerance);
+    if (loop.size() >= 3) res.loops.push_back(loop);
+  }
+  return res;
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,57 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_AFFORDANCE_POLYGONS_HH
+#define HPP_AFFORDANCE_CORBA_AFFORDANCE_POLYGONS_HH
+
+#include <coal/collision_object.h>
+
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Simplified boundary of an affordance object.
+struct AffordancePolygons {
+  /// unit normal of the object, mean of the normals of its triangles
+  /// weighted by their area.
+  coal::Vec3f normal;
+  /// closed boundary loops, in the world frame. The last vertex of a loop is
+  /// connected to its first vertex. Outer boundaries turn counter-clockwise
+  /// around normal and holes clockwise.
+  std::vector<std::vector<coal::Vec3f> > loops;
+};  // struct AffordancePolygons
+
+/// Compute the boundary of an affordance object and simplify it.
+///
+/// Vertices shared by several triangles are merged, the edges that belong to
+/// a single triangle are chained into closed loops, and the loops are
+/// simplified by the Douglas-Peucker algorithm. Loops that are reduced to
+/// less than 3 vertices are dropped.
+/// \param object affordance object, the geometry of which should be a
+///        BVHModelOB made of triangles,
+/// \param tolerance maximal distance between the boundary and its
+///        simplification. With 0, only the vertices aligned with their
+///        neighbours, up to rounding errors, are removed.
+AffordancePolygons computePolygons(const coal::CollisionObject& object,
+                                   double tolerance);
+
+/// Simplify a closed loop by the Douglas-Peucker algorithm.
+///
+/// \param loop vertices of the loop, the last one being connected to the
+///        first one,
+/// \param tolerance maximal distance between removed vertices and the
+///        simplified loop.
+/// \return the kept vertices, in the same order.
+std::vector<coal::Vec3f> simplifyLoop(const std::vector<coal::Vec3f>& loop,
+                                      double tolerance);
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_AFFORDANCE_POLYGONS_HH
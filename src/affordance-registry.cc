@@ -0,0 +1,63 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "affordance-registry.hh"
+
+#include <mutex>
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+struct Registry {
+  std::mutex mutex;
+  std::map<std::string, PublishedAffordancesPtr_t> sets;
+};  // struct Registry
+
+Registry& registry() {
+  static Registry instance;
+  return instance;
+}
+}  // namespace
+
+void AffordanceRegistry::publish(const std::string& name,
+                                 const PublishedAffordancesPtr_t& set) {
+  Registry& reg = registry();
+  std::lock_guard<std::mutex> lock(reg.mutex);
+  reg.sets[name] = set;
+}
+
+PublishedAffordancesPtr_t AffordanceRegistry::get(const std::string& name) {
+  Registry& reg = registry();
+  std::lock_guard<std::mutex> lock(reg.mutex);
+  std::map<std::string, PublishedAffordancesPtr_t>::const_iterator it =
+      reg.sets.find(name);
+  if (it == reg.sets.end()) return PublishedAffordancesPtr_t();
+  return it->second;
+}
+
+bool AffordanceRegistry::remove(const std::string& name) {
+  Registry& reg = registry();
+  std::lock_guard<std::mutex> lock(reg.mutex);
+  return reg.sets.erase(name) > 0;
+}
+
+std::vector<std::string> AffordanceRegistry::names() {
+  Registry& reg = registry();
+  std::lock_guard<std::mutex> lock(reg.mutex);
+  std::vector<std::string> res;
+  for (std::map<std::string, PublishedAffordancesPtr_t>::const_iterator it =
+           reg.sets.begin();
+       it != reg.sets.end(); ++it) {
+    res.push_back(it->first);
+  }
+  return res;
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,70 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_AFFORDANCE_REGISTRY_HH
+#define HPP_AFFORDANCE_CORBA_AFFORDANCE_REGISTRY_HH
+
+#include <coal/collision_object.h>
+#include <stdint.h>
+
+#include <map>
+#include <memory>
+#include <string>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Snapshot of the affordance objects of a context, see
+/// Afford::publishAffordances.
+struct PublishedAffordances {
+  struct Object {
+    std::string type;
+    std::string name;
+    /// obstacle the object was found on, empty if unknown.
+    std::string obstacle;
+    /// geometry of the object, shared by the publishing context and the
+    /// contexts it is attached to. It is never modified.
+    std::shared_ptr<coal::CollisionGeometry> geometry;
+    coal::Transform3s transform;
+  };  // struct Object
+
+  std::vector<Object> objects;
+  /// fingerprint of the last analysis of each analysed obstacle.
+  std::map<std::string, uint64_t> fingerprints;
+};  // struct PublishedAffordances
+
+typedef std::shared_ptr<const PublishedAffordances> PublishedAffordancesPtr_t;
+
+/// Affordance sets published by name, shared by all contexts of the
+/// process.
+///
+/// The plugin library is loaded once per process, so that the servants of
+/// all contexts see the same registry. Methods can be called concurrently.
+class AffordanceRegistry {
+ public:
+  /// Publish a set, replacing any set of the same name.
+  static void publish(const std::string& name,
+                      const PublishedAffordancesPtr_t& set);
+
+  /// Get a published set, or a null pointer if there is none of that name.
+  static PublishedAffordancesPtr_t get(const std::string& name);
+
+  /// Remove a published set.
+  ///
+  /// Contexts the set is attached to keep its objects.
+  /// \return whether there was a set of that name.
+  static bool remove(const std::string& name);
+
+  static std::vector<std::string> names();
+};  // class AffordanceRegistry
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_AFFORDANCE_REGISTRY_HH
@@ -0,0 +1,112 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "affordance-types.hh"
+
+#include <cmath>
+#include <mutex>
+#include <set>
+#include <stdexcept>
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+// normal projected in the vertical plane containing it, as in
+// affordance::Support45Operation::requirement.
+coal::Vec3f projectNormal(const coal::Vec3f& normal) {
+  return coal::Vec3f(std::sqrt(normal[0] * normal[0] + normal[1] * normal[1]),
+                     0, normal[2]);
+}
+}  // namespace
+
+const PredefinedType predefinedTypes[] = {{"Support", 0.3, 0.3, 0.05},
+                                          {"Lean", 0.1, 0.3, 0.05},
+                                          {"Support45", 0.1, 0.3, 0.05}};
+const std::size_t nbPredefinedTypes =
+    sizeof(predefinedTypes) / sizeof(PredefinedType);
+
+bool isPredefinedType(const std::string& name) {
+  for (std::size_t idx = 0; idx < nbPredefinedTypes; idx++) {
+    if (name == predefinedTypes[idx].name) return true;
+  }
+  return false;
+}
+
+AffordanceType::Requirement requirementFromString(const std::string& name) {
+  if (name == "parallel") return AffordanceType::Parallel;
+  if (name == "orthogonal") return AffordanceType::Orthogonal;
+  if (name == "elevation") return AffordanceType::Elevation;
+  throw std::invalid_argument("Unknown requirement " + name +
+                              ", expected parallel, orthogonal or elevation.");
+}
+
+const char* requirementName(AffordanceType::Requirement requirement) {
+  switch (requirement) {
+    case AffordanceType::Parallel:
+      return "parallel";
+    case AffordanceType::Orthogonal:
+      return "orthogonal";
+    default:
+      return "elevation";
+  }
+}
+
+CustomOperation::CustomOperation(const AffordanceType& type,
+                                 const double margin, const double nbTriMargin,
+                                 const double minArea, const char* name)
+    : OperationBase(margin, nbTriMargin, minArea, name),
+      type_(type),
+      projected_(projectNormal(type.normal)) {}
+
+bool CustomOperation::requirement(const coal::Vec3f& normal) {
+  switch (type_.requirement) {
+    case AffordanceType::Parallel:
+      return (type_.normal - normal).squaredNorm() < margin_;
+    case AffordanceType::Orthogonal:
+      return std::fabs(normal.dot(type_.normal)) < margin_;
+    default:
+      return (projected_ - projectNormal(normal)).squaredNorm() < margin_;
+  }
+}
+
+affordance::OperationBasePtr_t createOperation(const std::string& name,
+                                               const AffordanceType* type,
+                                               double margin,
+                                               double nbTriMargin,
+                                               double minArea) {
+  if (type) {
+    return affordance::OperationBasePtr_t(new CustomOperation(
+        *type, margin, nbTriMargin, minArea, internAffordanceName(name)));
+  }
+  if (name == "Support") {
+    return affordance::SupportOperationPtr_t(
+        new affordance::SupportOperation(margin, nbTriMargin, minArea));
+  }
+  if (name == "Lean") {
+    return affordance::LeanOperationPtr_t(
+        new affordance::LeanOperation(margin, nbTriMargin, minArea));
+  }
+  if (name == "Support45") {
+    return affordance::Support45OperationPtr_t(
+        new affordance::Support45Operation(margin, nbTriMargin, minArea));
+  }
+  throw std::invalid_argument("Unknown affordance type " + name);
+}
+
+const char* internAffordanceName(const std::string& name) {
+  static std::mutex mutex;
+  // never freed: operations and affordance objects may refer to the names
+  // until the plugin is unloaded.
+  static std::set<std::string>* names = new std::set<std::string>();
+  std::lock_guard<std::mutex> lock(mutex);
+  return names->insert(name).first->c_str();
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,113 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_AFFORDANCE_TYPES_HH
+#define HPP_AFFORDANCE_CORBA_AFFORDANCE_TYPES_HH
+
+#include <coal/data_types.h>
+
+#include <hpp/affordance/fwd.hh>
+#include <hpp/affordance/operations.hh>
+#include <string>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Requirement of an affordance type defined at run time.
+///
+/// The requirement compares the normal of a triangle with a reference
+/// normal. The error margin of the configuration of the type bounds the
+/// difference.
+struct AffordanceType {
+  enum Requirement {
+    /// the normal is close to the reference normal, as for Support:
+    /// squared distance lower than the margin.
+    Parallel,
+    /// the normal is orthogonal to the reference normal, as for Lean:
+    /// absolute dot product lower than the margin.
+    Orthogonal,
+    /// the normal has the elevation of the reference normal, whatever its
+    /// azimuth, as for Support45: squared distance of the normals projected
+    /// in a vertical plane lower than the margin.
+    Elevation
+  };
+
+  Requirement requirement;
+  /// unit reference normal, in the world frame.
+  coal::Vec3f normal;
+};  // struct AffordanceType
+
+/// Predefined affordance type and its default configuration.
+struct PredefinedType {
+  const char* name;
+  /// error margin, angle margin for neighbouring triangles and minimum area.
+  double margin;
+  double nbTriMargin;
+  double minArea;
+};  // struct PredefinedType
+
+/// Predefined affordance types Support, Lean and Support45, in the order of
+/// the analysis.
+extern const PredefinedType predefinedTypes[];
+extern const std::size_t nbPredefinedTypes;
+
+bool isPredefinedType(const std::string& name);
+
+/// Parse the name of a requirement: "parallel", "orthogonal" or
+/// "elevation".
+///
+/// \throw std::invalid_argument if the name is unknown.
+AffordanceType::Requirement requirementFromString(const std::string& name);
+
+const char* requirementName(AffordanceType::Requirement requirement);
+
+/// Operation of an affordance type defined at run time.
+class CustomOperation : public affordance::OperationBase {
+ public:
+  /// \param name name of the affordance type, which must live as long as
+  ///        the operation, see internAffordanceName.
+  CustomOperation(const AffordanceType& type, const double margin,
+                  const double nbTriMargin, const double minArea,
+                  const char* name);
+
+  bool requirement(const coal::Vec3f& normal);
+
+  const AffordanceType& type() const { return type_; }
+
+ private:
+  const AffordanceType type_;
+  /// reference normal projected in a vertical plane, for Elevation.
+  const coal::Vec3f projected_;
+};  // class CustomOperation
+
+/// Create the operation of an affordance type.
+///
+/// \param name name of the affordance type,
+/// \param type definition of the type, or a null pointer for the predefined
+///        types,
+/// \param margin, nbTriMargin, minArea configuration of the type, see
+///        affordance::OperationBase.
+/// \throw std::invalid_argument if type is null and name is not that of a
+///        predefined type.
+affordance::OperationBasePtr_t createOperation(const std::string& name,
+                                               const AffordanceType* type,
+                                               double margin,
+                                               double nbTriMargin,
+                                               double minArea);
+
+/// Get a copy of a name that lives until the end of the program.
+///
+/// OperationBase::affordance_ is a pointer to the name of the type, and
+/// operations may outlive the definition of their type, for instance in an
+/// analysis running in the background. Equal names share the same copy.
+const char* internAffordanceName(const std::string& name);
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_AFFORDANCE_TYPES_HH
@@ -10,13 +10,27 @@
 
 #include "affordance.impl.hh"
 
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstring>
+#include <exception>
 #include <hpp/core/problem-solver.hh>
 #include <hpp/pinocchio/collision-object.hh>
 #include <hpp/util/debug.hh>
 #include <iostream>
+#include <limits>
+#include <mutex>
 #include <pinocchio/fwd.hpp>
+#include <set>
+#include <sstream>
 #include <string>
+#include <thread>
 
+#include "affordance-file.hh"
+#include "affordance-polygons.hh"
+#include "affordance-registry.hh"
+#include "affordance-types.hh"
 #include "hpp/affordance/affordance-extraction.hh"
 #include "hpp/affordance/operations.hh"
 
@@ -30,67 +44,287 @@ namespace affordanceCorba {
 namespace impl {
 
 const std::string affSuffix = "aff";
+// maximal number of changes of the affordance objects kept in the journal
+const std::size_t maxJournalSize = 100000;
 
-Afford::Afford() {}
+hpp::Names_t* fromStringVector(const std::vector<std::string>& input);
 
-Afford::Afford(const core::ProblemSolverPtr_t& /*problemSolver*/) {}
+void packObjects(const std::vector<const coal::CollisionObject*>& objects,
+                 hpp::corbaserver::affordance::ByteSeq& points,
+                 hpp::intSeq& offsets);
+
+// affordance type of each operation
+std::vector<std::string> operationTypes(
+    const affordance::OperationBases_t& operations) {
+  std::vector<std::string> types;
+  for (std::size_t opIdx = 0; opIdx < operations.size(); opIdx++) {
+    types.push_back(operations[opIdx]->affordance_);
+  }
+  return types;
+}
+
+// call task(idx) for each idx in [0, size), using up to nbThreads threads
+// (one per core if nbThreads is 0). Once all threads are joined, the first
+// exception thrown by a task, if any, is rethrown.
+template <typename Task>
+void parallelFor(std::size_t size, std::size_t nbThreads, const Task& task) {
+  if (nbThreads == 0) {
+    nbThreads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  nbThreads = std::min(nbThreads, size);
+  if (nbThreads <= 1) {
+    for (std::size_t idx = 0; idx < size; idx++) task(idx);
+    return;
+  }
+  std::atomic<std::size_t> next(0);
+  std::exception_ptr error;
+  std::mutex errorMutex;
+  auto worker = [&]() {
+    for (std::size_t idx = next++; idx < size; idx = next++) {
+      try {
+        task(idx);
+      } catch (...) {
+        std::lock_guard<std::mutex> lock(errorMutex);
+        if (!error) error = std::current_exception();
+        next = size;
+      }
+    }
+  };
+  std::vector<std::thread> threads;
+  for (std::size_t i = 1; i < nbThreads; i++) threads.emplace_back(worker);
+  worker();
+  for (std::size_t i = 0; i < threads.size(); i++) threads[i].join();
+  if (error) std::rethrow_exception(error);
+}
+
+using affordanceCorba::fingerprint;
+
+uint64_t fingerprint(const hpp::pinocchio::CollisionObjectPtr_t& obstacle,
+                     const affordance::OperationBases_t& operations,
+                     const std::vector<double>& reduceSizes) {
+  return fingerprint(geometryFingerprint(obstacle->fcl()), operations,
+                     reduceSizes);
+}
+
+// snapshots of obstacles of the problem solver
+Afford::ObstacleSnapshots_t snapshots(
+    const std::vector<hpp::pinocchio::CollisionObjectPtr_t>& obstacles) {
+  Afford::ObstacleSnapshots_t result;
+  for (std::size_t idx = 0; idx < obstacles.size(); idx++) {
+    result.push_back(Afford::snapshot(obstacles[idx]));
+  }
+  return result;
+}
+
+// whether a motion of the obstacles keeps the affordance objects found by
+// operations valid: the motion should not tilt the obstacles, and rotations
+// about the vertical axis are only allowed if the requirements do not depend
+// on the azimuth of the normals.
+bool keepsAffordances(const coal::Transform3s& motion,
+                      const affordance::OperationBases_t& operations) {
+  const double eps = 1e-9;
+  const coal::Matrix3f& R = motion.getRotation();
+  if ((R.col(2) - coal::Vec3f(0, 0, 1)).norm() > eps) return false;
+  if ((R - coal::Matrix3f::Identity()).norm() <= eps) return true;
+  for (std::size_t opIdx = 0; opIdx < operations.size(); opIdx++) {
+    const CustomOperation* custom =
+        dynamic_cast<const CustomOperation*>(operations[opIdx].get());
+    if (!custom || custom->type().requirement == AffordanceType::Elevation) {
+      continue;
+    }
+    const coal::Vec3f& normal = custom->type().normal;
+    if (normal[0] * normal[0] + normal[1] * normal[1] > eps * eps) {
+      return false;
+    }
+  }
+  return true;
+}
+
+// remove an affordance object registered as obstacle by
+// Afford::addAffObjects, if it was not already removed by the user.
+void removeRegisteredObstacle(const core::ProblemSolverPtr_t& problemSolver,
+                              const std::string& name) {
+  try {
+    problemSolver->removeObstacle(name);
+  } catch (const std::exception& exc) {
+    hppDout(info, "Affordance object "
+                      << name << " was not registered: " << exc.what());
+  }
+}
+
+Afford::Afford()
+    : nbThreads_(1),
+      generation_(0),
+      nextJob_(0),
+      cancelCount_(0),
+      journalStart_(0) {}
+
+Afford::Afford(const core::ProblemSolverPtr_t& /*problemSolver*/)
+    : nbThreads_(1),
+      generation_(0),
+      nextJob_(0),
+      cancelCount_(0),
+      journalStart_(0) {}
+
+Afford::~Afford() {
+  // running analyses stop at the next obstacle
+  ++cancelCount_;
+  for (std::map<CORBA::ULong, JobPtr_t>::iterator it = jobs_.begin();
+       it != jobs_.end(); ++it) {
+    if (it->second->thread.joinable()) it->second->thread.join();
+  }
+}
 
 void Afford::resetAffordanceConfig() {
-  problemSolver()->affordanceConfigs.add("Support", vector3_t(0.3, 0.3, 0.05));
-  problemSolver()->affordanceConfigs.add("Lean", vector3_t(0.1, 0.3, 0.05));
-  problemSolver()->affordanceConfigs.add("Support45",
-                                         vector3_t(0.1, 0.3, 0.05));
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  for (std::size_t idx = 0; idx < nbPredefinedTypes; idx++) {
+    const PredefinedType& type = predefinedTypes[idx];
+    problemSolver()->affordanceConfigs.add(
+        type.name, vector3_t(type.margin, type.nbTriMargin, type.minArea));
+  }
+  bumpGeneration();
+}
+
+affordance::OperationBasePtr_t Afford::createOperation(
+    const std::string& affType, const vector3_t& conf) {
+  const AffordanceType* type = NULL;
+  for (std::size_t idx = 0; idx < types_.size(); idx++) {
+    if (types_[idx].first == affType) type = &types_[idx].second;
+  }
+  if (type || isPredefinedType(affType)) {
+    return hpp::affordanceCorba::createOperation(affType, type, conf[0],
+                                                 conf[1], conf[2]);
+  }
+  throw hpp::Error(
+      ("Unknown affordance type " + affType + " in Afford::createOperation ()")
+          .c_str());
 }
 
 affordance::OperationBases_t Afford::createOperations() {
-  if (!problemSolver()->affordanceConfigs.has("Support")) {
+  StageTimer timer(statistics_, Statistics::CreateOperations);
+  // a triangle fulfilling the requirements of several types belongs to the
+  // first one: the predefined types keep their historical order, the types
+  // defined by addAffordanceType follow in the order of their definition.
+  std::vector<std::string> affTypes;
+  for (std::size_t idx = 0; idx < nbPredefinedTypes; idx++) {
+    affTypes.push_back(predefinedTypes[idx].name);
+  }
+  for (std::size_t idx = 0; idx < types_.size(); idx++) {
+    affTypes.push_back(types_[idx].first);
+  }
+  // configurations of types that are neither predefined nor defined, which
+  // setAffordanceConfig rejects, are ignored
+  affordance::OperationBases_t operations;
+  for (std::size_t idx = 0; idx < affTypes.size(); idx++) {
+    if (!problemSolver()->affordanceConfigs.has(affTypes[idx])) continue;
+    operations.push_back(createOperation(
+        affTypes[idx], problemSolver()->affordanceConfigs.get(affTypes[idx])));
+  }
+  if (operations.empty()) {
     throw hpp::Error(
-        "No 'Support' affordance type found Afford::createOperations ()");
+        "No affordance type configured in Afford::createOperations ()");
   }
-  const hpp::pinocchio::vector3_t& sconf =
-      problemSolver()->affordanceConfigs.get("Support");
+  return operations;
+}
 
-  if (!problemSolver()->affordanceConfigs.has("Lean")) {
+void Afford::addAffordanceType(const char* affType, const char* requirement,
+                               const hpp::doubleSeq& normal,
+                               const hpp::doubleSeq& conf) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  const std::string name(affType);
+  if (isPredefinedType(name)) {
     throw hpp::Error(
-        "No 'Lean' affordance type found in Afford::createOperations ()");
+        ("Affordance type " + name + " is predefined and cannot be redefined.")
+            .c_str());
+  }
+  if (normal.length() != 3) {
+    throw hpp::Error("Normal vector has invalid size.");
   }
-  const hpp::pinocchio::vector3_t& lconf =
-      problemSolver()->affordanceConfigs.get("Lean");
+  if (conf.length() != 3) {
+    throw hpp::Error("Configuration vector has invalid size.");
+  }
+  AffordanceType type;
+  try {
+    type.requirement = requirementFromString(requirement);
+  } catch (const std::exception& exc) {
+    throw hpp::Error(exc.what());
+  }
+  type.normal = coal::Vec3f(normal[0], normal[1], normal[2]);
+  if (type.normal.norm() < 1e-9) {
+    throw hpp::Error("Normal vector should not be null.");
+  }
+  type.normal.normalize();
+  std::size_t idx = 0;
+  while (idx < types_.size() && types_[idx].first != name) ++idx;
+  if (idx < types_.size()) {
+    types_[idx].second = type;
+  } else {
+    types_.push_back(std::make_pair(name, type));
+  }
+  problemSolver()->affordanceConfigs.add(name,
+                                         vector3_t(conf[0], conf[1], conf[2]));
+  bumpGeneration();
+}
 
-  if (!problemSolver()->affordanceConfigs.has("Support45")) {
+void Afford::removeAffordanceType(const char* affType) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  const std::string name(affType);
+  std::size_t idx = 0;
+  while (idx < types_.size() && types_[idx].first != name) ++idx;
+  const bool defined = idx < types_.size();
+  if (!defined && !problemSolver()->affordanceConfigs.has(name)) {
     throw hpp::Error(
-        "No 'Support45' affordance type found in Afford::createOperations ()");
+        ("No affordance type " + name + " in Afford::removeAffordanceType")
+            .c_str());
   }
-  const hpp::pinocchio::vector3_t& s45conf =
-      problemSolver()->affordanceConfigs.get("Support45");
-
-  affordance::SupportOperationPtr_t support(
-      new affordance::SupportOperation(sconf[0], sconf[1], sconf[2]));
-  affordance::LeanOperationPtr_t lean(
-      new affordance::LeanOperation(lconf[0], lconf[1], lconf[2]));
-  affordance::Support45OperationPtr_t support45(
-      new affordance::Support45Operation(s45conf[0], s45conf[1], s45conf[2]));
-
-  affordance::OperationBases_t operations;
-  operations.push_back(support);
-  operations.push_back(lean);
-  operations.push_back(support45);
+  if (defined) types_.erase(types_.begin() + idx);
+  problemSolver()->affordanceConfigs.erase(name);
+  bumpGeneration();
+}
 
-  return operations;
+char* Afford::getAffordanceTypeDefinition(const char* affType,
+                                          hpp::doubleSeq_out normal) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  const std::string name(affType);
+  std::size_t idx = 0;
+  while (idx < types_.size() && types_[idx].first != name) ++idx;
+  if (idx == types_.size()) {
+    throw hpp::Error(("Affordance type " + name +
+                      " is not defined by Afford::addAffordanceType")
+                         .c_str());
+  }
+  const AffordanceType& type = types_[idx].second;
+  hpp::doubleSeq_var n = new hpp::doubleSeq();
+  n->length(3);
+  for (CORBA::ULong i = 0; i < 3; i++) n[i] = type.normal[i];
+  normal = n._retn();
+  return CORBA::string_dup(requirementName(type.requirement));
 }
 
 void Afford::setAffordanceConfig(const char* affType,
                                  const hpp::doubleSeq& conf) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   if (conf.length() != 3) {
     throw hpp::Error("Configuration vector has invalid size.");
   }
+  const std::string name(affType);
+  std::size_t idx = 0;
+  while (idx < types_.size() && types_[idx].first != name) ++idx;
+  if (!isPredefinedType(name) && idx == types_.size()) {
+    throw hpp::Error(("Affordance type " + name +
+                      " is configured but not defined, see "
+                      "Afford::addAffordanceType ()")
+                         .c_str());
+  }
   const vector3_t config(conf[0], conf[1], conf[2]);
   problemSolver()->affordanceConfigs.add(affType, config);
+  bumpGeneration();
 
   /*const std::map<std::string, core::AffordanceConfig_t> map =
      problemSolver()->map <core::AffordanceConfig_t> ();*/
 }
 hpp::doubleSeq* Afford::getAffordanceConfig(const char* affType) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   if (!problemSolver()->affordanceConfigs.has(affType)) {
     throw hpp::Error(
         "No given affordance type found in Afford::getAffordanceConfig");
@@ -105,6 +339,7 @@ hpp::doubleSeq* Afford::getAffordanceConfig(const char* affType) {
 }
 
 void Afford::setMargin(const char* affType, CORBA::Double margin) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   if (!problemSolver()->affordanceConfigs.has(affType)) {
     throw hpp::Error("No given affordance type found in Afford::setMargin");
   }
@@ -112,10 +347,12 @@ void Afford::setMargin(const char* affType, CORBA::Double margin) {
   config[0] = margin;
 
   problemSolver()->affordanceConfigs.add(affType, config);
+  bumpGeneration();
 }
 
 void Afford::setNeighbouringTriangleMargin(const char* affType,
                                            CORBA::Double nbTriMargin) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   if (!problemSolver()->affordanceConfigs.has(affType)) {
     throw hpp::Error(
         "No given affordance type found in "
@@ -125,9 +362,11 @@ void Afford::setNeighbouringTriangleMargin(const char* affType,
   config[1] = nbTriMargin;
 
   problemSolver()->affordanceConfigs.add(affType, config);
+  bumpGeneration();
 }
 
 void Afford::setMinimumArea(const char* affType, CORBA::Double minArea) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   if (!problemSolver()->affordanceConfigs.has(affType)) {
     throw hpp::Error(
         "No given affordance type found in Afford::setMinimunArea");
@@ -136,22 +375,11 @@ void Afford::setMinimumArea(const char* affType, CORBA::Double minArea) {
   config[2] = minArea;
 
   problemSolver()->affordanceConfigs.add(affType, config);
-}
-
-bool isBVHModelTriangles(
-    const hpp::pinocchio::FclCollisionObjectPtr_t& object) {
-  if (object->collisionGeometry()->getNodeType() == coal::BV_OBBRSS) {
-    const affordance::BVHModelOBConst_Ptr_t model =
-        static_pointer_cast<const affordance::BVHModelOB>(
-            object->collisionGeometry());
-    if (model->getModelType() == coal::BVH_MODEL_TRIANGLES) {
-      return true;
-    }
-  }
-  return false;
+  bumpGeneration();
 }
 
 bool Afford::checkModel(const char* obstacleName) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   std::list<std::string> obstacles =
       problemSolver()->obstacleNames(false, true);
   std::list<std::string>::iterator objIt =
@@ -171,148 +399,1085 @@ void Afford::affordanceAnalysis(const char* obstacleName,
   std::list<std::string> obstacles = problemSolver()->obstacleNames(true, true);
   std::list<std::string>::iterator objIt =
       std::find(obstacles.begin(), obstacles.end(), obstacleName);
-  while (reduceSizes.size() < operations.size()) reduceSizes.push_back(0.);
 
   if (objIt == obstacles.end()) {
     throw hpp::Error("No obstacle by given name found. Unable to analyse.");
   }
   try {
-    affordance::SemanticsDataPtr_t aff = affordance::affordanceAnalysis(
-        (problemSolver()->obstacle(obstacleName)->fcl()), operations);
-    std::vector<std::vector<coal::CollisionObjectPtr_t> > affObjs =
-        affordance::getReducedAffordanceObjects(aff, reduceSizes);
+    const ObstacleSnapshot obstacle =
+        snapshot(problemSolver()->obstacle(obstacleName));
+    std::vector<affordance::CollisionObjects_t> affObjs =
+        computeAffordances(obstacle, operations, reduceSizes);
     // add coal::CollisionObstacles to problemSolver
-    addAffObjects(operations, affObjs, obstacleName);
+    addAffObjects(operationTypes(operations), affObjs, obstacleName,
+                  reduceSizes, obstacle.object->getTransform());
   } catch (const std::exception& exc) {
     throw Error(exc.what());
   }
 }
 
+Afford::ObstacleSnapshot Afford::snapshot(
+    const hpp::pinocchio::CollisionObjectPtr_t& obstacle) {
+  ObstacleSnapshot result;
+  result.name = obstacle->name();
+  result.object.reset(
+      new coal::CollisionObject(obstacle->fcl()->collisionGeometry(),
+                                obstacle->fcl()->getTransform(), false));
+  result.geometry = geometryFingerprint(obstacle->fcl());
+  return result;
+}
+
+std::vector<affordance::CollisionObjects_t> Afford::computeAffordances(
+    const ObstacleSnapshot& obstacle,
+    const affordance::OperationBases_t& operations,
+    std::vector<double> reduceSizes, affordance::SemanticsDataPtr_t* analysis) {
+  while (reduceSizes.size() < operations.size()) reduceSizes.push_back(0.);
+  std::vector<std::string> types = operationTypes(operations);
+  uint64_t key = 0;
+  std::vector<affordance::CollisionObjects_t> affObjs;
+  if (cache_.enabled()) {
+    key = fingerprint(obstacle.geometry, operations, reduceSizes);
+    if (cache_.load(key, types, affObjs)) return affObjs;
+  }
+  // only classification and region growing depend on the operations, the
+  // preprocessed triangles are reused as long as the obstacle does not move
+  PreprocessedMeshPtr_t mesh;
+  {
+    StageTimer timer(statistics_, Statistics::Preprocessing);
+    mesh = meshes_.get(obstacle.name, obstacle.geometry, *obstacle.object);
+    timer.addTriangles(mesh->size());
+  }
+  affordance::SemanticsDataPtr_t aff;
+  {
+    StageTimer timer(statistics_, Statistics::Analysis);
+    aff = mesh->analyse(obstacle.object.get(), operations);
+    timer.addTriangles(mesh->size());
+    for (std::size_t opIdx = 0; opIdx < aff->affordances_.size(); opIdx++) {
+      timer.addObjects(aff->affordances_[opIdx].size());
+    }
+  }
+  {
+    StageTimer timer(statistics_, Statistics::Reduction);
+    affObjs = affordance::getReducedAffordanceObjects(aff, reduceSizes);
+    for (std::size_t opIdx = 0; opIdx < affObjs.size(); opIdx++) {
+      timer.addObjects(affObjs[opIdx].size());
+    }
+  }
+  if (cache_.enabled()) cache_.store(key, types, affObjs);
+  if (analysis) *analysis = aff;
+  return affObjs;
+}
+
 void Afford::analyseObject(const char* obstacleName,
                            const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   std::vector<double> reduceSizes;  // copy corba list to vector
   for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
     reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
   }
-  // first erase affordance information for obstacleName
-  deleteAffordances(obstacleName);
+  std::list<std::string> names = problemSolver()->obstacleNames(true, true);
+  if (std::find(names.begin(), names.end(), obstacleName) == names.end()) {
+    throw hpp::Error("No obstacle by given name found. Unable to analyse.");
+  }
+  const ObstacleSnapshots_t obstacles(
+      1, snapshot(problemSolver()->obstacle(obstacleName)));
   affordance::OperationBases_t operations = createOperations();
-  affordanceAnalysis(obstacleName, operations, reduceSizes);
+  std::vector<std::vector<affordance::CollisionObjects_t> > affObjs;
+  std::vector<affordance::SemanticsDataPtr_t> analyses;
+  std::vector<char> analysed;
+  if (!analyseObstacles(obstacles, operations, reduceSizes, affObjs, analyses,
+                        analysed)) {
+    throw hpp::Error("Analysis cancelled.");
+  }
+  // replace the affordance information of obstacleName
+  eraseAffordancesOf(obstacleName);
+  registerAffordances(obstacles, operations, reduceSizes, affObjs, analyses,
+                      analysed);
+}
+
+hpp::corbaserver::affordance::AffordanceSweepResults*
+Afford::sweepAffordanceConfig(const char* affType,
+                              const hpp::floatSeqSeq& configs,
+                              CORBA::Double reduceSize,
+                              CORBA::Boolean withGeometry) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  affordance::OperationBases_t operations;
+  for (CORBA::ULong idx = 0; idx < configs.length(); idx++) {
+    if (configs[idx].length() != 3) {
+      throw hpp::Error("Configuration vector has invalid size.");
+    }
+    const vector3_t config(configs[idx][0], configs[idx][1], configs[idx][2]);
+    operations.push_back(createOperation(affType, config));
+  }
+  const ObstacleSnapshots_t obstacles =
+      snapshots(problemSolver()->collisionObstacles());
+  // analyse each obstacle with each configuration concurrently
+  const std::size_t nbObstacles = obstacles.size();
+  std::vector<affordance::CollisionObjects_t> affObjs(operations.size() *
+                                                      nbObstacles);
+  try {
+    parallelFor(affObjs.size(), nbThreads_, [&](std::size_t idx) {
+      affordance::OperationBases_t ops(1, operations[idx / nbObstacles]);
+      affObjs[idx] = computeAffordances(obstacles[idx % nbObstacles], ops,
+                                        std::vector<double>(1, reduceSize))[0];
+    });
+  } catch (const std::exception& exc) {
+    throw Error(exc.what());
+  }
+
+  hpp::corbaserver::affordance::AffordanceSweepResults_var results =
+      new hpp::corbaserver::affordance::AffordanceSweepResults();
+  results->length((CORBA::ULong)operations.size());
+  for (std::size_t opIdx = 0; opIdx < operations.size(); opIdx++) {
+    hpp::corbaserver::affordance::AffordanceSweepResult& result =
+        results[(CORBA::ULong)opIdx];
+    std::vector<const coal::CollisionObject*> objects;
+    double area = 0;
+    std::size_t nbTris = 0;
+    for (std::size_t obsIdx = 0; obsIdx < nbObstacles; obsIdx++) {
+      const affordance::CollisionObjects_t& objs =
+          affObjs[opIdx * nbObstacles + obsIdx];
+      for (std::size_t objIdx = 0; objIdx < objs.size(); objIdx++) {
+        affordance::BVHModelOBConst_Ptr_t model =
+            affordance::GetModel(objs[objIdx].get());
+        for (unsigned int triIdx = 0; triIdx < model->num_tris; triIdx++) {
+          const coal::Triangle& tri = (*model->tri_indices)[triIdx];
+          const coal::Vec3f& v0 = (*model->vertices)[tri[0]];
+          area += 0.5 * ((*model->vertices)[tri[1]] - v0)
+                            .cross((*model->vertices)[tri[2]] - v0)
+                            .norm();
+        }
+        nbTris += model->num_tris;
+        objects.push_back(objs[objIdx].get());
+      }
+    }
+    result.nbObjects = (CORBA::Long)objects.size();
+    result.nbTriangles = (CORBA::Long)nbTris;
+    result.area = area;
+    if (withGeometry) packObjects(objects, result.points, result.offsets);
+  }
+  return results._retn();
+}
+
+hpp::intSeq* Afford::analyseObjects(const hpp::Names_t& obstacleNames,
+                                    const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::vector<double> reduceSizes;  // copy corba list to vector
+  for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
+    reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
+  }
+  // analyse each obstacle once, even if listed several times
+  std::vector<std::string> names;
+  std::vector<std::size_t> uniqueIdx;
+  std::map<std::string, std::size_t> found;
+  for (CORBA::ULong idx = 0; idx < obstacleNames.length(); idx++) {
+    std::string name(obstacleNames[idx]);
+    std::map<std::string, std::size_t>::const_iterator it = found.find(name);
+    if (it == found.end()) {
+      it = found.insert(std::make_pair(name, names.size())).first;
+      names.push_back(name);
+    }
+    uniqueIdx.push_back(it->second);
+  }
+  ObstacleSnapshots_t obstacles;
+  for (std::size_t idx = 0; idx < names.size(); idx++) {
+    try {
+      obstacles.push_back(snapshot(problemSolver()->obstacle(names[idx])));
+    } catch (const std::exception&) {
+      throw hpp::Error(
+          ("No obstacle " + names[idx] + " found. Unable to analyse.").c_str());
+    }
+  }
+  affordance::OperationBases_t operations = createOperations();
+  std::vector<std::vector<affordance::CollisionObjects_t> > affObjs;
+  std::vector<affordance::SemanticsDataPtr_t> analyses;
+  std::vector<char> analysed;
+  bool complete = analyseObstacles(obstacles, operations, reduceSizes, affObjs,
+                                   analyses, analysed);
+  std::vector<std::string> analysedNames;
+  for (std::size_t idx = 0; idx < names.size(); idx++) {
+    if (analysed[idx]) analysedNames.push_back(names[idx]);
+  }
+  eraseAffordancesOf(analysedNames);
+  registerAffordances(obstacles, operations, reduceSizes, affObjs, analyses,
+                      analysed);
+  if (!complete) throw hpp::Error("Analysis cancelled.");
+  std::vector<CORBA::Long> nbFound(names.size(), 0);
+  for (std::size_t idx = 0; idx < names.size(); idx++) {
+    for (std::size_t opIdx = 0; opIdx < affObjs[idx].size(); opIdx++) {
+      nbFound[idx] += (CORBA::Long)affObjs[idx][opIdx].size();
+    }
+  }
+  hpp::intSeq_var counts = new hpp::intSeq();
+  counts->length((CORBA::ULong)uniqueIdx.size());
+  for (std::size_t idx = 0; idx < uniqueIdx.size(); idx++) {
+    counts[(CORBA::ULong)idx] = nbFound[uniqueIdx[idx]];
+  }
+  return counts._retn();
 }
 
 void Afford::analyseAll(const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   std::vector<double> reduceSizes;  // copy corba list to vector
   for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
     reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
   }
   // first clear all old affordances:
-  problemSolver()
-      ->affordanceObjects
-      .clear();  // clear
-                 // <std::vector<shared_ptr<hpp::pinocchio::CollisionObject>
-                 // > > ();
+  eraseAllAffordances();
   affordance::OperationBases_t operations = createOperations();
-  for (hpp::ObjectStdVector_t::const_iterator objIt =
-           problemSolver()->collisionObstacles().begin();
-       objIt != problemSolver()->collisionObstacles().end(); objIt++) {
-    const char* obstacleName = (*objIt)->name().c_str();
-    affordanceAnalysis(obstacleName, operations, reduceSizes);
+  const ObstacleSnapshots_t obstacles =
+      snapshots(problemSolver()->collisionObstacles());
+  std::vector<std::vector<affordance::CollisionObjects_t> > affObjs;
+  std::vector<affordance::SemanticsDataPtr_t> analyses;
+  std::vector<char> analysed;
+  // analyse obstacles concurrently, then register the affordance objects
+  // in the order of the obstacles, as the sequential analysis does.
+  bool complete = analyseObstacles(obstacles, operations, reduceSizes, affObjs,
+                                   analyses, analysed);
+  registerAffordances(obstacles, operations, reduceSizes, affObjs, analyses,
+                      analysed);
+  if (!complete) throw hpp::Error("Analysis cancelled.");
+}
+
+bool Afford::analyseObstacles(
+    const ObstacleSnapshots_t& obstacles,
+    const affordance::OperationBases_t& operations,
+    const std::vector<double>& reduceSizes,
+    std::vector<std::vector<affordance::CollisionObjects_t> >& affObjs,
+    std::vector<affordance::SemanticsDataPtr_t>& analyses,
+    std::vector<char>& analysed) {
+  const std::size_t cancelCount = cancelCount_;
+  const std::size_t analysis = startProgress(obstacles.size());
+  affObjs.assign(obstacles.size(),
+                 std::vector<affordance::CollisionObjects_t>());
+  analyses.assign(obstacles.size(), affordance::SemanticsDataPtr_t());
+  analysed.assign(obstacles.size(), false);
+  try {
+    parallelFor(obstacles.size(), nbThreads_, [&](std::size_t idx) {
+      // cancellation takes effect between obstacles
+      if (cancelCount_ != cancelCount) return;
+      const std::chrono::steady_clock::time_point start =
+          std::chrono::steady_clock::now();
+      affObjs[idx] = computeAffordances(obstacles[idx], operations, reduceSizes,
+                                        &analyses[idx]);
+      analysed[idx] = true;
+      const std::chrono::duration<double> duration =
+          std::chrono::steady_clock::now() - start;
+      reportProgress(analysis, obstacles[idx], duration.count());
+    });
+  } catch (const std::exception& exc) {
+    finishProgress(analysis, false);
+    throw Error(exc.what());
+  }
+  const bool complete =
+      std::find(analysed.begin(), analysed.end(), false) == analysed.end();
+  finishProgress(analysis, !complete);
+  return complete;
+}
+
+std::size_t Afford::startProgress(std::size_t nbObstacles) {
+  std::lock_guard<std::mutex> lock(progressMutex_);
+  ++progress_.analysis;
+  progress_.running = true;
+  progress_.cancelled = false;
+  progress_.nbObstacles = nbObstacles;
+  progress_.nbTriangles = 0;
+  progress_.obstacles.clear();
+  progress_.durations.clear();
+  progress_.start = std::chrono::steady_clock::now();
+  progress_.elapsed = 0;
+  return progress_.analysis;
+}
+
+void Afford::reportProgress(std::size_t analysis,
+                            const ObstacleSnapshot& obstacle, double duration) {
+  std::size_t nbTris = 0;
+  if (isBVHModelTriangles(obstacle.object.get())) {
+    nbTris = affordance::GetModel(obstacle.object.get())->num_tris;
+  }
+  std::lock_guard<std::mutex> lock(progressMutex_);
+  // a more recent analysis may have started in the meantime
+  if (progress_.analysis != analysis) return;
+  progress_.nbTriangles += nbTris;
+  progress_.obstacles.push_back(obstacle.name);
+  progress_.durations.push_back(duration);
+}
+
+void Afford::finishProgress(std::size_t analysis, bool cancelled) {
+  std::lock_guard<std::mutex> lock(progressMutex_);
+  if (progress_.analysis != analysis) return;
+  progress_.running = false;
+  progress_.cancelled = cancelled;
+  const std::chrono::duration<double> elapsed =
+      std::chrono::steady_clock::now() - progress_.start;
+  progress_.elapsed = elapsed.count();
+}
+
+hpp::corbaserver::affordance::AnalysisProgress* Afford::getAnalysisProgress() {
+  hpp::corbaserver::affordance::AnalysisProgress_var res =
+      new hpp::corbaserver::affordance::AnalysisProgress();
+  std::lock_guard<std::mutex> lock(progressMutex_);
+  res->running = progress_.running;
+  res->cancelled = progress_.cancelled;
+  res->nbDone = (CORBA::Long)progress_.obstacles.size();
+  res->nbRemaining =
+      (CORBA::Long)(progress_.nbObstacles - progress_.obstacles.size());
+  res->nbTriangles = (CORBA::Long)progress_.nbTriangles;
+  res->obstacles.length((CORBA::ULong)progress_.obstacles.size());
+  res->durations.length((CORBA::ULong)progress_.durations.size());
+  for (std::size_t idx = 0; idx < progress_.obstacles.size(); idx++) {
+    res->obstacles[(CORBA::ULong)idx] = progress_.obstacles[idx].c_str();
+    res->durations[(CORBA::ULong)idx] = progress_.durations[idx];
+  }
+  if (progress_.running) {
+    const std::chrono::duration<double> elapsed =
+        std::chrono::steady_clock::now() - progress_.start;
+    res->elapsed = elapsed.count();
+  } else {
+    res->elapsed = progress_.elapsed;
+  }
+  return res._retn();
+}
+
+void Afford::cancelAnalysis() { ++cancelCount_; }
+
+void Afford::registerAffordances(
+    const ObstacleSnapshots_t& obstacles,
+    const affordance::OperationBases_t& operations,
+    const std::vector<double>& reduceSizes,
+    const std::vector<std::vector<affordance::CollisionObjects_t> >& affObjs,
+    const std::vector<affordance::SemanticsDataPtr_t>& analyses,
+    const std::vector<char>& analysed) {
+  StageTimer timer(statistics_, Statistics::Registration);
+  bumpGeneration();
+  const std::vector<std::string> types = operationTypes(operations);
+  // addAffObjects inserts the objects of each obstacle in front of those of
+  // the previous ones
+  std::vector<AffordanceObjects_t> objs(types.size());
+  for (std::size_t idx = obstacles.size(); idx-- > 0;) {
+    if (!analysed[idx]) continue;
+    registerAffObjects(types, affObjs[idx], obstacles[idx].name.c_str(),
+                       reduceSizes, obstacles[idx].object->getTransform(), objs,
+                       timer);
+    const uint64_t print =
+        fingerprint(obstacles[idx].geometry, operations, reduceSizes);
+    fingerprints_[obstacles[idx].name] = print;
+    // reduced variants are computed from the analysis of the registered
+    // objects, with the same operations
+    if (analyses[idx]) {
+      reductions_.store(obstacles[idx].name, print, types,
+                        obstacles[idx].object, analyses[idx]);
+    }
+  }
+  mergeAffObjects(types, objs);
+}
+
+hpp::Names_t* Afford::analyseAllIncremental(
+    const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::vector<double> reduceSizes;  // copy corba list to vector
+  for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
+    reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
+  }
+  affordance::OperationBases_t operations = createOperations();
+  const ObstacleSnapshots_t obstacles =
+      snapshots(problemSolver()->collisionObstacles());
+  // delete affordances of obstacles that are no longer in the scene
+  std::set<std::string> names;
+  for (std::size_t idx = 0; idx < obstacles.size(); idx++) {
+    names.insert(obstacles[idx].name);
+  }
+  std::vector<std::string> removed;
+  for (std::map<std::string, uint64_t>::const_iterator it =
+           fingerprints_.begin();
+       it != fingerprints_.end(); ++it) {
+    if (names.find(it->first) == names.end()) removed.push_back(it->first);
+  }
+  for (Owned_t::const_iterator it = owned_.begin(); it != owned_.end(); ++it) {
+    if (names.find(it->first) == names.end() &&
+        fingerprints_.find(it->first) == fingerprints_.end()) {
+      removed.push_back(it->first);
+    }
+  }
+  if (!removed.empty()) eraseAffordancesOf(removed);
+  for (std::size_t idx = 0; idx < removed.size(); idx++) {
+    meshes_.erase(removed[idx]);
+  }
+  // find obstacles whose fingerprint changed
+  std::vector<std::size_t> changed;
+  for (std::size_t idx = 0; idx < obstacles.size(); idx++) {
+    uint64_t print =
+        fingerprint(obstacles[idx].geometry, operations, reduceSizes);
+    std::map<std::string, uint64_t>::const_iterator it =
+        fingerprints_.find(obstacles[idx].name);
+    if (it == fingerprints_.end() || it->second != print)
+      changed.push_back(idx);
+  }
+  ObstacleSnapshots_t toAnalyse;
+  for (std::size_t idx = 0; idx < changed.size(); idx++) {
+    toAnalyse.push_back(obstacles[changed[idx]]);
+  }
+  std::vector<std::vector<affordance::CollisionObjects_t> > affObjs;
+  std::vector<affordance::SemanticsDataPtr_t> analyses;
+  std::vector<char> analysed;
+  bool complete = analyseObstacles(toAnalyse, operations, reduceSizes, affObjs,
+                                   analyses, analysed);
+  std::vector<std::string> analysedNames;
+  for (std::size_t idx = 0; idx < changed.size(); idx++) {
+    if (analysed[idx]) analysedNames.push_back(toAnalyse[idx].name);
+  }
+  eraseAffordancesOf(analysedNames);
+  registerAffordances(toAnalyse, operations, reduceSizes, affObjs, analyses,
+                      analysed);
+  if (!complete) throw hpp::Error("Analysis cancelled.");
+  return fromStringVector(analysedNames);
+}
+
+CORBA::ULong Afford::startAnalyseAll(const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  JobPtr_t job(new Job);
+  job->all = true;
+  job->obstacles = snapshots(problemSolver()->collisionObstacles());
+  for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
+    job->reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
+  }
+  job->operations = createOperations();
+  return startJob(job);
+}
+
+CORBA::ULong Afford::startAnalyseObject(
+    const char* obstacleName, const hpp::doubleSeq& reduceSizesCorba) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::list<std::string> obstacles = problemSolver()->obstacleNames(true, true);
+  if (std::find(obstacles.begin(), obstacles.end(), obstacleName) ==
+      obstacles.end()) {
+    throw hpp::Error("No obstacle by given name found. Unable to analyse.");
+  }
+  JobPtr_t job(new Job);
+  job->all = false;
+  job->obstacles.push_back(snapshot(problemSolver()->obstacle(obstacleName)));
+  for (size_type i = 0; i < (size_type)reduceSizesCorba.length(); ++i) {
+    job->reduceSizes.push_back(reduceSizesCorba[(CORBA::ULong)i]);
+  }
+  job->operations = createOperations();
+  return startJob(job);
+}
+
+CORBA::Boolean Afford::pollAnalysis(CORBA::ULong job) {
+  return finishJob(job, 0);
+}
+
+CORBA::Boolean Afford::waitAnalysis(CORBA::ULong job, CORBA::Double timeout) {
+  return finishJob(job, timeout);
+}
+
+CORBA::ULong Afford::startJob(const JobPtr_t& job) {
+  job->done = false;
+  job->complete = false;
+  for (std::size_t idx = 0; idx < job->obstacles.size(); idx++) {
+    std::map<std::string, uint64_t>::const_iterator print =
+        fingerprints_.find(job->obstacles[idx].name);
+    if (print != fingerprints_.end()) job->fingerprints.insert(*print);
+  }
+  std::lock_guard<std::mutex> lock(jobsMutex_);
+  CORBA::ULong jobId = nextJob_++;
+  // the analysis only reads the snapshots of the obstacles and the
+  // operations of the job, the problem solver is modified when the job is
+  // finished by a servant call.
+  job->thread = std::thread([this, job]() {
+    try {
+      job->complete =
+          analyseObstacles(job->obstacles, job->operations, job->reduceSizes,
+                           job->affObjs, job->analyses, job->analysed);
+    } catch (const hpp::Error& exc) {
+      job->error = (const char*)exc.msg;
+    } catch (const std::exception& exc) {
+      job->error = exc.what();
+    }
+    std::lock_guard<std::mutex> lock(jobsMutex_);
+    job->done = true;
+    jobFinished_.notify_all();
+  });
+  jobs_[jobId] = job;
+  return jobId;
+}
+
+bool Afford::finishJob(CORBA::ULong jobId, double timeout) {
+  JobPtr_t job;
+  {
+    std::unique_lock<std::mutex> lock(jobsMutex_);
+    std::map<CORBA::ULong, JobPtr_t>::iterator it = jobs_.find(jobId);
+    if (it == jobs_.end()) {
+      throw hpp::Error("No analysis job with given identifier.");
+    }
+    job = it->second;
+    const auto finished = [&job]() { return job->done; };
+    if (timeout < 0) {
+      jobFinished_.wait(lock, finished);
+    } else if (!jobFinished_.wait_for(
+                   lock, std::chrono::duration<double>(timeout), finished)) {
+      return false;
+    }
+    // another call may have registered the job while this one waited
+    if (jobs_.erase(jobId) == 0) return true;
+  }
+  job->thread.join();
+  if (!job->error.empty()) throw hpp::Error(job->error.c_str());
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  // drop the results that no longer describe their obstacle, and keep the
+  // affordance objects registered by more recent analyses
+  const std::list<std::string> obstacleNames =
+      problemSolver()->obstacleNames(true, true);
+  const std::set<std::string> present(obstacleNames.begin(),
+                                      obstacleNames.end());
+  std::set<std::string> reanalysed;
+  std::string dropped;
+  for (std::size_t idx = 0; idx < job->obstacles.size(); idx++) {
+    if (!job->analysed[idx]) continue;
+    const ObstacleSnapshot& obstacle = job->obstacles[idx];
+    std::map<std::string, uint64_t>::const_iterator before =
+        job->fingerprints.find(obstacle.name);
+    std::map<std::string, uint64_t>::const_iterator now =
+        fingerprints_.find(obstacle.name);
+    const bool registered = now != fingerprints_.end();
+    if (registered != (before != job->fingerprints.end()) ||
+        (registered && now->second != before->second)) {
+      reanalysed.insert(obstacle.name);
+    } else if (present.count(obstacle.name) &&
+               geometryFingerprint(
+                   problemSolver()->obstacle(obstacle.name)->fcl()) ==
+                   obstacle.geometry) {
+      continue;
+    }
+    job->analysed[idx] = false;
+    dropped += (dropped.empty() ? "" : ", ") + obstacle.name;
   }
+  if (job->all && reanalysed.empty()) {
+    eraseAllAffordances();
+  } else if (job->all) {
+    std::set<std::string> erased;
+    for (Owned_t::const_iterator it = owned_.begin(); it != owned_.end();
+         ++it) {
+      if (!reanalysed.count(it->first)) erased.insert(it->first);
+    }
+    for (std::map<std::string, uint64_t>::const_iterator it =
+             fingerprints_.begin();
+         it != fingerprints_.end(); ++it) {
+      if (!reanalysed.count(it->first)) erased.insert(it->first);
+    }
+    eraseAffordancesOf(std::vector<std::string>(erased.begin(), erased.end()));
+  } else {
+    std::vector<std::string> names;
+    for (std::size_t idx = 0; idx < job->obstacles.size(); idx++) {
+      if (job->analysed[idx]) names.push_back(job->obstacles[idx].name);
+    }
+    eraseAffordancesOf(names);
+  }
+  registerAffordances(job->obstacles, job->operations, job->reduceSizes,
+                      job->affObjs, job->analyses, job->analysed);
+  if (!job->complete) throw hpp::Error("Analysis cancelled.");
+  if (!dropped.empty()) {
+    throw hpp::Error(("Obstacles removed, moved or analysed again during the "
+                      "analysis, their results were dropped: " +
+                      dropped + ".")
+                         .c_str());
+  }
+  return true;
+}
+
+void Afford::eraseAffordancesOf(const std::string& obstacleName) {
+  eraseAffordancesOf(std::vector<std::string>(1, obstacleName));
+}
+
+void Afford::eraseAffordancesOf(const std::vector<std::string>& obstacleNames) {
+  bumpGeneration();
+  // gather the objects to delete, so that each type is compacted once
+  std::map<std::string, std::set<std::string> > toDelete;
+  for (std::size_t idx = 0; idx < obstacleNames.size(); idx++) {
+    Owned_t::iterator owner = owned_.find(obstacleNames[idx]);
+    fingerprints_.erase(obstacleNames[idx]);
+    poses_.erase(obstacleNames[idx]);
+    reductions_.erase(obstacleNames[idx]);
+    if (owner == owned_.end()) continue;
+    for (std::map<std::string, std::set<std::string> >::const_iterator it =
+             owner->second.begin();
+         it != owner->second.end(); ++it) {
+      toDelete[it->first].insert(it->second.begin(), it->second.end());
+    }
+    owned_.erase(owner);
+  }
+  for (std::map<std::string, std::set<std::string> >::const_iterator it =
+           toDelete.begin();
+       it != toDelete.end(); ++it) {
+    eraseAffordanceObjects(it->first, it->second);
+  }
+}
+
+void Afford::eraseAffordanceObjects(const std::string& type,
+                                    const std::set<std::string>& names) {
+  std::map<std::string, AffordanceObjects_t>::iterator kit =
+      problemSolver()->affordanceObjects.map.find(type);
+  if (kit == problemSolver()->affordanceObjects.map.end()) return;
+  AffordanceObjects_t& affs = kit->second;
+  std::size_t nbKept = 0;
+  for (std::size_t objIdx = 0; objIdx < affs.size(); objIdx++) {
+    if (names.find(affs[objIdx].first) == names.end()) {
+      if (nbKept != objIdx) affs[nbKept] = affs[objIdx];
+      nbKept++;
+    } else {
+      removeRegisteredObstacle(problemSolver(), affs[objIdx].first);
+      recordChange(false, type, affs[objIdx].first);
+      index_.remove(type, affs[objIdx].first);
+    }
+  }
+  affs.resize(nbKept);
+}
+
+void Afford::eraseAllAffordances() {
+  bumpGeneration();
+  for (std::map<std::string, AffordanceObjects_t>::iterator kit =
+           problemSolver()->affordanceObjects.map.begin();
+       kit != problemSolver()->affordanceObjects.map.end(); ++kit) {
+    for (std::size_t objIdx = 0; objIdx < kit->second.size(); objIdx++) {
+      removeRegisteredObstacle(problemSolver(), kit->second[objIdx].first);
+      recordChange(false, kit->first, kit->second[objIdx].first);
+    }
+  }
+  problemSolver()->affordanceObjects.clear();
+  index_.clear();
+  owned_.clear();
+  fingerprints_.clear();
+  poses_.clear();
+  reductions_.clear();
+  attached_.reset();
+}
+
+void Afford::setAnalysisCache(const char* directory, CORBA::ULongLong maxSize) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  try {
+    cache_.configure(directory, maxSize);
+  } catch (const std::exception& exc) {
+    throw Error(exc.what());
+  }
+}
+
+void Afford::clearAnalysisCache() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  cache_.clear();
+}
+
+hpp::Names_t* Afford::loadAffordanceFile(const char* filename) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  AffordanceRecords_t records;
+  try {
+    hpp::affordanceCorba::loadAffordanceFile(filename, records);
+  } catch (const std::exception& exc) {
+    throw Error(exc.what());
+  }
+  // check all obstacles before modifying the affordance objects
+  std::list<std::string> names = problemSolver()->obstacleNames(true, true);
+  for (std::size_t idx = 0; idx < records.size(); idx++) {
+    const std::string& obstacleName = records[idx].obstacleName;
+    if (std::find(names.begin(), names.end(), obstacleName) == names.end()) {
+      throw hpp::Error(("No obstacle " + obstacleName + " found. Unable to " +
+                        "load " + filename + ".")
+                           .c_str());
+    }
+    if (geometryFingerprint(problemSolver()->obstacle(obstacleName)->fcl()) !=
+        records[idx].geometry) {
+      throw hpp::Error(("Obstacle " + obstacleName + " does not have the " +
+                        "geometry or pose it had when analysed. Unable to " +
+                        "load " + filename + ".")
+                           .c_str());
+    }
+  }
+  std::vector<std::string> loaded;
+  for (std::size_t idx = 0; idx < records.size(); idx++) {
+    const AffordanceRecord& record = records[idx];
+    eraseAffordancesOf(record.obstacleName);
+    addAffObjects(
+        record.types, record.objects, record.obstacleName.c_str(),
+        record.reduceSizes,
+        problemSolver()->obstacle(record.obstacleName)->fcl()->getTransform());
+    fingerprints_[record.obstacleName] = record.fingerprint;
+    loaded.push_back(record.obstacleName);
+  }
+  return fromStringVector(loaded);
+}
+
+void Afford::setNumberOfThreads(CORBA::ULong nbThreads) {
+  nbThreads_ = nbThreads;
+}
+
+CORBA::ULong Afford::getNumberOfThreads() { return (CORBA::ULong)nbThreads_; }
+
+CORBA::ULongLong Afford::getGeneration() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  return generation_;
 }
 
 // delete affordances by type for given object
 void Afford::deleteAffordancesByType(const char* affordance,
                                      const char* obstacleName) {
-  const std::string noObject = "";
-  if (obstacleName == noObject) {
-    problemSolver()->affordanceObjects.erase(affordance);
-  } else {
-    if (!problemSolver()->affordanceObjects.has(affordance)) {
-      std::cout
-          << "Afford::deleteAffordanceByType: no affordance objects to delete"
-          << std::endl;
-      return;
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  const std::string type(affordance), name(obstacleName);
+  if (!problemSolver()->affordanceObjects.has(type)) {
+    std::cout
+        << "Afford::deleteAffordanceByType: no affordance objects to delete"
+        << std::endl;
+    return;
+  }
+  bumpGeneration();
+  std::set<std::string> names;
+  if (name.empty()) {
+    // the analysis of the obstacles is no longer complete
+    fingerprints_.clear();
+    reductions_.clear();
+    for (Owned_t::iterator owner = owned_.begin(); owner != owned_.end();
+         ++owner) {
+      owner->second.erase(type);
     }
-    AffordanceObjects_t affs =
-        problemSolver()->affordanceObjects.get(affordance);
-
-    for (unsigned int objIdx = 0; objIdx < affs.size(); objIdx++) {
-      if (affs[objIdx].first == obstacleName) {
-        affs.erase(affs.begin() + objIdx);
-        objIdx--;
+    const AffordanceObjects_t& affs =
+        problemSolver()->affordanceObjects.get(type);
+    for (std::size_t objIdx = 0; objIdx < affs.size(); objIdx++) {
+      names.insert(affs[objIdx].first);
+    }
+  } else if (owned_.find(name) != owned_.end()) {
+    fingerprints_.erase(name);
+    reductions_.erase(name);
+    std::map<std::string, std::set<std::string> >& types = owned_[name];
+    names.swap(types[type]);
+    types.erase(type);
+  } else {
+    // name of an affordance object
+    names.insert(name);
+    for (Owned_t::iterator owner = owned_.begin(); owner != owned_.end();
+         ++owner) {
+      std::map<std::string, std::set<std::string> >::iterator it =
+          owner->second.find(type);
+      if (it != owner->second.end() && it->second.erase(name) > 0) {
+        fingerprints_.erase(owner->first);
+        reductions_.erase(owner->first);
       }
     }
-    problemSolver()->affordanceObjects.add(affordance, affs);
   }
+  eraseAffordanceObjects(type, names);
 }
 
 // delete all affordances for given object
-void Afford::deleteAffordances(const char* obstacleNameNonAff) {
-  std::string obstacleName(obstacleNameNonAff);
-  obstacleName += affSuffix;
-  const std::string noObject = "";
-  if (obstacleName == noObject) {
+void Afford::deleteAffordances(const char* obstacleName) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (std::string(obstacleName).empty()) {
     // if no obstacleName given, delete all affs in problemSolver
-    // problemSolver()->clear
-    // <std::vector<shared_ptr<hpp::pinocchio::CollisionObject> > > ();
-    problemSolver()->affordanceObjects.clear();
+    eraseAllAffordances();
   } else {
-    std::list<std::string> keys =
-        problemSolver()->obstacleNames(true, false); /*problemSolver()->getKeys
-<std::vector<shared_ptr<hpp::pinocchio::CollisionObject> >,
-std::list<std::string> > ();*/
-    std::list<std::string>::iterator affIt = keys.begin();
-    for (; affIt != keys.end(); affIt++) {
-      for (std::map<std::string, AffordanceObjects_t>::iterator kit =
-               problemSolver()->affordanceObjects.map.begin();
-           kit != problemSolver()->affordanceObjects.map.end(); ++kit) {
-        if ((kit->first).find((*affIt)) != std::string::npos) {
-          problemSolver()->removeObstacle(kit->first);
-          AffordanceObjects_t& affs = kit->second;
-          for (unsigned int objIdx = 0; objIdx < affs.size(); objIdx++) {
-            if (affs[objIdx].first == obstacleName) {
-              affs.erase(affs.begin() + objIdx);
-              objIdx--;
-            }
-          }
-          problemSolver()->affordanceObjects.add(*affIt, affs);
+    eraseAffordancesOf(obstacleName);
+  }
+}
+
+hpp::pinocchio::CollisionObjectPtr_t Afford::registerAffordanceObject(
+    const std::string& type, const std::string& name,
+    const std::string& obstacleName) {
+  hpp::pinocchio::CollisionObjectPtr_t obj = problemSolver()->obstacle(name);
+  recordChange(true, type, name);
+  if (!obstacleName.empty()) owned_[obstacleName][type].insert(name);
+  index_.insert(type, name, *obj->fcl());
+  return obj;
+}
+
+void Afford::publishAffordances(const char* name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::shared_ptr<PublishedAffordances> set(new PublishedAffordances());
+  // obstacle of each affordance object
+  std::map<std::string, std::string> owners;
+  for (Owned_t::const_iterator it = owned_.begin(); it != owned_.end(); ++it) {
+    for (std::map<std::string, std::set<std::string> >::const_iterator type =
+             it->second.begin();
+         type != it->second.end(); ++type) {
+      for (std::set<std::string>::const_iterator obj = type->second.begin();
+           obj != type->second.end(); ++obj) {
+        owners[*obj] = it->first;
+      }
+    }
+  }
+  for (std::map<std::string, AffordanceObjects_t>::const_iterator kit =
+           problemSolver()->affordanceObjects.map.begin();
+       kit != problemSolver()->affordanceObjects.map.end(); ++kit) {
+    for (std::size_t objIdx = 0; objIdx < kit->second.size(); objIdx++) {
+      PublishedAffordances::Object object;
+      object.type = kit->first;
+      object.name = kit->second[objIdx].first;
+      std::map<std::string, std::string>::const_iterator owner =
+          owners.find(object.name);
+      if (owner != owners.end()) object.obstacle = owner->second;
+      FclCollisionObjectPtr_t fcl = kit->second[objIdx].second->fcl();
+      object.geometry = fcl->collisionGeometry();
+      object.transform = fcl->getTransform();
+      set->objects.push_back(object);
+    }
+  }
+  set->fingerprints = fingerprints_;
+  AffordanceRegistry::publish(name, set);
+}
+
+void Afford::unpublishAffordances(const char* name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (!AffordanceRegistry::remove(name)) {
+    throw hpp::Error(
+        ("No published affordances named " + std::string(name) + ".").c_str());
+  }
+}
+
+hpp::Names_t* Afford::getPublishedAffordances() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  return fromStringVector(AffordanceRegistry::names());
+}
+
+void Afford::attachAffordances(const char* name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  PublishedAffordancesPtr_t set = AffordanceRegistry::get(name);
+  if (!set) {
+    throw hpp::Error(
+        ("No published affordances named " + std::string(name) + ".").c_str());
+  }
+  StageTimer timer(statistics_, Statistics::Registration);
+  eraseAllAffordances();
+  std::map<std::string, AffordanceObjects_t> objs;
+  for (std::size_t objIdx = 0; objIdx < set->objects.size(); objIdx++) {
+    const PublishedAffordances::Object& object = set->objects[objIdx];
+    // the geometry is shared with the publishing context, only the pose is
+    // copied. Its bounding box was computed when it was published and is not
+    // computed again, as other contexts may be reading it.
+    FclCollisionObject fclObject(object.geometry, object.transform, false);
+    problemSolver()->addObstacle(object.name, fclObject, false, false);
+    hpp::pinocchio::CollisionObjectPtr_t obj =
+        registerAffordanceObject(object.type, object.name, object.obstacle);
+    objs[object.type].push_back(std::make_pair(object.name, obj));
+  }
+  timer.addObjects(set->objects.size());
+  for (std::map<std::string, AffordanceObjects_t>::const_iterator it =
+           objs.begin();
+       it != objs.end(); ++it) {
+    problemSolver()->affordanceObjects.add(it->first, it->second);
+  }
+  fingerprints_ = set->fingerprints;
+  attached_ = set;
+}
+
+void Afford::detachAffordances() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (!attached_) return;
+  std::set<const coal::CollisionGeometry*> geometries;
+  for (std::size_t objIdx = 0; objIdx < attached_->objects.size(); objIdx++) {
+    geometries.insert(attached_->objects[objIdx].geometry.get());
+  }
+  bumpGeneration();
+  // objects that were replaced since, e.g. by a new analysis of their
+  // obstacle, have another geometry and are kept
+  std::map<std::string, std::set<std::string> > toDelete;
+  for (std::map<std::string, AffordanceObjects_t>::const_iterator kit =
+           problemSolver()->affordanceObjects.map.begin();
+       kit != problemSolver()->affordanceObjects.map.end(); ++kit) {
+    for (std::size_t objIdx = 0; objIdx < kit->second.size(); objIdx++) {
+      FclCollisionObjectPtr_t fcl = kit->second[objIdx].second->fcl();
+      if (geometries.count(fcl->collisionGeometry().get())) {
+        toDelete[kit->first].insert(kit->second[objIdx].first);
+      }
+    }
+  }
+  for (Owned_t::iterator owner = owned_.begin(); owner != owned_.end();) {
+    bool detached = false;
+    for (std::map<std::string, std::set<std::string> >::iterator type =
+             owner->second.begin();
+         type != owner->second.end(); ++type) {
+      const std::set<std::string>& names = toDelete[type->first];
+      for (std::set<std::string>::iterator obj = type->second.begin();
+           obj != type->second.end();) {
+        if (names.count(*obj)) {
+          type->second.erase(obj++);
+          detached = true;
+        } else {
+          ++obj;
         }
       }
     }
+    // obstacles that lost affordance objects are analysed again by
+    // analyseAllIncremental
+    if (detached) {
+      fingerprints_.erase(owner->first);
+      reductions_.erase(owner->first);
+      poses_.erase(owner->first);
+    }
+    bool empty = true;
+    for (std::map<std::string, std::set<std::string> >::const_iterator type =
+             owner->second.begin();
+         type != owner->second.end(); ++type) {
+      if (!type->second.empty()) empty = false;
+    }
+    if (empty) {
+      owned_.erase(owner++);
+    } else {
+      ++owner;
+    }
+  }
+  for (std::map<std::string, std::set<std::string> >::const_iterator it =
+           toDelete.begin();
+       it != toDelete.end(); ++it) {
+    eraseAffordanceObjects(it->first, it->second);
   }
+  attached_.reset();
+}
+
+CORBA::Boolean Afford::updateObstaclePose(const char* obstacleName) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::list<std::string> obstacles = problemSolver()->obstacleNames(true, true);
+  if (std::find(obstacles.begin(), obstacles.end(), obstacleName) ==
+      obstacles.end()) {
+    throw hpp::Error("No obstacle by given name found. Unable to update.");
+  }
+  const std::string name(obstacleName);
+  hpp::pinocchio::CollisionObjectPtr_t obstacle =
+      problemSolver()->obstacle(name);
+  const coal::Transform3s pose = obstacle->fcl()->getTransform();
+  affordance::OperationBases_t operations = createOperations();
+  std::map<std::string, AnalysedPose>::iterator analysed = poses_.find(name);
+  Owned_t::const_iterator owner = owned_.find(name);
+  coal::Transform3s motion;
+  if (analysed != poses_.end()) {
+    motion = pose * analysed->second.pose.inverse();
+  }
+  if (analysed == poses_.end() || owner == owned_.end() ||
+      !keepsAffordances(motion, operations)) {
+    // the affordance objects of the obstacle are unknown or no longer valid
+    hpp::doubleSeq reduceSizes;
+    if (analysed != poses_.end()) {
+      const std::vector<double>& sizes = analysed->second.reduceSizes;
+      reduceSizes.length((CORBA::ULong)sizes.size());
+      for (std::size_t idx = 0; idx < sizes.size(); idx++) {
+        reduceSizes[(CORBA::ULong)idx] = sizes[idx];
+      }
+    }
+    analyseObject(obstacleName, reduceSizes);
+    return false;
+  }
+
+  StageTimer timer(statistics_, Statistics::Registration);
+  bumpGeneration();
+  for (std::map<std::string, std::set<std::string> >::const_iterator type =
+           owner->second.begin();
+       type != owner->second.end(); ++type) {
+    std::map<std::string, AffordanceObjects_t>::iterator kit =
+        problemSolver()->affordanceObjects.map.find(type->first);
+    if (kit == problemSolver()->affordanceObjects.map.end()) continue;
+    AffordanceObjects_t& affs = kit->second;
+    for (std::size_t objIdx = 0; objIdx < affs.size(); objIdx++) {
+      const std::string& objName = affs[objIdx].first;
+      if (type->second.find(objName) == type->second.end()) continue;
+      // register the object again with the same geometry and a new pose:
+      // the geometry may be shared with other contexts and is not modified.
+      FclCollisionObjectPtr_t fcl = affs[objIdx].second->fcl();
+      FclCollisionObject moved(fcl->collisionGeometry(),
+                               motion * fcl->getTransform(), false);
+      removeRegisteredObstacle(problemSolver(), objName);
+      problemSolver()->addObstacle(objName, moved, false, false);
+      affs[objIdx].second = problemSolver()->obstacle(objName);
+      recordChange(false, type->first, objName);
+      recordChange(true, type->first, objName);
+      index_.remove(type->first, objName);
+      index_.insert(type->first, objName, *affs[objIdx].second->fcl());
+      timer.addObjects(1);
+    }
+  }
+  meshes_.erase(name);
+  // the affordance objects are those an analysis at the new pose would
+  // find, provided the recorded fingerprint matches the previous pose.
+  std::map<std::string, uint64_t>::iterator print = fingerprints_.find(name);
+  if (print != fingerprints_.end()) {
+    coal::CollisionObject previous(obstacle->fcl()->collisionGeometry(),
+                                   analysed->second.pose, false);
+    if (print->second == fingerprint(geometryFingerprint(&previous), operations,
+                                     analysed->second.reduceSizes)) {
+      const uint64_t moved =
+          fingerprint(obstacle, operations, analysed->second.reduceSizes);
+      reductions_.move(name, print->second, moved, pose);
+      print->second = moved;
+    } else {
+      fingerprints_.erase(print);
+      reductions_.erase(name);
+    }
+  } else {
+    reductions_.erase(name);
+  }
+  analysed->second.pose = pose;
+  return true;
+}
+
+void Afford::deleteAffordancesForObstacles(const hpp::Names_t& obstacleNames) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::vector<std::string> names;
+  for (CORBA::ULong idx = 0; idx < obstacleNames.length(); idx++) {
+    names.push_back(std::string(obstacleNames[idx]));
+  }
+  eraseAffordancesOf(names);
 }
 
 void Afford::addAffObjects(
-    const affordance::OperationBases_t& ops,
+    const std::vector<std::string>& types,
+    const std::vector<affordance::CollisionObjects_t>& affObjs,
+    const char* obstacleNameNonAff, const std::vector<double>& reduceSizes,
+    const coal::Transform3s& pose) {
+  StageTimer timer(statistics_, Statistics::Registration);
+  bumpGeneration();
+  std::vector<AffordanceObjects_t> objs(types.size());
+  registerAffObjects(types, affObjs, obstacleNameNonAff, reduceSizes, pose,
+                     objs, timer);
+  mergeAffObjects(types, objs);
+}
+
+void Afford::registerAffObjects(
+    const std::vector<std::string>& types,
     const std::vector<affordance::CollisionObjects_t>& affObjs,
-    const char* obstacleNameNonAff) {
+    const char* obstacleNameNonAff, const std::vector<double>& reduceSizes,
+    const coal::Transform3s& pose, std::vector<AffordanceObjects_t>& objs,
+    StageTimer& timer) {
+  AnalysedPose& analysed = poses_[obstacleNameNonAff];
+  analysed.pose = pose;
+  analysed.reduceSizes = reduceSizes;
   std::string obstacleName(obstacleNameNonAff);
   obstacleName += affSuffix;
-  for (unsigned int opIdx = 0; opIdx < ops.size(); opIdx++) {
-    AffordanceObjects_t objs;
-    affordance::CollisionObjects_t affs = affObjs[opIdx];
+  for (unsigned int opIdx = 0; opIdx < types.size(); opIdx++) {
+    const affordance::CollisionObjects_t& affs = affObjs[opIdx];
     for (unsigned int objIdx = 0; objIdx < affs.size(); objIdx++) {
-      /*FclCollisionObjectSharePtr_t obj =
-      FclCollisionObjectSharePtr_t (new FclCollisionObject(*(affs[objIdx])));*/
       std::stringstream ss;
       ss << opIdx << "_" << objIdx;
       std::string ig = obstacleName + ss.str();
       problemSolver()->addObstacle(ig, *(affs[objIdx]), false, false);
-      hpp::pinocchio::CollisionObjectPtr_t obj = problemSolver()->obstacle(ig);
-      objs.push_back(std::make_pair(ig, obj));
+      hpp::pinocchio::CollisionObjectPtr_t obj =
+          registerAffordanceObject(types[opIdx], ig, obstacleNameNonAff);
+      objs[opIdx].push_back(std::make_pair(ig, obj));
+      timer.addTriangles(affordance::GetModel(obj->fcl())->num_tris);
     }
-    if (problemSolver()->affordanceObjects.has(ops[opIdx]->affordance_)) {
-      // std::vector<FclCollisionObjectSharePtr_t >
-      AffordanceObjects_t mapObjs =
-          problemSolver()->affordanceObjects.get(ops[opIdx]->affordance_);
-      objs.insert(objs.begin() + objs.size(), mapObjs.begin(), mapObjs.end());
+    timer.addObjects(affs.size());
+  }
+}
+
+void Afford::mergeAffObjects(const std::vector<std::string>& types,
+                             const std::vector<AffordanceObjects_t>& objs) {
+  for (unsigned int opIdx = 0; opIdx < types.size(); opIdx++) {
+    AffordanceObjects_t merged(objs[opIdx]);
+    if (problemSolver()->affordanceObjects.has(types[opIdx])) {
+      const AffordanceObjects_t& mapObjs =
+          problemSolver()->affordanceObjects.get(types[opIdx]);
+      merged.insert(merged.end(), mapObjs.begin(), mapObjs.end());
     }
-    problemSolver()->affordanceObjects.erase(ops[opIdx]->affordance_);
-    problemSolver()->affordanceObjects.add(ops[opIdx]->affordance_, objs);
+    problemSolver()->affordanceObjects.erase(types[opIdx]);
+    problemSolver()->affordanceObjects.add(types[opIdx], merged);
   }
 }
 
 hpp::doubleSeqSeqSeqSeq* Afford::getAffordancePoints(char const* affordance) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  StageTimer timer(statistics_, Statistics::Marshalling);
   hpp::doubleSeqSeqSeqSeq* affs;
   if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
     throw hpp::Error(
@@ -328,6 +1493,7 @@ hpp::doubleSeqSeqSeqSeq* Afford::getAffordancePoints(char const* affordance) {
     affordance::BVHModelOBConst_Ptr_t model =
         affordance::GetModel(affObjs[affIdx].second->fcl());
     std::size_t nbTris = model->num_tris;
+    timer.addTriangles(nbTris);
     hpp::doubleSeqSeqSeq tris;
     tris.length((CORBA::ULong)nbTris);
     for (std::size_t triIdx = 0; triIdx < nbTris; triIdx++) {
@@ -350,9 +1516,571 @@ hpp::doubleSeqSeqSeqSeq* Afford::getAffordancePoints(char const* affordance) {
     }
     (*affs)[(CORBA::ULong)affIdx] = tris;
   }
+  timer.addObjects(nbAffs);
   return affs;
 }
 
+// write value in buffer using the little-endian byte order of packed
+// buffers, whatever the byte order of the host.
+inline CORBA::Octet* packDouble(const double& value, CORBA::Octet* buffer) {
+  uint64_t bits;
+  std::memcpy(&bits, &value, sizeof(bits));
+  for (std::size_t i = 0; i < sizeof(bits); ++i) {
+    *buffer++ = (CORBA::Octet)(bits >> (8 * i));
+  }
+  return buffer;
+}
+
+// write global position of the vertices of triangles [first, last) of object
+// in buffer and return the position following the last written value.
+CORBA::Octet* packTriangles(const coal::CollisionObject* object,
+                            std::size_t first, std::size_t last,
+                            CORBA::Octet* buffer) {
+  affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(object);
+  const coal::Matrix3f& R = object->getRotation();
+  const coal::Vec3f& t = object->getTranslation();
+  for (std::size_t triIdx = first; triIdx < last; triIdx++) {
+    const coal::Triangle& refTri = (*model->tri_indices)[triIdx];
+    for (unsigned int vertIdx = 0; vertIdx < 3; vertIdx++) {
+      coal::Vec3f p(R * (*model->vertices)[refTri[vertIdx]] + t);
+      for (std::size_t idx = 0; idx < 3; idx++) {
+        buffer = packDouble(p[idx], buffer);
+      }
+    }
+  }
+  return buffer;
+}
+
+// write global position of the vertices of all triangles of objects in
+// points, the triangles of the i-th object being those of index
+// [offsets[i], offsets[i + 1]).
+void packObjects(const std::vector<const coal::CollisionObject*>& objects,
+                 hpp::corbaserver::affordance::ByteSeq& points,
+                 hpp::intSeq& offsets) {
+  std::size_t nbObjs = objects.size();
+  offsets.length((CORBA::ULong)(nbObjs + 1));
+  std::size_t nbTris = 0;
+  for (std::size_t objIdx = 0; objIdx < nbObjs; objIdx++) {
+    offsets[(CORBA::ULong)objIdx] = (CORBA::Long)nbTris;
+    nbTris += affordance::GetModel(objects[objIdx])->num_tris;
+  }
+  offsets[(CORBA::ULong)nbObjs] = (CORBA::Long)nbTris;
+
+  points.length((CORBA::ULong)(nbTris * 9 * sizeof(double)));
+  CORBA::Octet* data = points.get_buffer();
+  for (std::size_t objIdx = 0; objIdx < nbObjs; objIdx++) {
+    data = packTriangles(objects[objIdx], 0,
+                         affordance::GetModel(objects[objIdx])->num_tris, data);
+  }
+}
+
+void Afford::getAffordancePointsPacked(
+    const char* affordance, hpp::corbaserver::affordance::ByteSeq_out points,
+    hpp::intSeq_out offsets) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  StageTimer timer(statistics_, Statistics::Marshalling);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  const AffordanceObjects_t& affObjs =
+      problemSolver()->affordanceObjects.get(affordance);
+  std::vector<const coal::CollisionObject*> objects;
+  for (std::size_t affIdx = 0; affIdx < affObjs.size(); affIdx++) {
+    objects.push_back(affObjs[affIdx].second->fcl());
+  }
+  hpp::corbaserver::affordance::ByteSeq_var buffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  hpp::intSeq_var triOffsets = new hpp::intSeq();
+  packObjects(objects, buffer.inout(), triOffsets.inout());
+  timer.addTriangles(triOffsets[(CORBA::ULong)objects.size()]);
+  timer.addObjects(objects.size());
+  points = buffer._retn();
+  offsets = triOffsets._retn();
+}
+
+void Afford::getReducedAffordancePoints(
+    const char* affordance, CORBA::Double reduceSize,
+    hpp::corbaserver::affordance::ByteSeq_out points, hpp::intSeq_out offsets,
+    hpp::Names_t_out obstacleNames) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  const std::string type(affordance);
+  std::size_t typeIdx = 0;
+  while (typeIdx < types_.size() && types_[typeIdx].first != type) ++typeIdx;
+  if (!isPredefinedType(type) && typeIdx == types_.size()) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  // the reduced objects are computed from the analysis of the registered
+  // affordance objects, obstacles the analysis of which is not kept are
+  // skipped.
+  const std::list<std::string> obstacles =
+      problemSolver()->obstacleNames(true, true);
+  std::vector<std::pair<std::string, uint64_t> > toReduce;
+  for (std::map<std::string, uint64_t>::const_iterator it =
+           fingerprints_.begin();
+       it != fingerprints_.end(); ++it) {
+    if (std::find(obstacles.begin(), obstacles.end(), it->first) !=
+        obstacles.end()) {
+      toReduce.push_back(*it);
+    }
+  }
+  std::vector<affordance::CollisionObjects_t> affObjs(toReduce.size());
+  try {
+    parallelFor(toReduce.size(), nbThreads_, [&](std::size_t idx) {
+      StageTimer timer(statistics_, Statistics::Reduction);
+      reductions_.get(toReduce[idx].first, toReduce[idx].second, type,
+                      reduceSize, affObjs[idx]);
+      timer.addObjects(affObjs[idx].size());
+    });
+  } catch (const std::exception& exc) {
+    throw Error(exc.what());
+  }
+
+  StageTimer timer(statistics_, Statistics::Marshalling);
+  std::vector<const coal::CollisionObject*> objects;
+  std::vector<std::string> names;
+  for (std::size_t idx = 0; idx < toReduce.size(); idx++) {
+    for (std::size_t objIdx = 0; objIdx < affObjs[idx].size(); objIdx++) {
+      objects.push_back(affObjs[idx][objIdx].get());
+      names.push_back(toReduce[idx].first);
+    }
+  }
+  hpp::corbaserver::affordance::ByteSeq_var buffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  hpp::intSeq_var triOffsets = new hpp::intSeq();
+  packObjects(objects, buffer.inout(), triOffsets.inout());
+  timer.addTriangles(triOffsets[(CORBA::ULong)objects.size()]);
+  timer.addObjects(objects.size());
+  points = buffer._retn();
+  offsets = triOffsets._retn();
+  obstacleNames = fromStringVector(names);
+}
+
+void Afford::setReductionCacheSize(CORBA::ULongLong maxTriangles) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  reductions_.setMaxTriangles((std::size_t)maxTriangles);
+}
+
+char* Afford::getAffordancePointsChunk(
+    const char* affordance, const char* token, CORBA::ULong maxObjects,
+    CORBA::ULong maxTriangles, hpp::corbaserver::affordance::ByteSeq_out points,
+    hpp::intSeq_out offsets, hpp::Names_t_out names,
+    CORBA::Long& firstTriangle) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  StageTimer timer(statistics_, Statistics::Marshalling);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  // position of the first triangle of the chunk
+  std::size_t objIdx = 0, triIdx = 0;
+  if (std::string(token) != "") {
+    std::istringstream iss(token);
+    CORBA::ULongLong generation;
+    char sep1 = 0, sep2 = 0;
+    iss >> generation >> sep1 >> objIdx >> sep2 >> triIdx;
+    if (!iss || !iss.eof() || sep1 != ':' || sep2 != ':') {
+      throw hpp::Error(
+          ("Invalid continuation token " + std::string(token) + ".").c_str());
+    }
+    if (generation != generation_) {
+      throw hpp::Error(
+          "Affordances changed since the continuation token was returned. "
+          "Restart the iteration.");
+    }
+  }
+  const AffordanceObjects_t& affObjs =
+      problemSolver()->affordanceObjects.get(affordance);
+  if (objIdx > affObjs.size()) {
+    throw hpp::Error(
+        ("Invalid continuation token " + std::string(token) + ".").c_str());
+  }
+  // select triangles [first, last) of the objects, within the budget
+  struct Range {
+    std::size_t object, first, last;
+  };
+  std::vector<Range> ranges;
+  std::size_t budget = maxTriangles;
+  if (maxTriangles == 0) budget = std::numeric_limits<std::size_t>::max();
+  firstTriangle = (CORBA::Long)triIdx;
+  while (objIdx < affObjs.size() && budget > 0 &&
+         (maxObjects == 0 || ranges.size() < maxObjects)) {
+    const std::size_t nbTris =
+        affordance::GetModel(affObjs[objIdx].second->fcl())->num_tris;
+    if (triIdx > nbTris) {
+      throw hpp::Error(
+          ("Invalid continuation token " + std::string(token) + ".").c_str());
+    }
+    Range range = {objIdx, triIdx, std::min(nbTris, triIdx + budget)};
+    ranges.push_back(range);
+    budget -= range.last - range.first;
+    triIdx = range.last;
+    if (triIdx < nbTris) break;
+    ++objIdx;
+    triIdx = 0;
+  }
+
+  hpp::corbaserver::affordance::ByteSeq_var buffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  hpp::intSeq_var triOffsets = new hpp::intSeq();
+  std::vector<std::string> objNames;
+  triOffsets->length((CORBA::ULong)(ranges.size() + 1));
+  std::size_t nbTris = 0;
+  for (std::size_t idx = 0; idx < ranges.size(); idx++) {
+    triOffsets[(CORBA::ULong)idx] = (CORBA::Long)nbTris;
+    nbTris += ranges[idx].last - ranges[idx].first;
+    objNames.push_back(affObjs[ranges[idx].object].first);
+  }
+  triOffsets[(CORBA::ULong)ranges.size()] = (CORBA::Long)nbTris;
+  buffer->length((CORBA::ULong)(nbTris * 9 * sizeof(double)));
+  CORBA::Octet* data = buffer->get_buffer();
+  for (std::size_t idx = 0; idx < ranges.size(); idx++) {
+    data = packTriangles(affObjs[ranges[idx].object].second->fcl(),
+                         ranges[idx].first, ranges[idx].last, data);
+  }
+  timer.addTriangles(nbTris);
+  timer.addObjects(ranges.size());
+  points = buffer._retn();
+  offsets = triOffsets._retn();
+  names = fromStringVector(objNames);
+
+  if (objIdx == affObjs.size()) return CORBA::string_dup("");
+  std::ostringstream next;
+  next << generation_ << ':' << objIdx << ':' << triIdx;
+  return CORBA::string_dup(next.str().c_str());
+}
+
+void Afford::getAffordancePolygons(
+    const char* affordance, CORBA::Double tolerance,
+    hpp::corbaserver::affordance::ByteSeq_out points, hpp::intSeq_out loops,
+    hpp::intSeq_out objects,
+    hpp::corbaserver::affordance::ByteSeq_out normals) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  StageTimer timer(statistics_, Statistics::Marshalling);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "polygons.");
+  }
+  const AffordanceObjects_t& affObjs =
+      problemSolver()->affordanceObjects.get(affordance);
+  std::vector<AffordancePolygons> polygons;
+  std::size_t nbLoops = 0, nbVertices = 0;
+  for (std::size_t affIdx = 0; affIdx < affObjs.size(); affIdx++) {
+    const coal::CollisionObject* object = affObjs[affIdx].second->fcl();
+    timer.addTriangles(affordance::GetModel(object)->num_tris);
+    polygons.push_back(computePolygons(*object, tolerance));
+    nbLoops += polygons.back().loops.size();
+    for (std::size_t loopIdx = 0; loopIdx < polygons.back().loops.size();
+         loopIdx++) {
+      nbVertices += polygons.back().loops[loopIdx].size();
+    }
+  }
+  timer.addObjects(polygons.size());
+
+  hpp::corbaserver::affordance::ByteSeq_var vertexBuffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  hpp::corbaserver::affordance::ByteSeq_var normalBuffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  hpp::intSeq_var loopOffsets = new hpp::intSeq();
+  hpp::intSeq_var objectOffsets = new hpp::intSeq();
+  vertexBuffer->length((CORBA::ULong)(nbVertices * 3 * sizeof(double)));
+  normalBuffer->length((CORBA::ULong)(polygons.size() * 3 * sizeof(double)));
+  loopOffsets->length((CORBA::ULong)(nbLoops + 1));
+  objectOffsets->length((CORBA::ULong)(polygons.size() + 1));
+  CORBA::Octet* vertexData = vertexBuffer->get_buffer();
+  CORBA::Octet* normalData = normalBuffer->get_buffer();
+  CORBA::ULong loop = 0;
+  CORBA::Long vertex = 0;
+  for (std::size_t objIdx = 0; objIdx < polygons.size(); objIdx++) {
+    objectOffsets[(CORBA::ULong)objIdx] = (CORBA::Long)loop;
+    for (std::size_t idx = 0; idx < 3; idx++) {
+      normalData = packDouble(polygons[objIdx].normal[idx], normalData);
+    }
+    const std::vector<std::vector<coal::Vec3f> >& objLoops =
+        polygons[objIdx].loops;
+    for (std::size_t loopIdx = 0; loopIdx < objLoops.size(); loopIdx++) {
+      loopOffsets[loop++] = vertex;
+      for (std::size_t vertIdx = 0; vertIdx < objLoops[loopIdx].size();
+           vertIdx++) {
+        for (std::size_t idx = 0; idx < 3; idx++) {
+          vertexData = packDouble(objLoops[loopIdx][vertIdx][idx], vertexData);
+        }
+        ++vertex;
+      }
+    }
+  }
+  objectOffsets[(CORBA::ULong)polygons.size()] = (CORBA::Long)loop;
+  loopOffsets[loop] = vertex;
+  points = vertexBuffer._retn();
+  loops = loopOffsets._retn();
+  objects = objectOffsets._retn();
+  normals = normalBuffer._retn();
+}
+
+// convert a vector of size 3 to a point
+coal::Vec3f toVector3(const hpp::doubleSeq& seq, const char* name) {
+  if (seq.length() != 3) {
+    throw hpp::Error((std::string(name) + " should be of size 3.").c_str());
+  }
+  return coal::Vec3f(seq[0], seq[1], seq[2]);
+}
+
+// write names and triangles of matches in packed buffers
+void packMatches(const AffordanceIndex::Matches_t& matches,
+                 hpp::Names_t_out names,
+                 hpp::corbaserver::affordance::ByteSeq_out points,
+                 hpp::intSeq_out offsets) {
+  std::vector<std::string> matchNames;
+  hpp::intSeq_var triOffsets = new hpp::intSeq();
+  triOffsets->length((CORBA::ULong)(matches.size() + 1));
+  std::size_t nbVertices = 0;
+  for (std::size_t idx = 0; idx < matches.size(); idx++) {
+    matchNames.push_back(matches[idx].name);
+    triOffsets[(CORBA::ULong)idx] = (CORBA::Long)(nbVertices / 3);
+    nbVertices += matches[idx].vertices.size();
+  }
+  triOffsets[(CORBA::ULong)matches.size()] = (CORBA::Long)(nbVertices / 3);
+  hpp::corbaserver::affordance::ByteSeq_var buffer =
+      new hpp::corbaserver::affordance::ByteSeq();
+  buffer->length((CORBA::ULong)(nbVertices * 3 * sizeof(double)));
+  CORBA::Octet* data = buffer->get_buffer();
+  for (std::size_t idx = 0; idx < matches.size(); idx++) {
+    const std::vector<coal::Vec3f>& vertices = matches[idx].vertices;
+    for (std::size_t vIdx = 0; vIdx < vertices.size(); vIdx++) {
+      for (std::size_t i = 0; i < 3; i++) {
+        data = packDouble(vertices[vIdx][i], data);
+      }
+    }
+  }
+  names = fromStringVector(matchNames);
+  points = buffer._retn();
+  offsets = triOffsets._retn();
+}
+
+void Afford::getAffordancesInBox(
+    const char* affordance, const hpp::doubleSeq& lower,
+    const hpp::doubleSeq& upper, hpp::Names_t_out names,
+    hpp::corbaserver::affordance::ByteSeq_out points, hpp::intSeq_out offsets) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  coal::AABB box(toVector3(lower, "lower"), toVector3(upper, "upper"));
+  AffordanceIndex::Matches_t matches;
+  index_.queryBox(affordance, box, matches);
+  packMatches(matches, names, points, offsets);
+}
+
+void Afford::getAffordancesInSphere(
+    const char* affordance, const hpp::doubleSeq& center, CORBA::Double radius,
+    hpp::Names_t_out names, hpp::corbaserver::affordance::ByteSeq_out points,
+    hpp::intSeq_out offsets) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  AffordanceIndex::Matches_t matches;
+  index_.querySphere(affordance, toVector3(center, "center"), radius, matches);
+  packMatches(matches, names, points, offsets);
+}
+
+// read value from buffer written with packDouble and return the position
+// following it.
+inline const CORBA::Octet* unpackDouble(const CORBA::Octet* buffer,
+                                        double& value) {
+  uint64_t bits = 0;
+  for (std::size_t i = 0; i < sizeof(bits); ++i) {
+    bits |= (uint64_t)(*buffer++) << (8 * i);
+  }
+  std::memcpy(&value, &bits, sizeof(value));
+  return buffer;
+}
+
+void Afford::getNearestAffordancePoints(
+    const char* affordance,
+    const hpp::corbaserver::affordance::ByteSeq& queries,
+    CORBA::Double maxDistance, hpp::corbaserver::affordance::ByteSeq_out points,
+    hpp::corbaserver::affordance::ByteSeq_out normals,
+    hpp::corbaserver::affordance::ByteSeq_out distances,
+    hpp::intSeq_out objects, hpp::Names_t_out names) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
+    throw hpp::Error(
+        "No affordance type of given name found. Unable to get affordance "
+        "points.");
+  }
+  const std::size_t pointSize = 3 * sizeof(double);
+  if (queries.length() % pointSize != 0) {
+    throw hpp::Error("Query points should be packed as 3 doubles per point.");
+  }
+  std::vector<coal::Vec3f> queryPoints(queries.length() / pointSize);
+  const CORBA::Octet* data = queries.get_buffer();
+  for (std::size_t idx = 0; idx < queryPoints.size(); idx++) {
+    for (std::size_t i = 0; i < 3; i++) {
+      data = unpackDouble(data, queryPoints[idx][i]);
+    }
+  }
+  std::vector<AffordanceIndex::Nearest> nearest;
+  index_.nearest(
+      affordance, queryPoints,
+      maxDistance < 0 ? std::numeric_limits<double>::infinity() : maxDistance,
+      nearest);
+
+  typedef hpp::corbaserver::affordance::ByteSeq ByteSeq;
+  hpp::corbaserver::affordance::ByteSeq_var nearestPoints = new ByteSeq();
+  hpp::corbaserver::affordance::ByteSeq_var nearestNormals = new ByteSeq();
+  hpp::corbaserver::affordance::ByteSeq_var nearestDistances = new ByteSeq();
+  nearestPoints->length((CORBA::ULong)(nearest.size() * pointSize));
+  nearestNormals->length((CORBA::ULong)(nearest.size() * pointSize));
+  nearestDistances->length((CORBA::ULong)(nearest.size() * sizeof(double)));
+  hpp::intSeq_var objectIndices = new hpp::intSeq();
+  objectIndices->length((CORBA::ULong)nearest.size());
+  std::map<const std::string*, CORBA::Long> nameIndices;
+  std::vector<std::string> objectNames;
+  CORBA::Octet* pointData = nearestPoints->get_buffer();
+  CORBA::Octet* normalData = nearestNormals->get_buffer();
+  CORBA::Octet* distanceData = nearestDistances->get_buffer();
+  for (std::size_t idx = 0; idx < nearest.size(); idx++) {
+    const AffordanceIndex::Nearest& res = nearest[idx];
+    CORBA::Long objectIdx = -1;
+    coal::Vec3f point(coal::Vec3f::Zero()), normal(coal::Vec3f::Zero());
+    if (res.name != NULL) {
+      std::map<const std::string*, CORBA::Long>::const_iterator it =
+          nameIndices.find(res.name);
+      if (it == nameIndices.end()) {
+        objectIdx = (CORBA::Long)objectNames.size();
+        nameIndices[res.name] = objectIdx;
+        objectNames.push_back(*res.name);
+      } else {
+        objectIdx = it->second;
+      }
+      point = res.point;
+      normal = res.normal;
+    }
+    for (std::size_t i = 0; i < 3; i++) {
+      pointData = packDouble(point[i], pointData);
+      normalData = packDouble(normal[i], normalData);
+    }
+    distanceData = packDouble(res.distance, distanceData);
+    objectIndices[(CORBA::ULong)idx] = objectIdx;
+  }
+  points = nearestPoints._retn();
+  normals = nearestNormals._retn();
+  distances = nearestDistances._retn();
+  objects = objectIndices._retn();
+  names = fromStringVector(objectNames);
+}
+
+void Afford::recordChange(bool added, const std::string& type,
+                          const std::string& name) {
+  Change change;
+  change.generation = generation_;
+  change.added = added;
+  change.type = type;
+  change.name = name;
+  journal_.push_back(change);
+  while (journal_.size() > maxJournalSize) {
+    journalStart_ = journal_.front().generation;
+    journal_.pop_front();
+  }
+}
+
+hpp::corbaserver::affordance::AffordanceDelta* Afford::getAffordanceChanges(
+    CORBA::ULongLong generation) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::vector<std::string> removedTypes, removedNames, addedTypes, addedNames;
+  bool reset = generation < journalStart_ || generation > generation_;
+  if (reset) {
+    for (std::map<std::string, AffordanceObjects_t>::const_iterator kit =
+             problemSolver()->affordanceObjects.map.begin();
+         kit != problemSolver()->affordanceObjects.map.end(); ++kit) {
+      for (std::size_t objIdx = 0; objIdx < kit->second.size(); objIdx++) {
+        addedTypes.push_back(kit->first);
+        addedNames.push_back(kit->second[objIdx].first);
+      }
+    }
+  } else {
+    // net effect of the changes on each object: whether it existed before
+    // the first change and whether it exists after the last one.
+    struct State {
+      std::string type;
+      bool existed;
+      bool exists;
+    };
+    std::map<std::string, State> states;
+    std::vector<std::string> order;
+    for (std::deque<Change>::const_iterator it = journal_.begin();
+         it != journal_.end(); ++it) {
+      if (it->generation <= generation) continue;
+      std::map<std::string, State>::iterator state = states.find(it->name);
+      if (state == states.end()) {
+        State newState = {it->type, !it->added, it->added};
+        states.insert(std::make_pair(it->name, newState));
+        order.push_back(it->name);
+      } else {
+        state->second.exists = it->added;
+      }
+    }
+    for (std::size_t idx = 0; idx < order.size(); idx++) {
+      const State& state = states[order[idx]];
+      if (state.existed) {
+        removedTypes.push_back(state.type);
+        removedNames.push_back(order[idx]);
+      }
+      if (state.exists) {
+        addedTypes.push_back(state.type);
+        addedNames.push_back(order[idx]);
+      }
+    }
+  }
+  // find the added objects
+  std::map<std::string, const coal::CollisionObject*> current;
+  std::set<std::string> types(addedTypes.begin(), addedTypes.end());
+  for (std::set<std::string>::const_iterator type = types.begin();
+       type != types.end(); ++type) {
+    if (!problemSolver()->affordanceObjects.has(*type)) continue;
+    const AffordanceObjects_t& affs =
+        problemSolver()->affordanceObjects.get(*type);
+    for (std::size_t objIdx = 0; objIdx < affs.size(); objIdx++) {
+      current[affs[objIdx].first] = affs[objIdx].second->fcl();
+    }
+  }
+  std::vector<const coal::CollisionObject*> objects;
+  for (std::size_t idx = 0; idx < addedNames.size(); idx++) {
+    std::map<std::string, const coal::CollisionObject*>::const_iterator it =
+        current.find(addedNames[idx]);
+    if (it == current.end()) {
+      throw Error(
+          ("Affordance object " + addedNames[idx] + " not found.").c_str());
+    }
+    objects.push_back(it->second);
+  }
+
+  hpp::corbaserver::affordance::AffordanceDelta_var delta =
+      new hpp::corbaserver::affordance::AffordanceDelta();
+  delta->generation = generation_;
+  delta->reset = reset;
+  hpp::Names_t_var names = fromStringVector(removedTypes);
+  delta->removedTypes = names.in();
+  names = fromStringVector(removedNames);
+  delta->removedNames = names.in();
+  names = fromStringVector(addedTypes);
+  delta->addedTypes = names.in();
+  names = fromStringVector(addedNames);
+  delta->addedNames = names.in();
+  packObjects(objects, delta->addedPoints, delta->addedOffsets);
+  return delta._retn();
+}
+
 hpp::Names_t* fromStringVector(const std::vector<std::string>& input) {
   CORBA::ULong size = (CORBA::ULong)input.size();
   char** nameList = hpp::Names_t::allocbuf(size);
@@ -366,6 +2094,8 @@ hpp::Names_t* fromStringVector(const std::vector<std::string>& input) {
 }
 
 hpp::Names_t* Afford::getAffRefObstacles(const char* affordance) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  StageTimer timer(statistics_, Statistics::Marshalling);
   std::vector<std::string> objList;
   if (!problemSolver()->affordanceObjects.has(std::string(affordance))) {
     throw hpp::Error(
@@ -380,10 +2110,36 @@ hpp::Names_t* Afford::getAffRefObstacles(const char* affordance) {
     objList.push_back(affObjs[affIdx].first);
   }
   hpp::Names_t* objListPtr = fromStringVector(objList);
+  timer.addObjects(objList.size());
   return objListPtr;
 }
 
+hpp::corbaserver::affordance::StageStatisticsSeq* Afford::getStatistics() {
+  hpp::corbaserver::affordance::StageStatisticsSeq_var stats =
+      new hpp::corbaserver::affordance::StageStatisticsSeq();
+  stats->length(Statistics::NbStages);
+  for (CORBA::ULong stageIdx = 0; stageIdx < Statistics::NbStages; stageIdx++) {
+    const Statistics::Stage stage = (Statistics::Stage)stageIdx;
+    const Statistics::Counters counters = statistics_.get(stage);
+    hpp::corbaserver::affordance::StageStatistics& stat = stats[stageIdx];
+    stat.name = CORBA::string_dup(Statistics::name(stage));
+    stat.calls = counters.calls;
+    stat.time = counters.time;
+    stat.maxTime = counters.maxTime;
+    stat.triangles = counters.triangles;
+    stat.objects = counters.objects;
+  }
+  return stats._retn();
+}
+
+void Afford::resetStatistics() { statistics_.reset(); }
+
+void Afford::setStatisticsEnabled(CORBA::Boolean enabled) {
+  statistics_.setEnabled(enabled);
+}
+
 hpp::Names_t* Afford::getAffordanceTypes() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   std::vector<std::string> affTypes =
       problemSolver()->affordanceObjects.getKeys<std::vector<std::string> >();
   if (affTypes.empty()) {
@@ -394,6 +2150,7 @@ hpp::Names_t* Afford::getAffordanceTypes() {
 }
 
 hpp::Names_t* Afford::getAffordanceConfigTypes() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
   std::vector<std::string> affTypes =
       problemSolver()->affordanceConfigs.getKeys<std::vector<std::string> >();
   if (affTypes.empty()) {
@@ -13,11 +13,30 @@
 #include <coal/BVH/BVH_model.h>
 #include <omniORB4/CORBA.h>
 
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <deque>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <set>
+#include <string>
+#include <thread>
+#include <vector>
+
 #include "affordance-idl.hh"
+#include "affordance-index.hh"
+#include "affordance-registry.hh"
+#include "affordance-types.hh"
+#include "analysis-cache.hh"
 #include "hpp/corbaserver/affordance/fwd.hh"
 #include "hpp/corbaserver/affordance/server.hh"
 #include "hpp/corbaserver/problem-solver-map.hh"
 #include "hpp/core/problem-solver.hh"
+#include "mesh-cache.hh"
+#include "reduction-cache.hh"
+#include "statistics.hh"
 
 namespace hpp {
 namespace affordanceCorba {
@@ -30,10 +49,34 @@ class Afford : public virtual POA_hpp::corbaserver::affordance::Afford {
 
   Afford(const core::ProblemSolverPtr_t& problemSolver);
 
+  /// Cancel and wait for the analyses running in the background.
+  ~Afford();
+
   void resetAffordanceConfig();
 
+  /// Create the operations of the configured affordance types.
+  ///
+  /// The predefined types come first, then the types defined by
+  /// addAffordanceType in the order of their definition.
   affordance::OperationBases_t createOperations();
 
+  /// Create the operation of an affordance type for a configuration.
+  ///
+  /// \param affType affordance type,
+  /// \param conf error margin, angle margin for neighbouring triangles and
+  ///        minimum area.
+  affordance::OperationBasePtr_t createOperation(const std::string& affType,
+                                                 const vector3_t& conf);
+
+  void addAffordanceType(const char* affType, const char* requirement,
+                         const hpp::doubleSeq& normal,
+                         const hpp::doubleSeq& conf);
+
+  void removeAffordanceType(const char* affType);
+
+  char* getAffordanceTypeDefinition(const char* affType,
+                                    hpp::doubleSeq_out normal);
+
   void setAffordanceConfig(const char* affType, const hpp::doubleSeq& conf);
 
   hpp::doubleSeq* getAffordanceConfig(const char* affType);
@@ -51,31 +94,389 @@ class Afford : public virtual POA_hpp::corbaserver::affordance::Afford {
       const char* obstacleName, const affordance::OperationBases_t& operations,
       std::vector<double> reduceSizes = std::vector<double>());
 
+  /// Obstacle as it was when its analysis started.
+  ///
+  /// The collision object is a copy of that of the obstacle, sharing its
+  /// geometry, so that the obstacle can be moved or removed while it is
+  /// analysed in the background.
+  struct ObstacleSnapshot {
+    std::string name;
+    std::shared_ptr<const coal::CollisionObject> object;
+    /// hash of the geometry and global pose of the obstacle.
+    uint64_t geometry;
+  };  // struct ObstacleSnapshot
+
+  typedef std::vector<ObstacleSnapshot> ObstacleSnapshots_t;
+
+  static ObstacleSnapshot snapshot(
+      const hpp::pinocchio::CollisionObjectPtr_t& obstacle);
+
+  /// Run the affordance analysis of an obstacle and return the affordance
+  /// objects found for each operation.
+  ///
+  /// Does not access the problem solver, so that different obstacles can be
+  /// analysed concurrently, and in the background. Results are read from
+  /// and written to the analysis cache, if enabled.
+  /// \retval analysis if not NULL, the unreduced analysis, that refers to
+  ///         the collision object of the snapshot. Null if the affordance
+  ///         objects were read from the analysis cache.
+  std::vector<affordance::CollisionObjects_t> computeAffordances(
+      const ObstacleSnapshot& obstacle,
+      const affordance::OperationBases_t& operations,
+      std::vector<double> reduceSizes,
+      affordance::SemanticsDataPtr_t* analysis = NULL);
+
   void analyseObject(const char* obstacleName,
                      const hpp::doubleSeq& reduceSizesCorba);
 
+  hpp::corbaserver::affordance::AffordanceSweepResults* sweepAffordanceConfig(
+      const char* affType, const hpp::floatSeqSeq& configs,
+      CORBA::Double reduceSize, CORBA::Boolean withGeometry);
+
+  hpp::intSeq* analyseObjects(const hpp::Names_t& obstacleNames,
+                              const hpp::doubleSeq& reduceSizesCorba);
+
   void analyseAll(const hpp::doubleSeq& reduceSizesCorba);
 
+  hpp::Names_t* analyseAllIncremental(const hpp::doubleSeq& reduceSizesCorba);
+
+  CORBA::ULong startAnalyseAll(const hpp::doubleSeq& reduceSizesCorba);
+
+  CORBA::ULong startAnalyseObject(const char* obstacleName,
+                                  const hpp::doubleSeq& reduceSizesCorba);
+
+  CORBA::Boolean pollAnalysis(CORBA::ULong job);
+
+  CORBA::Boolean waitAnalysis(CORBA::ULong job, CORBA::Double timeout);
+
+  hpp::corbaserver::affordance::AnalysisProgress* getAnalysisProgress();
+
+  void cancelAnalysis();
+
+  void setAnalysisCache(const char* directory, CORBA::ULongLong maxSize);
+
+  void clearAnalysisCache();
+
+  hpp::Names_t* loadAffordanceFile(const char* filename);
+
+  void setNumberOfThreads(CORBA::ULong nbThreads);
+
+  CORBA::ULong getNumberOfThreads();
+
+  CORBA::ULongLong getGeneration();
+
+  hpp::corbaserver::affordance::AffordanceDelta* getAffordanceChanges(
+      CORBA::ULongLong generation);
+
   void deleteAffordancesByType(const char* affordance,
                                const char* obstacleName);
 
   void deleteAffordances(const char* obstacleName);
 
-  void addAffObjects(const affordance::OperationBases_t& ops,
+  void deleteAffordancesForObstacles(const hpp::Names_t& obstacleNames);
+
+  CORBA::Boolean updateObstaclePose(const char* obstacleName);
+
+  void publishAffordances(const char* name);
+
+  void unpublishAffordances(const char* name);
+
+  hpp::Names_t* getPublishedAffordances();
+
+  void attachAffordances(const char* name);
+
+  void detachAffordances();
+
+  /// Add the affordance objects found for an obstacle to the problem
+  /// solver.
+  ///
+  /// \param types affordance type of the objects of each operation,
+  /// \param reduceSizes, pose reduce sizes of the analysis and pose of the
+  ///        obstacle when it was analysed, recorded for
+  ///        updateObstaclePose.
+  void addAffObjects(const std::vector<std::string>& types,
                      const std::vector<affordance::CollisionObjects_t>& affObjs,
-                     const char* obstacleName);
+                     const char* obstacleName,
+                     const std::vector<double>& reduceSizes,
+                     const coal::Transform3s& pose);
 
   hpp::doubleSeqSeqSeqSeq* getAffordancePoints(const char* affordance);
 
+  void getAffordancePointsPacked(
+      const char* affordance, hpp::corbaserver::affordance::ByteSeq_out points,
+      hpp::intSeq_out offsets);
+
+  void getReducedAffordancePoints(
+      const char* affordance, CORBA::Double reduceSize,
+      hpp::corbaserver::affordance::ByteSeq_out points, hpp::intSeq_out offsets,
+      hpp::Names_t_out obstacleNames);
+
+  void setReductionCacheSize(CORBA::ULongLong maxTriangles);
+
+  char* getAffordancePointsChunk(
+      const char* affordance, const char* token, CORBA::ULong maxObjects,
+      CORBA::ULong maxTriangles,
+      hpp::corbaserver::affordance::ByteSeq_out points, hpp::intSeq_out offsets,
+      hpp::Names_t_out names, CORBA::Long& firstTriangle);
+
+  void getAffordancePolygons(const char* affordance, CORBA::Double tolerance,
+                             hpp::corbaserver::affordance::ByteSeq_out points,
+                             hpp::intSeq_out loops, hpp::intSeq_out objects,
+                             hpp::corbaserver::affordance::ByteSeq_out normals);
+
+  void getAffordancesInBox(const char* affordance, const hpp::doubleSeq& lower,
+                           const hpp::doubleSeq& upper, hpp::Names_t_out names,
+                           hpp::corbaserver::affordance::ByteSeq_out points,
+                           hpp::intSeq_out offsets);
+
+  void getAffordancesInSphere(const char* affordance,
+                              const hpp::doubleSeq& center,
+                              CORBA::Double radius, hpp::Names_t_out names,
+                              hpp::corbaserver::affordance::ByteSeq_out points,
+                              hpp::intSeq_out offsets);
+
+  void getNearestAffordancePoints(
+      const char* affordance,
+      const hpp::corbaserver::affordance::ByteSeq& queries,
+      CORBA::Double maxDistance,
+      hpp::corbaserver::affordance::ByteSeq_out points,
+      hpp::corbaserver::affordance::ByteSeq_out normals,
+      hpp::corbaserver::affordance::ByteSeq_out distances,
+      hpp::intSeq_out objects, hpp::Names_t_out names);
+
   hpp::Names_t* getAffRefObstacles(const char* affordance);
 
+  hpp::corbaserver::affordance::StageStatisticsSeq* getStatistics();
+
+  void resetStatistics();
+
+  void setStatisticsEnabled(CORBA::Boolean enabled);
+
   hpp::Names_t* getAffordanceTypes();
 
   hpp::Names_t* getAffordanceConfigTypes();
 
  private:
   Server* server_;
+  /// Number of threads used to analyse obstacles, 0 for one per core.
+  std::atomic<std::size_t> nbThreads_;
+  /// Serializes the servant calls, which run concurrently under a
+  /// multi-threaded ORB, and the registration of the results of the
+  /// background analyses. Background analyses do not take it, since they
+  /// only read snapshots of the obstacles.
+  std::recursive_mutex mutex_;
   core::ProblemSolverPtr_t problemSolver() { return server_->problemSolver(); }
+
+  /// Addition or removal of an affordance object.
+  struct Change {
+    /// generation of the affordances after the change.
+    CORBA::ULongLong generation;
+    bool added;
+    std::string type;
+    std::string name;
+  };  // struct Change
+
+  /// Affordance analysis running in the background.
+  struct Job {
+    /// whether the affordance objects of all obstacles are replaced, or
+    /// only those of the analysed obstacles.
+    bool all;
+    ObstacleSnapshots_t obstacles;
+    /// fingerprints_ of the obstacles when the job started: the results of
+    /// obstacles analysed again in the meantime are dropped.
+    std::map<std::string, uint64_t> fingerprints;
+    affordance::OperationBases_t operations;
+    std::vector<double> reduceSizes;
+    /// affordance objects found for each obstacle.
+    std::vector<std::vector<affordance::CollisionObjects_t> > affObjs;
+    /// unreduced analysis of each obstacle, see analyseObstacles.
+    std::vector<affordance::SemanticsDataPtr_t> analyses;
+    /// whether each obstacle was analysed, see analyseObstacles.
+    std::vector<char> analysed;
+    /// whether all obstacles were analysed.
+    bool complete;
+    /// error message, if the analysis failed.
+    std::string error;
+    bool done;
+    std::thread thread;
+  };  // struct Job
+
+  typedef std::shared_ptr<Job> JobPtr_t;
+
+  /// Run the analysis of a job in a new thread and return its identifier.
+  CORBA::ULong startJob(const JobPtr_t& job);
+
+  /// Wait for a job to finish and register its affordance objects.
+  ///
+  /// The results of the obstacles that were removed, moved or analysed
+  /// again since the job started are dropped.
+  /// \param timeout maximal waiting time in seconds, negative to wait
+  ///        until the job is finished.
+  /// \return whether the job is finished.
+  bool finishJob(CORBA::ULong jobId, double timeout);
+
+  /// Analyse obstacles concurrently, publishing the progress.
+  ///
+  /// Stops analysing obstacles when cancelAnalysis is called.
+  /// \retval affObjs affordance objects found for each obstacle,
+  /// \retval analyses unreduced analysis of each obstacle, see
+  ///         computeAffordances,
+  /// \retval analysed whether each obstacle was analysed.
+  /// \return whether all obstacles were analysed.
+  bool analyseObstacles(
+      const ObstacleSnapshots_t& obstacles,
+      const affordance::OperationBases_t& operations,
+      const std::vector<double>& reduceSizes,
+      std::vector<std::vector<affordance::CollisionObjects_t> >& affObjs,
+      std::vector<affordance::SemanticsDataPtr_t>& analyses,
+      std::vector<char>& analysed);
+
+  /// Add the affordance objects found for the analysed obstacles to the
+  /// problem solver.
+  ///
+  /// The objects of all obstacles are added to affordanceObjects at once,
+  /// in the order in which addAffObjects would add them one obstacle after
+  /// the other. The unreduced analyses are kept for
+  /// getReducedAffordancePoints.
+  void registerAffordances(
+      const ObstacleSnapshots_t& obstacles,
+      const affordance::OperationBases_t& operations,
+      const std::vector<double>& reduceSizes,
+      const std::vector<std::vector<affordance::CollisionObjects_t> >& affObjs,
+      const std::vector<affordance::SemanticsDataPtr_t>& analyses,
+      const std::vector<char>& analysed);
+
+  /// Add the affordance objects found for an obstacle to the problem solver
+  /// as obstacles, without adding them to affordanceObjects.
+  ///
+  /// \param objs list of objects of each affordance type, the objects of
+  ///        the obstacle are appended to,
+  /// see addAffObjects for the other parameters.
+  void registerAffObjects(
+      const std::vector<std::string>& types,
+      const std::vector<affordance::CollisionObjects_t>& affObjs,
+      const char* obstacleName, const std::vector<double>& reduceSizes,
+      const coal::Transform3s& pose,
+      std::vector<hpp::core::AffordanceObjects_t>& objs, StageTimer& timer);
+
+  /// Insert objects in front of the affordance objects of each type.
+  void mergeAffObjects(const std::vector<std::string>& types,
+                       const std::vector<hpp::core::AffordanceObjects_t>& objs);
+
+  /// Progress of the last analysis started.
+  struct Progress {
+    Progress()
+        : analysis(0),
+          running(false),
+          cancelled(false),
+          nbObstacles(0),
+          nbTriangles(0),
+          elapsed(0) {}
+
+    /// identifier of the analysis.
+    std::size_t analysis;
+    bool running;
+    bool cancelled;
+    std::size_t nbObstacles;
+    std::size_t nbTriangles;
+    /// names of the analysed obstacles and durations of their analyses.
+    std::vector<std::string> obstacles;
+    std::vector<double> durations;
+    std::chrono::steady_clock::time_point start;
+    /// duration of the analysis, once finished.
+    double elapsed;
+  };  // struct Progress
+
+  /// Reset the progress for a new analysis and return its identifier.
+  std::size_t startProgress(std::size_t nbObstacles);
+
+  /// Record that an obstacle was analysed.
+  void reportProgress(std::size_t analysis, const ObstacleSnapshot& obstacle,
+                      double duration);
+
+  void finishProgress(std::size_t analysis, bool cancelled);
+
+  /// Record that the affordance configurations or objects changed.
+  ///
+  /// Must be called before recording the changes of the affordance objects.
+  void bumpGeneration() { ++generation_; }
+
+  /// Record the addition or removal of an affordance object in the journal.
+  void recordChange(bool added, const std::string& type,
+                    const std::string& name);
+
+  /// Remove the affordance objects of obstacle from the problem solver.
+  void eraseAffordancesOf(const std::string& obstacleName);
+
+  /// Remove the affordance objects of obstacles from the problem solver.
+  void eraseAffordancesOf(const std::vector<std::string>& obstacleNames);
+
+  /// Remove the affordance objects of a type with given names, in a single
+  /// pass over the objects of the type.
+  void eraseAffordanceObjects(const std::string& type,
+                              const std::set<std::string>& names);
+
+  /// Remove all affordance objects from the problem solver.
+  void eraseAllAffordances();
+
+  /// Record an affordance object added to the problem solver as obstacle
+  /// name, in the journal, the owned objects and the spatial index.
+  ///
+  /// \param obstacleName obstacle the object was extracted from, or an empty
+  ///        string if unknown.
+  hpp::pinocchio::CollisionObjectPtr_t registerAffordanceObject(
+      const std::string& type, const std::string& name,
+      const std::string& obstacleName);
+
+  /// Names of the affordance objects of each type, for each analysed
+  /// obstacle.
+  typedef std::map<std::string, std::map<std::string, std::set<std::string> > >
+      Owned_t;
+  Owned_t owned_;
+  /// Fingerprint of the last analysis of each analysed obstacle.
+  std::map<std::string, uint64_t> fingerprints_;
+  /// Pose of an analysed obstacle when its affordance objects were found,
+  /// and reduce sizes of the analysis.
+  struct AnalysedPose {
+    coal::Transform3s pose;
+    std::vector<double> reduceSizes;
+  };  // struct AnalysedPose
+  /// Analysed pose of each obstacle, see updateObstaclePose.
+  std::map<std::string, AnalysedPose> poses_;
+  /// On-disk cache of analysis results.
+  AnalysisCache cache_;
+  /// Preprocessed triangles of the analysed obstacles.
+  MeshCache meshes_;
+  /// Unreduced analyses of the obstacles and reduced affordance objects,
+  /// see getReducedAffordancePoints.
+  ReductionCache reductions_;
+  /// Timers and counters of the stages of the analysis.
+  Statistics statistics_;
+  /// Spatial index of the affordance objects.
+  AffordanceIndex index_;
+  /// Published affordance set attached to the context, if any.
+  PublishedAffordancesPtr_t attached_;
+  /// Affordance types defined by addAffordanceType, in the order of their
+  /// definition.
+  std::vector<std::pair<std::string, AffordanceType> > types_;
+  /// Number of modifications of the affordance configurations and objects.
+  CORBA::ULongLong generation_;
+  /// Analyses running in the background, or finished and not yet
+  /// registered, by identifier.
+  std::map<CORBA::ULong, JobPtr_t> jobs_;
+  CORBA::ULong nextJob_;
+  /// Protects jobs_ and the done flag of the jobs.
+  std::mutex jobsMutex_;
+  /// Notified when a job finishes.
+  std::condition_variable jobFinished_;
+  /// Number of calls to cancelAnalysis.
+  std::atomic<std::size_t> cancelCount_;
+  Progress progress_;
+  std::mutex progressMutex_;
+  /// Last changes of the affordance objects, in chronological order.
+  std::deque<Change> journal_;
+  /// Generation since which all changes are in the journal.
+  CORBA::ULongLong journalStart_;
 };  // class Afford
 }  // namespace impl
 }  // namespace affordanceCorba
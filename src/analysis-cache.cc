@@ -0,0 +1,151 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "analysis-cache.hh"
+
+#include <dirent.h>
+#include <errno.h>
+#include <sys/stat.h>
+#include <sys/time.h>
+
+#include <algorithm>
+#include <cstdio>
+#include <hpp/util/debug.hh>
+#include <stdexcept>
+
+#include "affordance-file.hh"
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+const std::string extension = ".aff";
+
+struct CachedFile {
+  std::string path;
+  uint64_t size;
+  struct timespec lastUse;
+
+  bool operator<(const CachedFile& other) const {
+    if (lastUse.tv_sec != other.lastUse.tv_sec) {
+      return lastUse.tv_sec < other.lastUse.tv_sec;
+    }
+    return lastUse.tv_nsec < other.lastUse.tv_nsec;
+  }
+};  // struct CachedFile
+
+std::vector<CachedFile> listCachedFiles(const std::string& directory) {
+  std::vector<CachedFile> files;
+  DIR* dir = opendir(directory.c_str());
+  if (dir == NULL) return files;
+  for (struct dirent* entry = readdir(dir); entry != NULL;
+       entry = readdir(dir)) {
+    std::string name(entry->d_name);
+    if (name.size() <= extension.size() ||
+        name.compare(name.size() - extension.size(), extension.size(),
+                     extension) != 0) {
+      continue;
+    }
+    CachedFile file;
+    file.path = directory + "/" + name;
+    struct stat st;
+    if (stat(file.path.c_str(), &st) != 0) continue;
+    file.size = (uint64_t)st.st_size;
+    file.lastUse = st.st_mtim;
+    files.push_back(file);
+  }
+  closedir(dir);
+  return files;
+}
+}  // namespace
+
+AnalysisCache::AnalysisCache() : enabled_(false), maxSize_(0) {}
+
+void AnalysisCache::configure(const std::string& directory, uint64_t maxSize) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (!directory.empty()) {
+    if (mkdir(directory.c_str(), 0755) != 0 && errno != EEXIST) {
+      throw std::runtime_error("Unable to create cache directory " + directory);
+    }
+    struct stat st;
+    if (stat(directory.c_str(), &st) != 0 || !S_ISDIR(st.st_mode)) {
+      throw std::runtime_error(directory + " is not a directory");
+    }
+  }
+  directory_ = directory;
+  enabled_ = !directory_.empty();
+  maxSize_ = maxSize;
+  if (enabled_) evict();
+}
+
+bool AnalysisCache::load(uint64_t key, const std::vector<std::string>& types,
+                         std::vector<affordance::CollisionObjects_t>& objects) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (directory_.empty()) return false;
+  const std::string path = filename(key);
+  AffordanceRecords_t records;
+  try {
+    loadAffordanceFile(path, records);
+  } catch (const std::exception&) {
+    return false;
+  }
+  if (records.size() != 1 || records[0].types != types) {
+    hppDout(warning, "Ignoring inconsistent cached result " << path);
+    return false;
+  }
+  // mark the result as recently used
+  utimes(path.c_str(), NULL);
+  objects = records[0].objects;
+  return true;
+}
+
+void AnalysisCache::store(
+    uint64_t key, const std::vector<std::string>& types,
+    const std::vector<affordance::CollisionObjects_t>& objects) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (directory_.empty()) return;
+  AffordanceRecords_t records(1);
+  records[0].fingerprint = key;
+  records[0].types = types;
+  records[0].objects = objects;
+  try {
+    saveAffordanceFile(filename(key), records);
+  } catch (const std::exception& exc) {
+    hppDout(warning, "Unable to cache affordance analysis: " << exc.what());
+    return;
+  }
+  evict();
+}
+
+void AnalysisCache::clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (directory_.empty()) return;
+  std::vector<CachedFile> files = listCachedFiles(directory_);
+  for (std::size_t i = 0; i < files.size(); ++i) {
+    std::remove(files[i].path.c_str());
+  }
+}
+
+std::string AnalysisCache::filename(uint64_t key) const {
+  char name[17];
+  snprintf(name, sizeof(name), "%016llx", (unsigned long long)key);
+  return directory_ + "/" + name + extension;
+}
+
+void AnalysisCache::evict() {
+  std::vector<CachedFile> files = listCachedFiles(directory_);
+  uint64_t total = 0;
+  for (std::size_t i = 0; i < files.size(); ++i) total += files[i].size;
+  std::sort(files.begin(), files.end());
+  for (std::size_t i = 0; i < files.size() && total > maxSize_; ++i) {
+    if (std::remove(files[i].path.c_str()) == 0) total -= files[i].size;
+  }
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
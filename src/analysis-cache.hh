@@ -0,0 +1,83 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_ANALYSIS_CACHE_HH
+#define HPP_AFFORDANCE_CORBA_ANALYSIS_CACHE_HH
+
+#include <stdint.h>
+
+#include <atomic>
+#include <hpp/affordance/fwd.hh>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// On-disk cache of affordance analysis results.
+///
+/// Results are stored in the binary affordance format, one file per key in
+/// the cache directory. The key identifies the analysed mesh, its pose and
+/// the analysis settings. When the total size of the files exceeds the size
+/// limit, the least recently used results are evicted. Methods can be called
+/// concurrently.
+class AnalysisCache {
+ public:
+  /// Create a disabled cache.
+  AnalysisCache();
+
+  /// Set the cache directory and its size limit.
+  ///
+  /// The directory is created if it does not exist. An empty directory
+  /// disables the cache.
+  /// \param directory directory where results are stored,
+  /// \param maxSize maximal total size of the cached results in bytes.
+  void configure(const std::string& directory, uint64_t maxSize);
+
+  /// Whether a cache directory is set.
+  ///
+  /// Can be called without synchronization, e.g. before computing the key of
+  /// an analysis.
+  bool enabled() const { return enabled_; }
+
+  /// Load cached affordance objects.
+  ///
+  /// \param key identifier of the analysis,
+  /// \param types affordance type of each operation of the analysis,
+  /// \retval objects affordance objects found for each operation.
+  /// \return whether the result was found in the cache.
+  bool load(uint64_t key, const std::vector<std::string>& types,
+            std::vector<affordance::CollisionObjects_t>& objects);
+
+  /// Store affordance objects in the cache.
+  ///
+  /// Failures to write are ignored, the cache being only an optimization.
+  void store(uint64_t key, const std::vector<std::string>& types,
+             const std::vector<affordance::CollisionObjects_t>& objects);
+
+  /// Remove all cached results.
+  void clear();
+
+ private:
+  std::string filename(uint64_t key) const;
+
+  /// Remove least recently used files until the size limit is respected.
+  void evict();
+
+  std::string directory_;
+  /// whether directory_ is not empty, readable without taking mutex_.
+  std::atomic<bool> enabled_;
+  uint64_t maxSize_;
+  std::mutex mutex_;
+};  // class AnalysisCache
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_ANALYSIS_CACHE_HH
@@ -0,0 +1,55 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_HASHER_HH
+#define HPP_AFFORDANCE_CORBA_HASHER_HH
+
+#include <stdint.h>
+
+#include <cstddef>
+#include <string>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Incremental 64 bit FNV-1a hash.
+///
+/// Used to fingerprint obstacles and analysis settings, in order to detect
+/// which affordance analysis results are still valid.
+class Hasher {
+ public:
+  Hasher() : value_(14695981039346656037ULL) {}
+
+  Hasher& add(const void* data, std::size_t size) {
+    const unsigned char* bytes = static_cast<const unsigned char*>(data);
+    for (std::size_t i = 0; i < size; ++i) {
+      value_ ^= bytes[i];
+      value_ *= 1099511628211ULL;
+    }
+    return *this;
+  }
+
+  Hasher& add(const double& value) { return add(&value, sizeof(value)); }
+
+  Hasher& add(const uint64_t& value) { return add(&value, sizeof(value)); }
+
+  Hasher& add(const std::string& value) {
+    add((uint64_t)value.size());
+    return add(value.data(), value.size());
+  }
+
+  uint64_t value() const { return value_; }
+
+ private:
+  uint64_t value_;
+};  // class Hasher
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_HASHER_HH
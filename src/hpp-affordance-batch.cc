@@ -0,0 +1,248 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+// Offline affordance analysis of an environment.
+//
+// The environment is loaded as by Obstacle::loadObstacleModel, so that the
+// obstacles have the names and poses they get in a server, and each obstacle
+// is analysed with the preprocessing and operations of the affordance-corba
+// plugin. The affordance objects are written in the binary affordance file
+// format, to be loaded by Afford::loadAffordanceFile.
+
+#include <algorithm>
+#include <cerrno>
+#include <cstdlib>
+#include <exception>
+#include <hpp/affordance/affordance-extraction.hh>
+#include <hpp/core/problem-solver.hh>
+#include <hpp/pinocchio/collision-object.hh>
+#include <hpp/pinocchio/device.hh>
+#include <hpp/pinocchio/urdf/util.hh>
+#include <iostream>
+#include <list>
+#include <memory>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "affordance-file.hh"
+#include "affordance-types.hh"
+#include "mesh-cache.hh"
+
+using hpp::affordanceCorba::AffordanceRecord;
+using hpp::affordanceCorba::AffordanceRecords_t;
+using hpp::affordanceCorba::AffordanceType;
+
+namespace {
+const char* usage =
+    "Usage: hpp-affordance-batch [OPTION]... URDF PREFIX OUTPUT\n"
+    "Analyse the affordances of the obstacles of an environment and write\n"
+    "them to OUTPUT, in the binary affordance file format.\n"
+    "\n"
+    "URDF and PREFIX are the arguments of Obstacle::loadObstacleModel.\n"
+    "\n"
+    "Options:\n"
+    "  --config TYPE MARGIN NBTRIMARGIN MINAREA\n"
+    "      configuration of an affordance type, see "
+    "Afford::setAffordanceConfig.\n"
+    "  --type TYPE REQUIREMENT NX NY NZ MARGIN NBTRIMARGIN MINAREA\n"
+    "      define an affordance type, see Afford::addAffordanceType.\n"
+    "  --reduce-sizes SIZE[,SIZE]...\n"
+    "      reduce size of each affordance type, in the order of the "
+    "analysis.\n"
+    "  --help\n"
+    "      display this help.\n";
+
+// affordance type analysed, in the order of Afford::createOperations
+struct Type {
+  std::string name;
+  bool custom;
+  AffordanceType definition;
+  double margin;
+  double nbTriMargin;
+  double minArea;
+};  // struct Type
+
+double toDouble(const std::string& arg) {
+  char* end;
+  errno = 0;
+  double value = std::strtod(arg.c_str(), &end);
+  if (arg.empty() || *end != '\0' || errno != 0) {
+    throw std::invalid_argument("Invalid number " + arg);
+  }
+  return value;
+}
+
+// check that option args[idx] is followed by nb arguments
+void checkArguments(const std::vector<std::string>& args, std::size_t idx,
+                    std::size_t nb) {
+  if (idx + nb >= args.size()) {
+    std::ostringstream oss;
+    oss << args[idx] << " takes " << nb << " argument" << (nb > 1 ? "s" : "");
+    throw std::invalid_argument(oss.str());
+  }
+}
+
+Type& findType(std::vector<Type>& types, const std::string& name) {
+  for (std::size_t idx = 0; idx < types.size(); idx++) {
+    if (types[idx].name == name) return types[idx];
+  }
+  types.push_back(Type());
+  types.back().name = name;
+  types.back().custom = true;
+  return types.back();
+}
+
+AffordanceRecords_t analyse(const std::string& urdf, const std::string& prefix,
+                            const hpp::affordance::OperationBases_t& operations,
+                            const std::vector<double>& reduceSizes) {
+  std::unique_ptr<hpp::core::ProblemSolver> problemSolver(
+      hpp::core::ProblemSolver::create());
+  hpp::pinocchio::DevicePtr_t device(hpp::pinocchio::Device::create(prefix));
+  hpp::pinocchio::urdf::loadModel(device, 0, prefix, "anchor", urdf, "");
+  problemSolver->addObstacle(device, true, true);
+
+  std::vector<std::string> types;
+  for (std::size_t opIdx = 0; opIdx < operations.size(); opIdx++) {
+    types.push_back(operations[opIdx]->affordance_);
+  }
+  AffordanceRecords_t records;
+  const std::list<std::string> names = problemSolver->obstacleNames(true, true);
+  for (std::list<std::string>::const_iterator name = names.begin();
+       name != names.end(); ++name) {
+    hpp::pinocchio::CollisionObjectPtr_t obstacle =
+        problemSolver->obstacle(*name);
+    if (!hpp::affordanceCorba::isBVHModelTriangles(obstacle->fcl())) {
+      std::cerr << "Skipping " << *name << ": not a triangle mesh."
+                << std::endl;
+      continue;
+    }
+    hpp::affordanceCorba::PreprocessedMesh mesh(*obstacle->fcl());
+    hpp::affordance::SemanticsDataPtr_t aff =
+        mesh.analyse(obstacle->fcl(), operations);
+    AffordanceRecord record;
+    record.obstacleName = *name;
+    record.geometry =
+        hpp::affordanceCorba::geometryFingerprint(obstacle->fcl());
+    record.fingerprint = hpp::affordanceCorba::fingerprint(
+        record.geometry, operations, reduceSizes);
+    record.reduceSizes = reduceSizes;
+    record.types = types;
+    record.objects =
+        hpp::affordance::getReducedAffordanceObjects(aff, reduceSizes);
+    records.push_back(record);
+  }
+  return records;
+}
+}  // namespace
+
+int main(int argc, const char* argv[]) {
+  std::vector<Type> types;
+  for (std::size_t idx = 0; idx < hpp::affordanceCorba::nbPredefinedTypes;
+       idx++) {
+    const hpp::affordanceCorba::PredefinedType& predefined =
+        hpp::affordanceCorba::predefinedTypes[idx];
+    Type type;
+    type.name = predefined.name;
+    type.custom = false;
+    type.margin = predefined.margin;
+    type.nbTriMargin = predefined.nbTriMargin;
+    type.minArea = predefined.minArea;
+    types.push_back(type);
+  }
+  std::vector<double> reduceSizes;
+  std::vector<std::string> positional;
+  std::vector<std::string> defined;
+  try {
+    std::vector<std::string> args(argv + 1, argv + argc);
+    for (std::size_t idx = 0; idx < args.size(); idx++) {
+      const std::string& arg = args[idx];
+      if (arg == "--help") {
+        std::cout << usage;
+        return 0;
+      } else if (arg == "--config") {
+        checkArguments(args, idx, 4);
+        Type& type = findType(types, args[idx + 1]);
+        type.margin = toDouble(args[idx + 2]);
+        type.nbTriMargin = toDouble(args[idx + 3]);
+        type.minArea = toDouble(args[idx + 4]);
+        idx += 4;
+      } else if (arg == "--type") {
+        checkArguments(args, idx, 8);
+        const std::string name = args[idx + 1];
+        if (hpp::affordanceCorba::isPredefinedType(name)) {
+          throw std::invalid_argument("Affordance type " + name +
+                                      " is predefined and cannot be "
+                                      "redefined.");
+        }
+        Type& type = findType(types, name);
+        type.definition.requirement =
+            hpp::affordanceCorba::requirementFromString(args[idx + 2]);
+        type.definition.normal =
+            coal::Vec3f(toDouble(args[idx + 3]), toDouble(args[idx + 4]),
+                        toDouble(args[idx + 5]));
+        if (type.definition.normal.norm() < 1e-9) {
+          throw std::invalid_argument("Normal vector should not be null.");
+        }
+        type.definition.normal.normalize();
+        type.margin = toDouble(args[idx + 6]);
+        type.nbTriMargin = toDouble(args[idx + 7]);
+        type.minArea = toDouble(args[idx + 8]);
+        defined.push_back(name);
+        idx += 8;
+      } else if (arg == "--reduce-sizes") {
+        checkArguments(args, idx, 1);
+        std::istringstream sizes(args[++idx]);
+        std::string size;
+        while (std::getline(sizes, size, ',')) {
+          reduceSizes.push_back(toDouble(size));
+        }
+      } else if (arg.compare(0, 2, "--") == 0) {
+        throw std::invalid_argument("Unknown option " + arg);
+      } else {
+        positional.push_back(arg);
+      }
+    }
+    if (positional.size() != 3) {
+      throw std::invalid_argument("Expected URDF, PREFIX and OUTPUT");
+    }
+    for (std::size_t idx = 0; idx < types.size(); idx++) {
+      if (types[idx].custom && std::find(defined.begin(), defined.end(),
+                                         types[idx].name) == defined.end()) {
+        throw std::invalid_argument(
+            "Affordance type " + types[idx].name +
+            " is configured but not defined, see --type");
+      }
+    }
+  } catch (const std::exception& exc) {
+    std::cerr << "hpp-affordance-batch: " << exc.what() << "\n\n" << usage;
+    return 2;
+  }
+
+  try {
+    hpp::affordance::OperationBases_t operations;
+    for (std::size_t idx = 0; idx < types.size(); idx++) {
+      const Type& type = types[idx];
+      operations.push_back(hpp::affordanceCorba::createOperation(
+          type.name, type.custom ? &type.definition : NULL, type.margin,
+          type.nbTriMargin, type.minArea));
+    }
+    while (reduceSizes.size() < operations.size()) reduceSizes.push_back(0.);
+    AffordanceRecords_t records =
+        analyse(positional[0], positional[1], operations, reduceSizes);
+    hpp::affordanceCorba::saveAffordanceFile(positional[2], records);
+  } catch (const std::exception& exc) {
+    std::cerr << "hpp-affordance-batch: " << positional[0] << ": " << exc.what()
+              << std::endl;
+    return 1;
+  }
+  return 0;
+}
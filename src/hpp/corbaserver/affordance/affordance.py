@@ -17,10 +17,20 @@
 # <http://www.gnu.org/licenses/>.
 
 
+import re
+import threading
+from concurrent.futures import Future
+
+import numpy as np
 from hpp.corbaserver.client import Client as BasicClient
+from hpp_idl.hpp import Error
+from omniORB import CORBA
 
 from hpp.corbaserver.affordance.client import Client as AffClient
 
+# name of the affordance objects of an obstacle, see Afford::addAffObjects
+_affordanceObjectName = re.compile(r"(.*)aff\d+_\d+")
+
 
 class CorbaClient:
     """
@@ -36,6 +46,55 @@ class CorbaClient:
             self.affordance = AffClient(context=context, port=port)
 
 
+class AffordanceSet:
+    """
+    \\brief Local copy of the affordance objects of the server.
+
+     objects maps each affordance type to a dictionary that maps the names
+     of the affordance objects to their triangles, stored in an array of
+     shape (nbTriangles, 3, 3). generation is the generation of the server
+     affordances the copy corresponds to, None before the first update.
+     Use AffordanceTool.updateAffordanceSet to synchronise it.
+    """
+
+    def __init__(self):
+        self.generation = None
+        self.objects = {}
+
+    def applyDelta(self, delta):
+        """
+        \\brief Apply changes returned by the server.
+
+         \\param delta changes of the affordance objects, as returned by
+                AffordanceTool.getAffordanceChanges.
+         Returns the tuple (removed, added) of the lists of
+         (affordance type, name) of removed and added objects.
+        """
+        if delta.reset:
+            removed = [
+                (affType, name)
+                for affType, objects in self.objects.items()
+                for name in objects
+            ]
+            self.objects = {}
+        else:
+            removed = list(zip(delta.removedTypes, delta.removedNames))
+        for affType, name in removed:
+            objects = self.objects.get(affType, {})
+            objects.pop(name, None)
+            if not objects:
+                self.objects.pop(affType, None)
+        triangles = np.frombuffer(delta.addedPoints, dtype="<f8").reshape(-1, 3, 3)
+        offsets = delta.addedOffsets
+        added = list(zip(delta.addedTypes, delta.addedNames))
+        for idx, (affType, name) in enumerate(added):
+            self.objects.setdefault(affType, {})[name] = triangles[
+                offsets[idx] : offsets[idx + 1]
+            ]
+        self.generation = delta.generation
+        return removed, added
+
+
 class AffordanceTool:
     """
     \\brief Load and handle an AffordanceTool for analysis of the environment.
@@ -47,6 +106,17 @@ class AffordanceTool:
 
     def __init__(self, context=None, port=13331):
         self.client = CorbaClient(context, port=port)
+        # results of queries, valid as long as the server generation is
+        # self._generation
+        self._generation = None
+        self._queryCache = {}
+        # viewer nodes created for the affordance objects of each obstacle, by
+        # (affordance type, obstacle name) then affordance object name. The
+        # nodes of an obstacle are children of one group node, see
+        # _obstacleGroup.
+        self._viewerNodes = {}
+        # affordance types the group node of which exists in the viewer
+        self._viewerTypes = set()
 
     def removeObstacleFromJoint(self, objectName, jointName, collision, distance):
         """
@@ -80,7 +150,8 @@ class AffordanceTool:
 
          The configuration vector has size 3 and comprises the error margin,
          the angle margin for neighbouring triangles and the minimum area,
-         in that order.
+         in that order. Raises an error if affType is neither predefined nor
+         defined by addAffordanceType.
 
          \\param affType affordance type for which the change is made
          \\param conf configuration vector of size 3
@@ -127,6 +198,49 @@ class AffordanceTool:
         """
         return self.client.affordance.affordance.setMinimumArea(affType, minArea)
 
+    def addAffordanceType(self, affType, requirement, normal, config):
+        """
+        \\brief Define an affordance type and set its configuration.
+
+         All configured affordance types are found by a single analysis of
+         each obstacle. A triangle fulfilling the requirements of several
+         types belongs to the first one: Support, Lean, Support45, then the
+         types added by addAffordanceType in the order of their definition.
+
+         \\param affType name of the affordance type, other than Support,
+                Lean and Support45,
+         \\param requirement test of the normal n of the triangles against
+                normal: "parallel" (|n - normal|^2 < margin), "orthogonal"
+                (|n . normal| < margin) or "elevation" (same elevation as
+                normal up to margin, whatever the azimuth),
+         \\param normal reference normal in the world frame,
+         \\param config configuration vector of size 3, see
+                setAffordanceConfig.
+
+         For instance, surfaces a hand can brace against from below:
+         addAffordanceType("Ceiling", "parallel", [0, 0, -1], [0.3, 0.3, 0.05])
+        """
+        return self.client.affordance.affordance.addAffordanceType(
+            affType, requirement, list(normal), list(config)
+        )
+
+    def removeAffordanceType(self, affType):
+        """
+        \\brief Remove an affordance type from the analysis.
+
+         Predefined types are restored by resetAffordanceConfig.
+        """
+        return self.client.affordance.affordance.removeAffordanceType(affType)
+
+    def getAffordanceTypeDefinition(self, affType):
+        """
+        \\brief Get the requirement and reference normal of an affordance type
+         added by addAffordanceType.
+
+         Returns the tuple (requirement, normal).
+        """
+        return self.client.affordance.affordance.getAffordanceTypeDefinition(affType)
+
     def analyseAll(self, reduceSizes=[]):
         """
         \\brief Analyse all loaded obstacles in the problem solver.
@@ -137,9 +251,352 @@ class AffordanceTool:
          the borders of each affordances plans).
            The order of the value in the vector correspond to the order of the
            affordance type creation in affordance.impl.cc : Afford::createOperations ().
+         Obstacles are analysed concurrently when more than one thread is set
+         with setNumberOfThreads.
         """
         return self.client.affordance.affordance.analyseAll(reduceSizes)
 
+    def analyseAllIncremental(self, reduceSizes=[]):
+        """
+        \\brief Update the affordances of all loaded obstacles, analysing only
+         the obstacles that changed since their last analysis.
+
+         Obstacles are fingerprinted by their geometry, their global position,
+         the affordance configurations and reduceSizes. Only new obstacles and
+         obstacles whose fingerprint changed are analysed again, the affordance
+         objects of the other obstacles are kept. Affordance objects of
+         obstacles removed from the scene are deleted.
+         \\param reduceSizes see analyseAll.
+         \\return the names of the obstacles that were analysed.
+        """
+        return self.client.affordance.affordance.analyseAllIncremental(reduceSizes)
+
+    def analyseAllAsync(self, reduceSizes=[]):
+        """
+        \\brief Analyse all loaded obstacles in the background.
+
+         Works like analyseAll without blocking the caller, nor the other
+         clients of the server. The obstacles and affordance configurations
+         are read when the analysis starts, and the affordance objects are
+         added to problem solver when the returned future completes.
+         \\param reduceSizes see analyseAll.
+         \\return a concurrent.futures.Future, the result of which is None.
+                Use asyncio.wrap_future to await it in a coroutine.
+        """
+        job = self.client.affordance.affordance.startAnalyseAll(reduceSizes)
+        return self._analysisFuture(job)
+
+    def analyseObjectAsync(self, objectName, reduceSizes=[]):
+        """
+        \\brief Analyse one object by name in the background.
+
+         Works like analyseObject, see analyseAllAsync.
+         \\param objectName name of the object to analyse.
+         \\param reduceSizes see analyseAll.
+         \\return a concurrent.futures.Future, the result of which is None.
+        """
+        job = self.client.affordance.affordance.startAnalyseObject(
+            objectName, reduceSizes
+        )
+        return self._analysisFuture(job)
+
+    def _analysisFuture(self, job, period=1.0):
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def wait():
+            affordance = self.client.affordance.affordance
+            try:
+                while not affordance.waitAnalysis(job, period):
+                    pass
+            except Error as exc:
+                future.set_exception(exc)
+            except CORBA.SystemException as exc:
+                # the job would otherwise keep running in the server and
+                # never be forgotten: stop and collect it if still reachable
+                try:
+                    affordance.cancelAnalysis()
+                    affordance.waitAnalysis(job, -1)
+                except (CORBA.SystemException, Error):
+                    pass
+                future.set_exception(exc)
+            else:
+                future.set_result(None)
+
+        threading.Thread(target=wait, daemon=True).start()
+        return future
+
+    def getAnalysisProgress(self):
+        """
+        \\brief Get the progress of the last analysis started.
+
+         Can be called while an analysis runs, e.g. from another client or
+         with analyseAllAsync.
+         \\return a dictionary with keys running, cancelled, nbDone,
+                nbRemaining, nbTriangles (number of triangles of the
+                analysed obstacles), obstacles (names of the analysed
+                obstacles), durations (analysis time of each of them in
+                seconds) and elapsed (time since the start of the analysis,
+                or its duration once finished, in seconds).
+        """
+        progress = self.client.affordance.affordance.getAnalysisProgress()
+        return {
+            "running": progress.running,
+            "cancelled": progress.cancelled,
+            "nbDone": progress.nbDone,
+            "nbRemaining": progress.nbRemaining,
+            "nbTriangles": progress.nbTriangles,
+            "obstacles": list(progress.obstacles),
+            "durations": list(progress.durations),
+            "elapsed": progress.elapsed,
+        }
+
+    def cancelAnalysis(self):
+        """
+        \\brief Cancel the analyses that are running.
+
+         The analysis stops between obstacles: affordance objects of the
+         obstacles already analysed are registered, the other obstacles are
+         skipped, and the analysis raises an error.
+        """
+        return self.client.affordance.affordance.cancelAnalysis()
+
+    def setStatisticsEnabled(self, enabled=True):
+        """
+        \\brief Enable or disable the timers and counters of the analysis.
+
+         Disabled by default, in which case they cost nothing noticeable.
+        """
+        return self.client.affordance.affordance.setStatisticsEnabled(enabled)
+
+    def getStatistics(self):
+        """
+        \\brief Get the timers and counters of the stages of the analysis.
+
+         \\return a list of dictionaries, one per stage in the order they run,
+                with keys name, calls, time (total duration in seconds),
+                maxTime (longest call in seconds), triangles and objects
+                (numbers of triangles and affordance objects processed).
+        """
+        return [
+            {
+                "name": stat.name,
+                "calls": stat.calls,
+                "time": stat.time,
+                "maxTime": stat.maxTime,
+                "triangles": stat.triangles,
+                "objects": stat.objects,
+            }
+            for stat in self.client.affordance.affordance.getStatistics()
+        ]
+
+    def resetStatistics(self):
+        """
+        \\brief Reset the timers and counters of the stages of the analysis.
+        """
+        return self.client.affordance.affordance.resetStatistics()
+
+    def formatStatistics(self, statistics=None):
+        """
+        \\brief Format the timers and counters of the analysis as a table.
+
+         \\param statistics statistics returned by getStatistics. If None,
+                they are requested from the server.
+         \\return a string with one line per stage.
+        """
+        if statistics is None:
+            statistics = self.getStatistics()
+        lines = [
+            "{:<18}{:>8}{:>12}{:>12}{:>12}{:>12}{:>10}".format(
+                "stage",
+                "calls",
+                "time (ms)",
+                "mean (ms)",
+                "max (ms)",
+                "triangles",
+                "objects",
+            )
+        ]
+        for stat in statistics:
+            mean = stat["time"] / stat["calls"] if stat["calls"] else 0.0
+            lines.append(
+                "{:<18}{:>8}{:>12.3f}{:>12.3f}{:>12.3f}{:>12}{:>10}".format(
+                    stat["name"],
+                    stat["calls"],
+                    1e3 * stat["time"],
+                    1e3 * mean,
+                    1e3 * stat["maxTime"],
+                    stat["triangles"],
+                    stat["objects"],
+                )
+            )
+        return "\n".join(lines)
+
+    def setAnalysisCache(self, directory, maxSize=1 << 30):
+        """
+        \\brief Enable the on-disk cache of affordance analysis results.
+
+         Analysis results are stored in directory, keyed by the mesh content,
+         the pose of the obstacle, the affordance configurations and
+         reduceSizes, and are loaded instead of analysing the same obstacle
+         again, e.g. after a restart of the server.
+         \\param directory directory where results are stored, created if
+                needed. An empty string disables the cache.
+         \\param maxSize maximal total size of the cache in bytes. Least
+                recently used results are evicted when it is exceeded.
+        """
+        return self.client.affordance.affordance.setAnalysisCache(directory, maxSize)
+
+    def clearAnalysisCache(self):
+        """
+        \\brief Remove all results from the on-disk analysis cache.
+        """
+        return self.client.affordance.affordance.clearAnalysisCache()
+
+    def loadAffordanceFile(self, filename):
+        """
+        \\brief Load the affordance objects of a binary affordance file.
+
+         The file is written by hpp-affordance-batch, see batch.py. The
+         affordance objects of each obstacle of the file replace those of the
+         obstacle in the server. Raises an error, without loading anything, if
+         an obstacle of the file is missing or does not have the geometry or
+         pose it had when analysed. Returns the names of the obstacles of the
+         file.
+         \\param filename path of the affordance file.
+        """
+        return self.client.affordance.affordance.loadAffordanceFile(filename)
+
+    def setNumberOfThreads(self, nbThreads):
+        """
+        \\brief Set the number of threads used to analyse obstacles.
+
+         \\param nbThreads number of worker threads. 1 (default) runs the
+                analysis sequentially, 0 uses one thread per hardware core.
+        """
+        return self.client.affordance.affordance.setNumberOfThreads(nbThreads)
+
+    def getNumberOfThreads(self):
+        """
+        \\brief Get the number of threads used to analyse obstacles.
+        """
+        return self.client.affordance.affordance.getNumberOfThreads()
+
+    def getGeneration(self):
+        """
+        \\brief Get the generation of the affordances on the server.
+
+         The generation increases each time the affordance configurations or
+         the affordance objects are modified.
+        """
+        return self.client.affordance.affordance.getGeneration()
+
+    def getAffordanceChanges(self, generation):
+        """
+        \\brief Get the changes of the affordance objects since a generation.
+
+         Returns an AffordanceDelta structure. See the documentation of
+         the IDL for the description of its fields.
+
+         \\param generation generation of the affordances known to the caller.
+        """
+        return self.client.affordance.affordance.getAffordanceChanges(generation)
+
+    def updateAffordanceSet(self, affordanceSet):
+        """
+        \\brief Synchronise a local copy of the affordance objects with the
+         server.
+
+         Only the affordance objects added or removed since the last update
+         are transferred, unless the server no longer knows the changes, in
+         which case all affordance objects are.
+
+         \\param affordanceSet AffordanceSet to update.
+         Returns the tuple (removed, added) of the lists of
+         (affordance type, name) of removed and added objects.
+        """
+        if affordanceSet.generation is None:
+            # no generation known: force a full transfer
+            delta = self.getAffordanceChanges(2**64 - 1)
+        else:
+            delta = self.getAffordanceChanges(affordanceSet.generation)
+        return affordanceSet.applyDelta(delta)
+
+    def publishAffordances(self, name):
+        """
+        \\brief Publish the affordance objects of the context under a name.
+
+         Published sets are shared by all the contexts of the server, and can
+         be attached to other contexts with attachAffordances without
+         analysing the obstacles again.
+
+         \\param name name of the published set. An existing set of the same
+                name is replaced.
+        """
+        return self.client.affordance.affordance.publishAffordances(name)
+
+    def unpublishAffordances(self, name):
+        """
+        \\brief Remove a published affordance set.
+
+         Contexts the set is attached to keep its affordance objects.
+        """
+        return self.client.affordance.affordance.unpublishAffordances(name)
+
+    def getPublishedAffordances(self):
+        """
+        \\brief Get the names of the published affordance sets.
+        """
+        return self.client.affordance.affordance.getPublishedAffordances()
+
+    def attachAffordances(self, name):
+        """
+        \\brief Replace the affordance objects of the context by those of a
+         published set.
+
+         The geometries of the objects are shared with the published set,
+         which is never modified by the context.
+
+         \\param name name of the published set.
+        """
+        return self.client.affordance.affordance.attachAffordances(name)
+
+    def detachAffordances(self):
+        """
+        \\brief Remove the objects of the attached published set that are
+         still in the context.
+
+         Affordance objects found by later analyses are kept.
+        """
+        return self.client.affordance.affordance.detachAffordances()
+
+    def clearQueryCache(self):
+        """
+        \\brief Forget the results of previous queries, so that the next
+         queries request the affordances from the server again.
+
+         Results are otherwise reused as long as the affordances of the
+         server do not change, see getGeneration.
+        """
+        self._queryCache.clear()
+
+    def _cachedQuery(self, key, query, *args):
+        """
+        \\brief Call a query of the affordance server, reusing its previous
+         result if the affordances did not change since.
+
+         \\param key key identifying the query and its arguments,
+         \\param query function to call on a cache miss,
+         \\param args arguments of query.
+        """
+        generation = self.getGeneration()
+        if generation != self._generation:
+            self._queryCache.clear()
+            self._generation = generation
+        if key not in self._queryCache:
+            self._queryCache[key] = query(*args)
+        return self._queryCache[key]
+
     def analyseObject(self, objectName, reduceSizes):
         """
         \\biref Analyse one object by name
@@ -154,6 +611,60 @@ class AffordanceTool:
         """
         return self.client.affordance.affordance.analyseObject(objectName, reduceSizes)
 
+    def analyseObjects(self, objectNames, reduceSizes=[]):
+        """
+        \\brief Analyse several objects by name in a single call.
+
+         Found affordance objects are added to a container in problem solver.
+         Returns the number of affordance objects found for each object.
+
+         \\param objectNames names of the objects to analyse.
+         \\param reduceSizes see analyseObject.
+        """
+        return self.client.affordance.affordance.analyseObjects(
+            list(objectNames), reduceSizes
+        )
+
+    def sweepAffordanceConfig(
+        self, affType, configs, reduceSize=0.0, withGeometry=False
+    ):
+        """
+        \\brief Analyse the obstacles with several configurations of an
+         affordance type.
+
+         The affordance objects and configurations of the problem solver are
+         not modified. Returns a list with, for each configuration, a
+         dictionary with keys "config", "nbObjects", "nbTriangles" and
+         "area". If withGeometry is True, the dictionary also holds the
+         triangles and offsets of the affordance objects found, as returned
+         by getAffordancePointsPacked.
+
+         \\param affType the affordance type to analyse,
+         \\param configs list of configurations, each of size 3, see
+                setAffordanceConfig,
+         \\param reduceSize reduction applied to the affordance objects,
+         \\param withGeometry whether to return the affordance objects found.
+        """
+        configs = [list(config) for config in configs]
+        results = self.client.affordance.affordance.sweepAffordanceConfig(
+            affType, configs, reduceSize, withGeometry
+        )
+        summaries = []
+        for config, result in zip(configs, results):
+            summary = {
+                "config": config,
+                "nbObjects": result.nbObjects,
+                "nbTriangles": result.nbTriangles,
+                "area": result.area,
+            }
+            if withGeometry:
+                summary["triangles"] = np.frombuffer(
+                    result.points, dtype="<f8"
+                ).reshape(-1, 3, 3)
+                summary["offsets"] = np.asarray(result.offsets, dtype=np.intp)
+            summaries.append(summary)
+        return summaries
+
     def getAffordancePoints(self, affordanceType):
         """
         \\brief Get vertex points of all triangles of an affordance type.
@@ -168,7 +679,258 @@ class AffordanceTool:
          \\param affordanceType name of the affordance type for which
                 the triangle points will be provided.
         """
-        return self.client.affordance.affordance.getAffordancePoints(affordanceType)
+        return self._cachedQuery(
+            ("points", affordanceType),
+            self.client.affordance.affordance.getAffordancePoints,
+            affordanceType,
+        )
+
+    def getAffordancePointsPacked(self, affordanceType):
+        """
+        \\brief Get vertex points of all triangles of an affordance type as
+         NumPy arrays.
+
+          Packed counterpart of getAffordancePoints: the triangles are
+          transferred in a single buffer instead of nested lists. Returns a
+          tuple (triangles, offsets). triangles is a read-only array of shape
+          (nbTriangles, 3, 3) that holds the global position of the vertices
+          of all triangles and is built on the received buffer without copy.
+          offsets has size nbAffordanceObjects + 1, and the triangles of the
+          i-th affordance object are triangles[offsets[i]:offsets[i + 1]].
+          The order of the objects is the same as that returned by the
+          function getAffRefObstacles.
+
+         \\param affordanceType name of the affordance type for which
+                the triangle points will be provided.
+        """
+        return self._cachedQuery(
+            ("packedPoints", affordanceType),
+            self._getAffordancePointsPacked,
+            affordanceType,
+        )
+
+    def _getAffordancePointsPacked(self, affordanceType):
+        points, offsets = self.client.affordance.affordance.getAffordancePointsPacked(
+            affordanceType
+        )
+        triangles = np.frombuffer(points, dtype="<f8").reshape(-1, 3, 3)
+        offsets = np.asarray(offsets, dtype=np.intp)
+        # the arrays are shared by later calls until the affordances change
+        offsets.flags.writeable = False
+        return triangles, offsets
+
+    def getReducedAffordancePoints(self, affordanceType, reduceSize):
+        """
+        \\brief Get the triangles of the affordance objects of a type, reduced
+         by a size.
+
+          The server keeps the analysis of the analysed obstacles, and the
+          affordance objects reduced by each size are computed from that
+          analysis the first time the size is requested, then kept by the
+          server. Obstacles without a kept analysis, e.g. whose affordance
+          objects were loaded by loadAffordanceFile, are skipped. Returns a
+          tuple
+          (triangles, offsets, obstacleNames), triangles and offsets being
+          as returned by getAffordancePointsPacked, and obstacleNames the
+          name of the obstacle of each reduced object.
+
+         \\param affordanceType name of the affordance type,
+         \\param reduceSize size by which the borders of the affordance
+                objects are shrunk, see analyseAll.
+        """
+        return self._cachedQuery(
+            ("reducedPoints", affordanceType, reduceSize),
+            self._getReducedAffordancePoints,
+            affordanceType,
+            reduceSize,
+        )
+
+    def _getReducedAffordancePoints(self, affordanceType, reduceSize):
+        points, offsets, obstacleNames = (
+            self.client.affordance.affordance.getReducedAffordancePoints(
+                affordanceType, reduceSize
+            )
+        )
+        triangles = np.frombuffer(points, dtype="<f8").reshape(-1, 3, 3)
+        offsets = np.asarray(offsets, dtype=np.intp)
+        offsets.flags.writeable = False
+        return triangles, offsets, obstacleNames
+
+    def setReductionCacheSize(self, maxTriangles):
+        """
+        \\brief Set the maximal total number of triangles of the analyses and
+         reduced affordance objects kept by the server for
+         getReducedAffordancePoints.
+        """
+        return self.client.affordance.affordance.setReductionCacheSize(maxTriangles)
+
+    def iterAffordancePoints(
+        self, affordanceType, maxTriangles=100000, maxObjects=0, firstObject=0
+    ):
+        """
+        \\brief Iterate over the triangles of the affordance objects of a type,
+         one chunk at a time.
+
+          Generator yielding, for each affordance object, a tuple (name,
+          firstTriangle, triangles), where triangles is an array of shape
+          (nbTriangles, 3, 3) of the global position of the vertices of its
+          triangles. The triangles are requested from the server in chunks of
+          at most maxTriangles triangles, so that memory use does not depend
+          on the size of the scene. An object with more triangles than
+          maxTriangles is yielded in several consecutive parts, firstTriangle
+          being the index in the object of the first triangle of the part.
+          The order of the objects is the same as that returned by the
+          function getAffRefObstacles. Raises an error if the affordances are
+          modified during the iteration.
+
+         \\param affordanceType name of the affordance type for which
+                the triangle points will be provided.
+         \\param maxTriangles maximal number of triangles of a chunk, 0 for
+                no limit.
+         \\param maxObjects maximal number of objects of a chunk, 0 for no
+                limit.
+         \\param firstObject index of the first object to yield.
+        """
+        affordance = self.client.affordance.affordance
+        token = ""
+        if firstObject > 0:
+            token = f"{affordance.getGeneration()}:{firstObject}:0"
+        while True:
+            token, points, offsets, names, firstTriangle = (
+                affordance.getAffordancePointsChunk(
+                    affordanceType, token, maxObjects, maxTriangles
+                )
+            )
+            triangles = np.frombuffer(points, dtype="<f8").reshape(-1, 3, 3)
+            for idx, name in enumerate(names):
+                yield (
+                    name,
+                    firstTriangle if idx == 0 else 0,
+                    triangles[offsets[idx] : offsets[idx + 1]],
+                )
+            if token == "":
+                return
+
+    def getAffordancePolygons(self, affordanceType, tolerance=0.01):
+        """
+        \\brief Get the boundaries of the affordance objects of a type,
+         simplified into polygons.
+
+          A flat surface made of many triangles is described by the few
+          vertices of its contour. Returns a list with, for each affordance
+          object, a tuple (normal, loops): normal is the unit normal of the
+          object and loops a list of arrays of shape (nbVertices, 3), the
+          global position of the vertices of each closed boundary loop. Outer
+          boundaries turn counter-clockwise around the normal and holes
+          clockwise. The order of the objects is the same as that returned
+          by the function getAffRefObstacles.
+
+         \\param affordanceType name of the affordance type for which
+                the polygons will be provided.
+         \\param tolerance maximal distance between the boundary of an
+                object and its simplification.
+        """
+        return self._cachedQuery(
+            ("polygons", affordanceType, tolerance),
+            self._getAffordancePolygons,
+            affordanceType,
+            tolerance,
+        )
+
+    def _getAffordancePolygons(self, affordanceType, tolerance):
+        points, loops, objects, normals = (
+            self.client.affordance.affordance.getAffordancePolygons(
+                affordanceType, tolerance
+            )
+        )
+        points = np.frombuffer(points, dtype="<f8").reshape(-1, 3)
+        normals = np.frombuffer(normals, dtype="<f8").reshape(-1, 3)
+        return [
+            (
+                normals[idx],
+                [
+                    points[loops[loopIdx] : loops[loopIdx + 1]]
+                    for loopIdx in range(objects[idx], objects[idx + 1])
+                ],
+            )
+            for idx in range(len(normals))
+        ]
+
+    def getAffordancesInBox(self, affordanceType, lower, upper):
+        """
+        \\brief Get the triangles of affordance objects that overlap an
+         axis-aligned box.
+
+          Returns a tuple (names, triangles, offsets). names holds the names
+          of the affordance objects with at least one triangle overlapping
+          the box, and triangles and offsets hold the triangles of these
+          objects that overlap the box, as in getAffordancePointsPacked.
+
+         \\param affordanceType name of the affordance type of the objects,
+         \\param lower, upper lower and upper corners of the box in the
+                world frame.
+        """
+        names, points, offsets = self.client.affordance.affordance.getAffordancesInBox(
+            affordanceType, list(lower), list(upper)
+        )
+        return (
+            names,
+            np.frombuffer(points, dtype="<f8").reshape(-1, 3, 3),
+            np.asarray(offsets, dtype=np.intp),
+        )
+
+    def getAffordancesInSphere(self, affordanceType, center, radius):
+        """
+        \\brief Get the triangles of affordance objects that overlap a sphere.
+
+          Same as getAffordancesInBox for a sphere.
+
+         \\param affordanceType name of the affordance type of the objects,
+         \\param center center of the sphere in the world frame,
+         \\param radius radius of the sphere.
+        """
+        names, points, offsets = (
+            self.client.affordance.affordance.getAffordancesInSphere(
+                affordanceType, list(center), radius
+            )
+        )
+        return (
+            names,
+            np.frombuffer(points, dtype="<f8").reshape(-1, 3, 3),
+            np.asarray(offsets, dtype=np.intp),
+        )
+
+    def getNearestAffordancePoints(self, affordanceType, queries, maxDistance=-1.0):
+        """
+        \\brief Get the points of affordance objects closest to query points.
+
+          Returns a tuple (points, distances, normals, objects, names).
+          points and normals are arrays of shape (nbQueries, 3) that hold
+          the closest point to each query point and the unit normal of its
+          triangle, distances the distance to each closest point. objects
+          holds, for each query point, the index in names of the affordance
+          object of its closest point, or -1 if no point was found within
+          maxDistance, in which case the distance is infinite.
+
+         \\param affordanceType name of the affordance type of the objects,
+         \\param queries array of shape (nbQueries, 3) of query points in the
+                world frame,
+         \\param maxDistance points further than maxDistance from a query
+                point are ignored. A negative value means no limit.
+        """
+        queries = np.ascontiguousarray(queries, dtype="<f8").reshape(-1, 3)
+        points, normals, distances, objects, names = (
+            self.client.affordance.affordance.getNearestAffordancePoints(
+                affordanceType, queries.tobytes(), maxDistance
+            )
+        )
+        return (
+            np.frombuffer(points, dtype="<f8").reshape(-1, 3),
+            np.frombuffer(distances, dtype="<f8"),
+            np.frombuffer(normals, dtype="<f8").reshape(-1, 3),
+            np.asarray(objects, dtype=np.intp),
+            names,
+        )
 
     def getAffordanceTypes(self):
         """
@@ -178,7 +940,11 @@ class AffordanceTool:
          functions require an affordance type as input parameter, and the
          spelling (capital letters etc.) matters.
         """
-        return self.client.affordance.affordance.getAffordanceTypes()
+        return list(
+            self._cachedQuery(
+                ("types",), self.client.affordance.affordance.getAffordanceTypes
+            )
+        )
 
     def getAffRefObstacles(self, affType):
         """
@@ -194,7 +960,13 @@ class AffordanceTool:
          \\param affType The affordance type for which the reference obstacles will
                 be provided.
         """
-        return self.client.affordance.affordance.getAffRefObstacles(affType)
+        return list(
+            self._cachedQuery(
+                ("refObstacles", affType),
+                self.client.affordance.affordance.getAffRefObstacles,
+                affType,
+            )
+        )
 
     def loadObstacleModel(
         self, filename, prefix, Viewer, guiOnly=False, reduceSizes=[]
@@ -217,82 +989,68 @@ class AffordanceTool:
          \\param guiOnly whether to control only gepetto-viewer-server
         """
         Viewer.loadObstacleModel(filename, prefix, guiOnly)
-        import re
-
         objNames = self.client.basic.obstacle.getObstacleNames(True, False)
-        for name in objNames:
-            print("obs name ", name)
-            splt = re.split("/", name)
-            if splt[0] == prefix:
-                self.analyseObject(name, reduceSizes)
+        names = [name for name in objNames if name.split("/")[0] == prefix]
+        self.analyseObjects(names, reduceSizes)
         return
 
-    def visualiseAllAffordances(self, affType, Viewer, colour):
+    def visualiseAllAffordances(
+        self, affType, Viewer, colour, mode="triangle", tolerance=0.01
+    ):
         """
         \\brief Visualise all found affordance surfaces for an affordance type.
 
          For a given type of affordance, this function creates
          a group node of the same name, and adds nodes to this group.
          The nodes correspond to the triangles (and their global position)
-         of all affordance objects of the given affordance type. The naming
-         convention is as follows:
-         "AffordanceType-ReferenceObstacleName.indexInAffObjectVector.triangleIndex"
-         where indexInAffObjectVector is the index of one affordance object in the
+         of all affordance objects of the given affordance type. How triangles
+         are grouped into nodes depends on the mode parameter:
+         - "triangle" (default): one node per triangle, named
+           "AffordanceType-ReferenceObstacleName.indexInAffObjectVector.triangleIndex",
+         - "object": one triangle-list node per affordance object, named
+           "AffordanceType-ReferenceObstacleName.indexInAffObjectVector",
+         - "type": a single triangle-list node named "AffordanceType.all",
+         - "polygon": one line loop per boundary loop of the simplified
+           polygons of each affordance object (see getAffordancePolygons),
+           named as in "triangle" mode, with the index of the loop instead of
+           triangleIndex.
+         indexInAffObjectVector is the index of one affordance object in the
          vector corresponding to the given affordance type (within a container in
          problem solver). triangleIndex is the index of one triangle within the
-         current affordance object.
+         current affordance object. The "object" and "type" modes send each node
+         in a single call to the viewer instead of one call per triangle, and
+         are much faster for large affordance objects.
          Before creating the group node, any node with the same name is deleted.
 
 
          \\param affType the type of affordance to be visualised
          \\Viewer viewer object to load affordance objects to visualiser
-         \\groupName name of group in the viewer that the objects will be added to
          \\colour vector of length 4 (normalized rgba)  defined in the interval [0, 1]
+         \\mode "triangle", "object", "type" or "polygon", see above
+         \\tolerance simplification tolerance of the "polygon" mode, see
+                getAffordancePolygons
         """
         if len(colour) < 4:  # if the colour is only rgb we suppose alpha = 1
             colour = [*colour, 1]
         self.deleteNode(str(affType), True, Viewer)
-        objs = self.getAffordancePoints(affType)
-        refs = self.getAffRefObstacles(affType)
+        self._forgetViewerType(affType)
         Viewer.client.gui.createGroup(str(affType))
-        for aff in objs:
-            count = 0
-            for tri in aff:
-                Viewer.client.gui.addTriangleFace(
-                    str(affType)
-                    + "-"
-                    + str(refs[objs.index(aff)])
-                    + "."
-                    + str(objs.index(aff))
-                    + "."
-                    + str(count),
-                    tri[0],
-                    tri[1],
-                    tri[2],
-                    [colour[0], colour[1], colour[2], colour[3]],
-                )
-                Viewer.client.gui.addToGroup(
-                    str(affType)
-                    + "-"
-                    + str(refs[objs.index(aff)])
-                    + "."
-                    + str(objs.index(aff))
-                    + "."
-                    + str(count),
-                    str(affType),
-                )
-                count += 1
+        self._viewerTypes.add(str(affType))
+        self._addAffordanceNodes(affType, Viewer, colour, "", mode, tolerance)
         groupNodes = Viewer.client.gui.getGroupNodeList(Viewer.sceneName)
         if groupNodes is not None:
             Viewer.client.gui.addToGroup(str(affType), Viewer.sceneName)
-            # By default, oldest node is displayed in front. Removing and re-adding
-            # object from scene assure that the new triangles are displayed on top
-            for groupNode in groupNodes:
-                Viewer.client.gui.removeFromGroup(groupNode, Viewer.sceneName)
-                Viewer.client.gui.addToGroup(groupNode, Viewer.sceneName)
-        return
-
-    def visualiseAffordances(self, affType, Viewer, colour, obstacleName=""):
+            self._bringToFront(groupNodes, Viewer)
+
+    def visualiseAffordances(
+        self,
+        affType,
+        Viewer,
+        colour,
+        obstacleName="",
+        mode="triangle",
+        tolerance=0.01,
+    ):
         """
         \\brief Visualise affordance surfaces of given type for one obstacle.
 
@@ -304,13 +1062,9 @@ class AffordanceTool:
          obstacle are first deleted, and if no node of the name affType is
          found, it is created. Then, the function adds nodes to this group.
          The nodes correspond to the triangles (and their global position)
-         of all affordance objects of the given affordance type. The naming
-         convention is as follows:
-         "AffordanceType-ReferenceObstacleName.indexInAffObjectVector.triangleIndex"
-         where indexInAffObjectVector is the index of one affordance object in the
-         vector corresponding to the given affordance type (within a container in
-         problem solver). triangleIndex is the index of one triangle within the
-         current affordance object.
+         of all affordance objects of the given affordance type, and are named
+         as described in visualiseAllAffordances. In "type" mode, the single
+         node is named "AffordanceType-ObstacleName.all".
 
          \\param affType the type of affordance to be visualised
          \\param Viewer viewer object to load affordance objects to visualiser
@@ -318,48 +1072,181 @@ class AffordanceTool:
                 defined in the interval [0, 1]
          \\param obstacleName Name of collision obstacle for which affordances
                 will be visualised
+         \\param mode "triangle", "object", "type" or "polygon", see
+                visualiseAllAffordances
+         \\param tolerance simplification tolerance of the "polygon" mode, see
+                getAffordancePolygons
         """
         if len(colour) < 4:  # if the colour is only rgb we suppose alpha = 1
             colour = [*colour, 1]
         if obstacleName == "":
-            return self.visualiseAllAffordances(affType, Viewer, colour)
+            return self.visualiseAllAffordances(
+                affType, Viewer, colour, mode, tolerance
+            )
         else:
             self.deleteAffordancesByTypeFromViewer(affType, Viewer, obstacleName)
-            nodes = Viewer.client.gui.getNodeList()
-            if affType not in nodes:
+            if str(affType) not in self._viewerTypes:
                 Viewer.client.gui.createGroup(str(affType))
-            objs = self.getAffordancePoints(affType)
-            refs = self.getAffRefObstacles(affType)
-            for aff in objs:
-                if refs[objs.index(aff)] == obstacleName:
-                    count = 0
-                    for tri in aff:
-                        name = (
-                            str(affType)
-                            + "-"
-                            + str(refs[objs.index(aff)])
-                            + "."
-                            + str(objs.index(aff))
-                            + "."
-                            + str(count)
-                        )
-                        Viewer.client.gui.addTriangleFace(
-                            name,
-                            tri[0],
-                            tri[1],
-                            tri[2],
-                            [colour[0], colour[1], colour[2], colour[3]],
-                        )
-                        Viewer.client.gui.addToGroup(name, str(affType))
-                        count += 1
+                self._viewerTypes.add(str(affType))
+            self._addAffordanceNodes(
+                affType, Viewer, colour, obstacleName, mode, tolerance
+            )
             groupNodes = Viewer.client.gui.getGroupNodeList(Viewer.sceneName)
             Viewer.client.gui.addToGroup(str(affType), Viewer.sceneName)
-            # By default, oldest node is displayed in front. Removing and re-adding i
-            # object from scene assure that the new triangles are displayed on top
-            for groupNode in groupNodes:
-                Viewer.client.gui.removeFromGroup(groupNode, Viewer.sceneName)
-                Viewer.client.gui.addToGroup(groupNode, Viewer.sceneName)
-        return
+            self._bringToFront(groupNodes, Viewer)
+
+    def _addAffordanceNodes(
+        self, affType, Viewer, colour, obstacleName, mode, tolerance=0.01
+    ):
+        """
+        \\brief Add the affordance surfaces of a type to its group in viewer.
+
+         Helper of visualiseAllAffordances and visualiseAffordances. If
+         obstacleName is not empty, only the surfaces of that obstacle are added.
+        """
+        if mode not in ("triangle", "object", "type", "polygon"):
+            raise ValueError("Unknown visualisation mode " + str(mode))
+        if mode == "polygon":
+            shapes = [
+                loops for _, loops in self.getAffordancePolygons(affType, tolerance)
+            ]
+        else:
+            triangles, offsets = self.getAffordancePointsPacked(affType)
+            shapes = [
+                triangles[offsets[idx] : offsets[idx + 1]]
+                for idx in range(len(offsets) - 1)
+            ]
+        refs = self.getAffRefObstacles(affType)
+        colour = [colour[0], colour[1], colour[2], colour[3]]
+        selected = []
+        for idx, ref in enumerate(refs):
+            obstacle = self._referenceObstacle(ref)
+            if obstacleName in ("", ref, obstacle):
+                selected.append((idx, ref, obstacle, shapes[idx]))
+        if mode == "type":
+            if not selected:
+                return
+            tris = np.concatenate([tris for _, _, _, tris in selected])
+            if obstacleName == "":
+                self._addTriangleList(
+                    str(affType) + ".all", tris, colour, str(affType), Viewer
+                )
+                return
+            name = str(affType) + "-" + str(obstacleName) + ".all"
+            group = self._obstacleGroup(affType, obstacleName, Viewer)
+            if self._addTriangleList(name, tris, colour, group, Viewer):
+                self._viewerNodes[(str(affType), obstacleName)].setdefault(
+                    obstacleName, []
+                ).append(name)
+            return
+        for idx, ref, obstacle, shape in selected:
+            prefix = str(affType) + "-" + str(ref) + "." + str(idx)
+            group = self._obstacleGroup(affType, obstacle, Viewer)
+            nodes = self._viewerNodes[(str(affType), obstacle)].setdefault(ref, [])
+            if mode == "object":
+                if self._addTriangleList(prefix, shape, colour, group, Viewer):
+                    nodes.append(prefix)
+                continue
+            if mode == "polygon":
+                for count, loop in enumerate(shape):
+                    name = prefix + "." + str(count)
+                    Viewer.client.gui.addCurve(name, loop.tolist(), colour)
+                    Viewer.client.gui.setCurveMode(name, "LINE_LOOP")
+                    Viewer.client.gui.addToGroup(name, group)
+                    nodes.append(name)
+                continue
+            for count, tri in enumerate(shape.tolist()):
+                name = prefix + "." + str(count)
+                Viewer.client.gui.addTriangleFace(name, tri[0], tri[1], tri[2], colour)
+                Viewer.client.gui.addToGroup(name, group)
+                nodes.append(name)
+
+    def _addTriangleList(self, name, triangles, colour, groupName, Viewer):
+        """
+        \\brief Add all given triangles to viewer as a single node.
+
+         Returns whether a node was added.
+        """
+        if len(triangles) == 0:
+            return False
+        Viewer.client.gui.addCurve(name, triangles.reshape(-1, 3).tolist(), colour)
+        Viewer.client.gui.setCurveMode(name, "TRIANGLES")
+        Viewer.client.gui.addToGroup(name, groupName)
+        return True
+
+    @staticmethod
+    def _referenceObstacle(ref):
+        """
+        \\brief Name of the obstacle of an affordance object, named
+         <obstacleName>aff<opIdx>_<objIdx> by the server, or ref itself if
+         it is not named that way.
+        """
+        match = _affordanceObjectName.fullmatch(ref)
+        return match.group(1) if match else ref
+
+    @staticmethod
+    def _groupName(affType, obstacleName):
+        return str(affType) + "-" + str(obstacleName)
+
+    def _obstacleGroup(self, affType, obstacleName, Viewer):
+        """
+        \\brief Get the group node of the viewer nodes of the affordance
+         objects of an obstacle, creating it in the group of affType if needed.
+        """
+        group = self._groupName(affType, obstacleName)
+        if (str(affType), obstacleName) not in self._viewerNodes:
+            Viewer.client.gui.createGroup(group)
+            Viewer.client.gui.addToGroup(group, str(affType))
+            self._viewerNodes[(str(affType), obstacleName)] = {}
+        return group
+
+    def _forgetViewerType(self, affType):
+        """
+        \\brief Forget the viewer nodes of an affordance type, the group node
+         of which was deleted.
+        """
+        self._viewerTypes.discard(str(affType))
+        for key in [key for key in self._viewerNodes if key[0] == str(affType)]:
+            del self._viewerNodes[key]
+
+    def _deleteViewerNodes(self, Viewer, obstacleNames, affTypes=None):
+        """
+        \\brief Delete the viewer nodes created for affordance objects of
+         given obstacles.
+
+         Nodes are looked up in the registry of the nodes created by
+         AffordanceTool, so that the viewer is not queried. The nodes of an
+         obstacle are deleted with their group node, in a single call to the
+         viewer. The name of an affordance object can also be given, in
+         which case only the nodes of that object are deleted.
+
+         \\param Viewer viewer object to erase affordance objects from visualiser
+         \\param obstacleNames names of obstacles or of affordance objects,
+         \\param affTypes affordance types of the nodes to delete, all types
+                if None.
+        """
+        if affTypes is None:
+            affTypes = list(self._viewerTypes)
+        for affType in affTypes:
+            for name in obstacleNames:
+                key = (str(affType), str(name))
+                if self._viewerNodes.pop(key, None) is not None:
+                    self.deleteNode(self._groupName(*key), True, Viewer)
+                    continue
+                key = (str(affType), self._referenceObstacle(str(name)))
+                for node in self._viewerNodes.get(key, {}).pop(str(name), []):
+                    self.deleteNode(node, True, Viewer)
+
+    def _bringToFront(self, groupNodes, Viewer):
+        """
+        \\brief Remove and re-add group nodes to the scene.
+
+         By default, oldest node is displayed in front. Removing and re-adding
+         object from scene assure that the new triangles are displayed on top.
+        """
+        for groupNode in groupNodes:
+            Viewer.client.gui.removeFromGroup(groupNode, Viewer.sceneName)
+            Viewer.client.gui.addToGroup(groupNode, Viewer.sceneName)
 
     def deleteAffordances(self, Viewer, obstacleName=""):
         """
@@ -375,38 +1262,61 @@ class AffordanceTool:
         self.deleteAffordancesFromViewer(Viewer, obstacleName)
         return self.client.affordance.affordance.deleteAffordances(obstacleName)
 
+    def deleteAffordancesForObstacles(self, Viewer, obstacleNames):
+        """
+        \\brief Delete affordances for several objects.
+
+         Deletes affordance objects both from problem solver and from viewer.
+         Faster than calling deleteAffordances for each object.
+
+         \\param Viewer viewer object to erase affordance objects from visualiser
+         \\param obstacleNames names of obstacles the affordances of which will
+                be deleted.
+        """
+        self._deleteViewerNodes(Viewer, obstacleNames)
+        return self.client.affordance.affordance.deleteAffordancesForObstacles(
+            list(obstacleNames)
+        )
+
+    def updateObstaclePose(self, obstacleName, pose=None):
+        """
+        \\brief Update the affordance objects of an obstacle after it moved.
+
+         If the obstacle was translated or rotated about the vertical axis
+         since its analysis, its affordance objects are moved with it.
+         Otherwise, it is analysed again. Nodes shown in a viewer are not
+         updated.
+
+         \\param obstacleName name of the obstacle,
+         \\param pose if given, the obstacle is first moved to pose,
+                [x, y, z, qx, qy, qz, qw], by Obstacle.moveObstacle.
+         Returns True if the affordance objects were moved, False if the
+         obstacle was analysed again.
+        """
+        if pose is not None:
+            self.client.basic.obstacle.moveObstacle(obstacleName, list(pose))
+        return self.client.affordance.affordance.updateObstaclePose(obstacleName)
+
     def deleteAffordancesFromViewer(self, Viewer, obstacleName=""):
         """
         \\brief Delete affordance surfaces from viewer.
 
          For a given collisionObstacle, delete all nodes in viewer that
-         correspond to its affordance surfaces. The function goes through,
-         for all affordance types, the list of nodes in the group, and deletes
-         the nodes that have obstacleName as part of their name.
+         correspond to its affordance surfaces. The nodes are those created
+         by the visualisation functions of AffordanceTool, which keeps track
+         of them, so that the viewer does not need to be queried.
 
         \\param Viewer viewer object to erase affordance objects from visualiser
         \\param obstacleName Name of collision obstacle for which affordances
                will be deleted
         """
-        affs = self.getAffordanceTypes()
         if obstacleName == "":
-            for aff in affs:
+            for aff in self.getAffordanceTypes():
                 self.deleteNode(aff, True, Viewer)
+            self._viewerNodes.clear()
+            self._viewerTypes.clear()
         else:
-            import re
-
-            for aff in affs:
-                refs = self.getAffRefObstacles(aff)
-                count = 0
-                while count < len(refs):
-                    if refs[count] == obstacleName:
-                        toDelete = aff + "-" + refs[count]
-                        nodes = Viewer.client.gui.getGroupNodeList(aff)
-                        for node in nodes:
-                            splt = re.split(r"\.", node)
-                            if splt[0] == toDelete:
-                                self.deleteNode(node, True, Viewer)
-                    count += 1
+            self._deleteViewerNodes(Viewer, [obstacleName])
         return
 
     def deleteAffordancesByType(self, affordanceType, Viewer, obstacleName=""):
@@ -434,11 +1344,10 @@ class AffordanceTool:
         collisionObstacle
 
          For a given collisionObstacle, delete nodes in viewer that correspond
-         to a specific affordance type. The function goes through, for all
-         affordance types, the list of nodes in the group, and deletes the
-         nodes that have obstacleName as part of their name. If no obstacleName
-         is given, all affordance ojbects of type affordanceType are deleted
-         from viewer.
+         to a specific affordance type. The nodes are those created by the
+         visualisation functions of AffordanceTool, which keeps track of them.
+         If no obstacleName is given, all affordance ojbects of type
+         affordanceType are deleted from viewer.
 
          \\param affordanceType type of affordance to be deleted
            \\param Viewer viewer object to erase affordance objects from visualiser
@@ -447,23 +1356,9 @@ class AffordanceTool:
         """
         if obstacleName == "":
             Viewer.client.gui.deleteNode(affordanceType, True)
+            self._forgetViewerType(affordanceType)
         else:
-            import re
-
-            affs = self.getAffordanceTypes()
-            for aff in affs:
-                if aff == affordanceType:
-                    refs = self.getAffRefObstacles(aff)
-                    count = 0
-                    while count < len(refs):
-                        if refs[count] == obstacleName:
-                            toDelete = aff + "-" + refs[count]
-                            nodes = Viewer.client.gui.getNodeList()
-                            for node in nodes:
-                                splt = re.split(r"\.", node)
-                                if splt[0] == toDelete:
-                                    self.deleteNode(node, True, Viewer)
-                        count += 1
+            self._deleteViewerNodes(Viewer, [obstacleName], [affordanceType])
         return
 
     def deleteNode(self, nodeName, all, Viewer):
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 CNRS
+#
+# This file is part of hpp-affordance-corba.
+# hpp-affordance-corba is free software: you can redistribute it
+# and/or modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either version
+# 3 of the License, or (at your option) any later version.
+#
+# hpp-affordance-corba is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Lesser Public License for more details.  You should have
+# received a copy of the GNU Lesser General Public License along with
+# hpp-affordance-corba.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""
+Offline affordance analysis of many environments.
+
+Each environment is analysed by the hpp-affordance-batch executable, in its
+own process, several environments being analysed at the same time. The
+affordance objects of environment PREFIX are written to PREFIX.aff in the
+output directory, and can be loaded in a server by
+AffordanceTool.loadAffordanceFile, once the environment is loaded with
+loadObstacleModel(URDF, PREFIX).
+
+Example:
+    python -m hpp.corbaserver.affordance.batch --output-dir affordances \\
+        --jobs 8 darpa.urdf box.urdf:box1 --reduce-sizes 0.03 0 0
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parseEnvironment(environment):
+    """
+    \\brief Split an environment "URDF[:PREFIX]" in URDF file and prefix.
+
+     The prefix defaults to the name of the URDF file without extension.
+    """
+    urdf, sep, prefix = environment.rpartition(":")
+    if not sep or not urdf:
+        urdf, prefix = environment, ""
+    if not prefix:
+        prefix = os.path.splitext(os.path.basename(urdf))[0]
+    return urdf, prefix
+
+
+def batchCommand(
+    executable, urdf, prefix, output, configs=(), types=(), reduceSizes=()
+):
+    """
+    \\brief Command line of hpp-affordance-batch analysing an environment.
+
+     \\param configs list of (type, margin, nbTriMargin, minArea), see
+            AffordanceTool.setAffordanceConfig,
+     \\param types list of (type, requirement, normal, config), see
+            AffordanceTool.addAffordanceType,
+     \\param reduceSizes reduce size of each affordance type, see
+            AffordanceTool.analyseAll.
+    """
+    command = [executable]
+    for affType, requirement, normal, config in types:
+        command += ["--type", affType, requirement]
+        command += [repr(float(x)) for x in list(normal) + list(config)]
+    for affType, *config in configs:
+        command += ["--config", affType] + [repr(float(x)) for x in config]
+    if reduceSizes:
+        command += ["--reduce-sizes", ",".join(repr(float(x)) for x in reduceSizes)]
+    return [*command, urdf, prefix, output]
+
+
+def analyseEnvironments(
+    environments,
+    outputDir,
+    jobs=None,
+    executable="hpp-affordance-batch",
+    configs=(),
+    types=(),
+    reduceSizes=(),
+):
+    """
+    \\brief Analyse environments, each in its own hpp-affordance-batch
+     process.
+
+      Returns a list of (environment, output file, error), error being None
+      if the analysis succeeded, or the error output of the process.
+     \\param environments list of "URDF[:PREFIX]",
+     \\param outputDir directory of the affordance files, created if needed,
+     \\param jobs maximal number of processes run at the same time, the
+            number of processors if None.
+     Other parameters are those of batchCommand.
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    def analyse(environment):
+        urdf, prefix = parseEnvironment(environment)
+        output = os.path.join(outputDir, prefix + ".aff")
+        command = batchCommand(
+            executable, urdf, prefix, output, configs, types, reduceSizes
+        )
+        # a failed analysis is reported with the environment, not raised
+        try:
+            process = subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=False,
+            )
+        except OSError as exc:
+            return environment, output, str(exc)
+        error = None
+        if process.returncode != 0:
+            error = process.stderr.strip() or f"exit status {process.returncode}"
+        return environment, output, error
+
+    # the analyses run in the child processes, threads only wait for them
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(analyse, environments))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "environments",
+        nargs="+",
+        metavar="URDF[:PREFIX]",
+        help="environment, loaded as by loadObstacleModel(URDF, PREFIX). "
+        "PREFIX defaults to the name of URDF without extension",
+    )
+    parser.add_argument("--output-dir", dest="outputDir", default=".")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of environments analysed at the same time",
+    )
+    parser.add_argument("--executable", default="hpp-affordance-batch")
+    parser.add_argument(
+        "--config",
+        dest="configs",
+        nargs=4,
+        action="append",
+        default=[],
+        metavar=("TYPE", "MARGIN", "NBTRIMARGIN", "MINAREA"),
+        help="see AffordanceTool.setAffordanceConfig",
+    )
+    parser.add_argument(
+        "--type",
+        dest="types",
+        nargs=8,
+        action="append",
+        default=[],
+        metavar=(
+            "TYPE",
+            "REQUIREMENT",
+            "NX",
+            "NY",
+            "NZ",
+            "MARGIN",
+            "NBTRIMARGIN",
+            "MINAREA",
+        ),
+        help="see AffordanceTool.addAffordanceType",
+    )
+    parser.add_argument(
+        "--reduce-sizes",
+        dest="reduceSizes",
+        nargs="+",
+        type=float,
+        default=[],
+        help="reduce size of each affordance type, see AffordanceTool.analyseAll",
+    )
+    args = parser.parse_args(argv)
+
+    types = [(t[0], t[1], t[2:5], t[5:8]) for t in args.types]
+    results = analyseEnvironments(
+        args.environments,
+        args.outputDir,
+        args.jobs,
+        args.executable,
+        args.configs,
+        types,
+        args.reduceSizes,
+    )
+    failures = 0
+    for environment, output, error in results:
+        if error is None:
+            print(f"{environment}: {output}")
+        else:
+            failures += 1
+            print(f"{environment}: {error}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "mesh-cache.hh"
+
+#include <coal/BVH/BVH_model.h>
+#include <coal/collision_object.h>
+
+#include <algorithm>
+#include <cmath>
+#include <hpp/affordance/operations.hh>
+#include <utility>
+
+#include "affordance-types.hh"
+#include "hasher.hh"
+
+namespace hpp {
+namespace affordanceCorba {
+namespace {
+// squared distance under which affordance::searchLinkedTriangles considers
+// two vertices as equal.
+const double vertexMargin = 1e-15;
+
+const coal::Vec3f& vertex(const affordance::Triangle& triangle,
+                          std::size_t idx) {
+  switch (idx) {
+    case 0:
+      return triangle.points.p1;
+    case 1:
+      return triangle.points.p2;
+    default:
+      return triangle.points.p3;
+  }
+}
+}  // namespace
+
+bool isBVHModelTriangles(const coal::CollisionObject* object) {
+  if (object->collisionGeometry()->getNodeType() == coal::BV_OBBRSS) {
+    const affordance::BVHModelOBConst_Ptr_t model =
+        std::static_pointer_cast<const affordance::BVHModelOB>(
+            object->collisionGeometry());
+    if (model->getModelType() == coal::BVH_MODEL_TRIANGLES) {
+      return true;
+    }
+  }
+  return false;
+}
+
+uint64_t geometryFingerprint(const coal::CollisionObject* object) {
+  Hasher hasher;
+  hasher.add((uint64_t)object->collisionGeometry()->getNodeType());
+  if (isBVHModelTriangles(object)) {
+    affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(object);
+    hasher.add((uint64_t)model->num_vertices);
+    hasher.add(model->vertices->data(),
+               model->num_vertices * sizeof(coal::Vec3f));
+    hasher.add((uint64_t)model->num_tris);
+    hasher.add(model->tri_indices->data(),
+               model->num_tris * sizeof(coal::Triangle));
+  }
+  const coal::Matrix3f& R = object->getRotation();
+  const coal::Vec3f& t = object->getTranslation();
+  for (int i = 0; i < 3; ++i) {
+    for (int j = 0; j < 3; ++j) hasher.add(R(i, j));
+    hasher.add(t[i]);
+  }
+  return hasher.value();
+}
+
+uint64_t fingerprint(uint64_t geometry,
+                     const affordance::OperationBases_t& operations,
+                     std::vector<double> reduceSizes) {
+  Hasher hasher;
+  hasher.add(geometry);
+  while (reduceSizes.size() < operations.size()) reduceSizes.push_back(0.);
+  for (std::size_t opIdx = 0; opIdx < operations.size(); opIdx++) {
+    hasher.add(std::string(operations[opIdx]->affordance_));
+    const CustomOperation* custom =
+        dynamic_cast<const CustomOperation*>(operations[opIdx].get());
+    if (custom) {
+      hasher.add((uint64_t)custom->type().requirement);
+      for (int i = 0; i < 3; ++i) hasher.add(custom->type().normal[i]);
+    }
+    hasher.add(operations[opIdx]->margin_);
+    hasher.add(operations[opIdx]->neighbouringTriangleMargin_);
+    hasher.add(operations[opIdx]->minArea_);
+    hasher.add(reduceSizes[opIdx]);
+  }
+  return hasher.value();
+}
+
+PreprocessedMesh::PreprocessedMesh(const coal::CollisionObject& object) {
+  affordance::BVHModelOBConst_Ptr_t model = affordance::GetModel(&object);
+  const coal::Matrix3f& R = object.getRotation();
+  const coal::Vec3f& t = object.getTranslation();
+  triangles_.reserve(model->num_tris);
+  for (unsigned int triIdx = 0; triIdx < model->num_tris; ++triIdx) {
+    const coal::Triangle& tri = (*model->tri_indices)[triIdx];
+    affordance::TrianglePoints points;
+    points.p1 = R * (*model->vertices)[tri[0]] + t;
+    points.p2 = R * (*model->vertices)[tri[1]] + t;
+    points.p3 = R * (*model->vertices)[tri[2]] + t;
+    triangles_.push_back(affordance::Triangle(points));
+  }
+  // find the pairs of close vertices by sweeping the vertices sorted along x
+  typedef std::pair<double, std::size_t> Corner_t;
+  std::vector<Corner_t> corners;
+  corners.reserve(3 * triangles_.size());
+  for (std::size_t idx = 0; idx < 3 * triangles_.size(); ++idx) {
+    corners.push_back(Corner_t(vertex(triangles_[idx / 3], idx % 3)[0], idx));
+  }
+  std::sort(corners.begin(), corners.end());
+  const double maxDx = std::sqrt(vertexMargin);
+  std::vector<std::pair<unsigned int, unsigned int> > pairs;
+  for (std::size_t i = 0; i < corners.size(); ++i) {
+    const std::size_t a = corners[i].second;
+    const coal::Vec3f& va = vertex(triangles_[a / 3], a % 3);
+    for (std::size_t j = i + 1;
+         j < corners.size() && corners[j].first - corners[i].first < maxDx;
+         ++j) {
+      const std::size_t b = corners[j].second;
+      if (a / 3 == b / 3) continue;
+      if ((va - vertex(triangles_[b / 3], b % 3)).squaredNorm() <
+          vertexMargin) {
+        pairs.push_back(std::make_pair(a / 3, b / 3));
+        pairs.push_back(std::make_pair(b / 3, a / 3));
+      }
+    }
+  }
+  std::sort(pairs.begin(), pairs.end());
+  pairs.erase(std::unique(pairs.begin(), pairs.end()), pairs.end());
+  offsets_.assign(triangles_.size() + 1, 0);
+  neighbours_.reserve(pairs.size());
+  for (std::size_t idx = 0; idx < pairs.size(); ++idx) {
+    ++offsets_[pairs[idx].first + 1];
+    neighbours_.push_back(pairs[idx].second);
+  }
+  for (std::size_t idx = 0; idx < triangles_.size(); ++idx) {
+    offsets_[idx + 1] += offsets_[idx];
+  }
+}
+
+affordance::SemanticsDataPtr_t PreprocessedMesh::analyse(
+    const coal::CollisionObject* object,
+    const affordance::OperationBases_t& operations) const {
+  affordance::SemanticsDataPtr_t res(new affordance::SemanticsData());
+  res->affordances_.resize(operations.size());
+  // classify the triangles for all operations in a single pass: bit opIdx
+  // of the words of a triangle is set if the triangle fulfils the
+  // requirement of operation opIdx.
+  const std::size_t nbWords = (operations.size() + 63) / 64;
+  std::vector<uint64_t> fulfilled(nbWords * triangles_.size(), 0);
+  for (std::size_t idx = 0; idx < triangles_.size(); ++idx) {
+    uint64_t* words = fulfilled.data() + idx * nbWords;
+    for (std::size_t opIdx = 0; opIdx < operations.size(); ++opIdx) {
+      if (operations[opIdx]->requirement(triangles_[idx].normal)) {
+        words[opIdx / 64] |= (uint64_t)1 << (opIdx % 64);
+      }
+    }
+  }
+  const auto fulfils = [&](std::size_t idx, std::size_t opIdx) {
+    return (fulfilled[idx * nbWords + opIdx / 64] >> (opIdx % 64)) & 1;
+  };
+  // triangles that are neither part of an affordance nor known to fulfil
+  // no requirement
+  std::vector<bool> unset(triangles_.size(), true);
+  // a triangle is visited by the search started from seed if
+  // visited[triangle] == seed + 1.
+  std::vector<std::size_t> visited(triangles_.size(), 0);
+  // explicit stack of triangles and position in their neighbours, to visit
+  // the triangles in the order of the recursion of searchLinkedTriangles.
+  std::vector<std::pair<std::size_t, const unsigned int*> > stack;
+  for (std::size_t seed = 0; seed < triangles_.size(); ++seed) {
+    if (!unset[seed]) continue;
+    std::size_t opIdx = 0;
+    while (opIdx < operations.size() && !fulfils(seed, opIdx)) ++opIdx;
+    if (opIdx == operations.size()) {
+      unset[seed] = false;
+      continue;
+    }
+    const affordance::OperationBase& operation = *operations[opIdx];
+    std::vector<unsigned int> indices(1, (unsigned int)seed);
+    double area = triangles_[seed].area;
+    visited[seed] = seed + 1;
+    stack.push_back(std::make_pair(seed, neighboursBegin(seed)));
+    while (!stack.empty()) {
+      const std::size_t ref = stack.back().first;
+      if (stack.back().second == neighboursEnd(ref)) {
+        stack.pop_back();
+        continue;
+      }
+      const unsigned int idx = *(stack.back().second++);
+      if (!unset[idx] || visited[idx] == seed + 1) continue;
+      if (!fulfils(idx, opIdx)) {
+        visited[idx] = seed + 1;
+        continue;
+      }
+      if ((triangles_[idx].normal - triangles_[ref].normal).squaredNorm() <
+          operation.neighbouringTriangleMargin_) {
+        visited[idx] = seed + 1;
+        area += triangles_[idx].area;
+        indices.push_back(idx);
+        stack.push_back(std::make_pair(idx, neighboursBegin(idx)));
+      }
+    }
+    if (area > operation.minArea_) {
+      for (std::size_t idx = 0; idx < indices.size(); ++idx) {
+        unset[indices[idx]] = false;
+      }
+      res->affordances_[opIdx].push_back(affordance::AffordancePtr_t(
+          new affordance::Affordance(indices, object)));
+    }
+  }
+  return res;
+}
+
+PreprocessedMeshPtr_t MeshCache::get(const std::string& name, uint64_t key,
+                                     const coal::CollisionObject& object) {
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::map<std::string, Entry>::const_iterator it = meshes_.find(name);
+    if (it != meshes_.end() && it->second.key == key) return it->second.mesh;
+  }
+  // preprocess without holding the lock, so that other obstacles can be
+  // processed concurrently
+  PreprocessedMeshPtr_t mesh(new PreprocessedMesh(object));
+  std::lock_guard<std::mutex> lock(mutex_);
+  Entry& entry = meshes_[name];
+  entry.key = key;
+  entry.mesh = mesh;
+  return mesh;
+}
+
+void MeshCache::erase(const std::string& name) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  meshes_.erase(name);
+}
+
+void MeshCache::clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  meshes_.clear();
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,130 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_MESH_CACHE_HH
+#define HPP_AFFORDANCE_CORBA_MESH_CACHE_HH
+
+#include <stdint.h>
+
+#include <hpp/affordance/affordance-extraction.hh>
+#include <hpp/affordance/fwd.hh>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Whether the geometry of a collision object is a BVHModelOB made of
+/// triangles, the only geometry the affordance analysis applies to.
+bool isBVHModelTriangles(const coal::CollisionObject* object);
+
+/// Hash of the geometry and global pose of a collision object.
+uint64_t geometryFingerprint(const coal::CollisionObject* object);
+
+/// Fingerprint of the analysis of an obstacle.
+///
+/// Hash of the geometry and global pose of the obstacle, and of the
+/// affordance configurations and reduce sizes of the analysis. An obstacle
+/// is analysed again only if its fingerprint changed.
+/// \param geometry hash of the obstacle, see geometryFingerprint,
+/// \param operations affordance operations of the analysis,
+/// \param reduceSizes reduce size of each operation, 0 if missing.
+uint64_t fingerprint(uint64_t geometry,
+                     const affordance::OperationBases_t& operations,
+                     std::vector<double> reduceSizes);
+
+/// Geometric preprocessing of the triangles of an obstacle.
+///
+/// Stores the triangles of the obstacle in the world frame with their
+/// normal and area, and the triangles sharing a vertex with each triangle.
+/// None of these depend on the affordance configurations, so that the
+/// analysis can be run again for other configurations without recomputing
+/// them.
+class PreprocessedMesh {
+ public:
+  /// Preprocess the triangles of a collision object.
+  ///
+  /// \param object collision object, the geometry of which should be a
+  ///        BVHModelOB made of triangles.
+  explicit PreprocessedMesh(const coal::CollisionObject& object);
+
+  std::size_t size() const { return triangles_.size(); }
+
+  const affordance::Triangle& triangle(std::size_t idx) const {
+    return triangles_[idx];
+  }
+
+  /// Triangles sharing a vertex with a triangle, by increasing index.
+  const unsigned int* neighboursBegin(std::size_t idx) const {
+    return neighbours_.data() + offsets_[idx];
+  }
+
+  const unsigned int* neighboursEnd(std::size_t idx) const {
+    return neighbours_.data() + offsets_[idx + 1];
+  }
+
+  /// Find the affordances of the preprocessed object.
+  ///
+  /// Give the same result as affordance::affordanceAnalysis, the triangles
+  /// of which are classified and grouped in the same order, with the same
+  /// tests. The requirements of all the operations are evaluated once per
+  /// triangle, before grouping, so that the cost of an additional
+  /// operation is small.
+  /// \param object collision object that was preprocessed, referred to
+  ///        by the affordances,
+  /// \param operations affordance operations.
+  affordance::SemanticsDataPtr_t analyse(
+      const coal::CollisionObject* object,
+      const affordance::OperationBases_t& operations) const;
+
+ private:
+  std::vector<affordance::Triangle> triangles_;
+  /// neighbours of triangle idx are in neighbours_[offsets_[idx],
+  /// offsets_[idx+1]).
+  std::vector<std::size_t> offsets_;
+  std::vector<unsigned int> neighbours_;
+};  // class PreprocessedMesh
+
+typedef std::shared_ptr<const PreprocessedMesh> PreprocessedMeshPtr_t;
+
+/// Preprocessed meshes of the obstacles, by obstacle name.
+///
+/// A preprocessed mesh is kept until the geometry or pose of its obstacle
+/// changes. Methods can be called concurrently.
+class MeshCache {
+ public:
+  /// Get the preprocessed mesh of an obstacle, computing it if needed.
+  ///
+  /// \param name name of the obstacle,
+  /// \param key hash of the geometry and pose of the obstacle,
+  /// \param object collision object of the obstacle.
+  PreprocessedMeshPtr_t get(const std::string& name, uint64_t key,
+                            const coal::CollisionObject& object);
+
+  /// Forget the preprocessed mesh of an obstacle.
+  void erase(const std::string& name);
+
+  void clear();
+
+ private:
+  struct Entry {
+    uint64_t key;
+    PreprocessedMeshPtr_t mesh;
+  };  // struct Entry
+
+  std::map<std::string, Entry> meshes_;
+  std::mutex mutex_;
+};  // class MeshCache
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_MESH_CACHE_HH
@@ -0,0 +1,191 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#include "reduction-cache.hh"
+
+#include <coal/BVH/BVH_model.h>
+
+#include <hpp/affordance/affordance-extraction.hh>
+#include <limits>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+ReductionCache::ReductionCache(std::size_t maxTriangles)
+    : maxTriangles_(maxTriangles), nbTriangles_(0) {}
+
+void ReductionCache::setMaxTriangles(std::size_t maxTriangles) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  maxTriangles_ = maxTriangles;
+  evict();
+}
+
+void ReductionCache::store(
+    const std::string& name, uint64_t key,
+    const std::vector<std::string>& types,
+    const std::shared_ptr<const coal::CollisionObject>& object,
+    const affordance::SemanticsDataPtr_t& data) {
+  std::size_t nbTriangles = 0;
+  for (std::size_t opIdx = 0; opIdx < data->affordances_.size(); opIdx++) {
+    for (std::size_t affIdx = 0; affIdx < data->affordances_[opIdx].size();
+         affIdx++) {
+      nbTriangles += data->affordances_[opIdx][affIdx]->indices_.size();
+    }
+  }
+  std::lock_guard<std::mutex> lock(mutex_);
+  eraseAnalysis(name);
+  analysesLru_.push_front(name);
+  Analysis& analysis = analyses_[name];
+  analysis.key = key;
+  analysis.types = types;
+  analysis.object = object;
+  analysis.data = data;
+  analysis.nbTriangles = nbTriangles;
+  analysis.use = analysesLru_.begin();
+  nbTriangles_ += nbTriangles;
+  evict();
+}
+
+void ReductionCache::move(const std::string& name, uint64_t key,
+                          uint64_t newKey, const coal::Transform3s& pose) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  std::map<std::string, Analysis>::iterator it = analyses_.find(name);
+  if (it == analyses_.end() || it->second.key != key) return;
+  Analysis analysis = it->second;
+  eraseAnalysis(name);
+  // the triangles of the affordances are those of the obstacle at its new
+  // pose. The geometry is shared and not modified, its bounding box is not
+  // computed again.
+  std::shared_ptr<coal::CollisionObject> object(new coal::CollisionObject(
+      std::const_pointer_cast<coal::CollisionGeometry>(
+          analysis.object->collisionGeometry()),
+      pose, false));
+  affordance::SemanticsDataPtr_t data(new affordance::SemanticsData());
+  data->affordances_.resize(analysis.data->affordances_.size());
+  for (std::size_t opIdx = 0; opIdx < data->affordances_.size(); opIdx++) {
+    const std::vector<affordance::AffordancePtr_t>& affs =
+        analysis.data->affordances_[opIdx];
+    for (std::size_t affIdx = 0; affIdx < affs.size(); affIdx++) {
+      data->affordances_[opIdx].push_back(affordance::AffordancePtr_t(
+          new affordance::Affordance(affs[affIdx]->indices_, object.get())));
+    }
+  }
+  analysesLru_.push_front(name);
+  Analysis& moved = analyses_[name];
+  moved = analysis;
+  moved.key = newKey;
+  moved.object = object;
+  moved.data = data;
+  moved.use = analysesLru_.begin();
+  nbTriangles_ += moved.nbTriangles;
+}
+
+bool ReductionCache::get(const std::string& name, uint64_t key,
+                         const std::string& type, double reduceSize,
+                         affordance::CollisionObjects_t& objects) {
+  const VariantKey_t variantKey(name, type, reduceSize);
+  Analysis analysis;
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::map<std::string, Analysis>::iterator it = analyses_.find(name);
+    if (it == analyses_.end() || it->second.key != key) return false;
+    analysesLru_.splice(analysesLru_.begin(), analysesLru_, it->second.use);
+    std::map<VariantKey_t, Variant>::iterator variant =
+        variants_.find(variantKey);
+    if (variant != variants_.end() && variant->second.key == key) {
+      lru_.splice(lru_.begin(), lru_, variant->second.use);
+      objects = variant->second.objects;
+      return true;
+    }
+    analysis = it->second;
+  }
+  std::size_t opIdx = 0;
+  while (opIdx < analysis.types.size() && analysis.types[opIdx] != type) {
+    ++opIdx;
+  }
+  if (opIdx == analysis.types.size() ||
+      opIdx >= analysis.data->affordances_.size()) {
+    return false;
+  }
+  // reduce without holding the lock, so that other obstacles can be
+  // processed concurrently. The analysis is kept alive by the copy.
+  affordance::SemanticsDataPtr_t data(new affordance::SemanticsData());
+  data->affordances_.push_back(analysis.data->affordances_[opIdx]);
+  objects = affordance::getReducedAffordanceObjects(
+      data, std::vector<double>(1, reduceSize))[0];
+  std::size_t nbTriangles = 0;
+  for (std::size_t objIdx = 0; objIdx < objects.size(); objIdx++) {
+    nbTriangles += affordance::GetModel(objects[objIdx].get())->num_tris;
+  }
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  // the analysis may have been replaced or erased meanwhile
+  std::map<std::string, Analysis>::const_iterator it = analyses_.find(name);
+  if (it == analyses_.end() || it->second.key != key) return true;
+  std::map<VariantKey_t, Variant>::iterator variant =
+      variants_.find(variantKey);
+  if (variant != variants_.end()) eraseVariant(variant);
+  lru_.push_front(variantKey);
+  Variant& entry = variants_[variantKey];
+  entry.key = key;
+  entry.objects = objects;
+  entry.nbTriangles = nbTriangles;
+  entry.use = lru_.begin();
+  nbTriangles_ += nbTriangles;
+  evict();
+  return true;
+}
+
+void ReductionCache::erase(const std::string& name) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  eraseAnalysis(name);
+}
+
+void ReductionCache::clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  analyses_.clear();
+  analysesLru_.clear();
+  variants_.clear();
+  lru_.clear();
+  nbTriangles_ = 0;
+}
+
+void ReductionCache::evict() {
+  while (nbTriangles_ > maxTriangles_ && !lru_.empty()) {
+    eraseVariant(variants_.find(lru_.back()));
+  }
+  while (nbTriangles_ > maxTriangles_ && !analysesLru_.empty()) {
+    eraseAnalysis(analysesLru_.back());
+  }
+}
+
+void ReductionCache::eraseAnalysis(const std::string& name) {
+  std::map<std::string, Analysis>::iterator analysis = analyses_.find(name);
+  if (analysis != analyses_.end()) {
+    nbTriangles_ -= analysis->second.nbTriangles;
+    analysesLru_.erase(analysis->second.use);
+    analyses_.erase(analysis);
+  }
+  std::map<VariantKey_t, Variant>::iterator variant =
+      variants_.lower_bound(VariantKey_t(
+          name, std::string(), -std::numeric_limits<double>::infinity()));
+  while (variant != variants_.end() && std::get<0>(variant->first) == name) {
+    eraseVariant(variant++);
+  }
+}
+
+void ReductionCache::eraseVariant(
+    std::map<VariantKey_t, Variant>::iterator variant) {
+  nbTriangles_ -= variant->second.nbTriangles;
+  lru_.erase(variant->second.use);
+  variants_.erase(variant);
+}
+}  // namespace affordanceCorba
+}  // namespace hpp
@@ -0,0 +1,133 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_REDUCTION_CACHE_HH
+#define HPP_AFFORDANCE_CORBA_REDUCTION_CACHE_HH
+
+#include <coal/collision_object.h>
+#include <stdint.h>
+
+#include <hpp/affordance/fwd.hh>
+#include <list>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <tuple>
+#include <vector>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Unreduced affordance analyses of the obstacles and their reductions.
+///
+/// The unreduced analysis of an obstacle is stored when its affordance
+/// objects are registered, and the affordance objects of each type reduced
+/// by a given size are computed from it on demand. Analyses and reduced
+/// objects are kept until their total number of triangles exceeds a limit,
+/// the least recently used reduced objects being evicted first, then the
+/// least recently used analyses. Methods can be called concurrently.
+class ReductionCache {
+ public:
+  /// \param maxTriangles maximal total number of triangles of the analyses
+  ///        and reduced affordance objects kept.
+  explicit ReductionCache(std::size_t maxTriangles = 1000000);
+
+  void setMaxTriangles(std::size_t maxTriangles);
+
+  /// Store the unreduced analysis of an obstacle, replacing the previous
+  /// one and its reductions.
+  ///
+  /// \param name name of the obstacle,
+  /// \param key fingerprint of the analysis, see fingerprint,
+  /// \param types affordance type of each operation of the analysis,
+  /// \param object collision object the analysis refers to, kept with it so
+  ///        that the analysis does not depend on the lifetime of the
+  ///        obstacle,
+  /// \param data unreduced analysis.
+  void store(const std::string& name, uint64_t key,
+             const std::vector<std::string>& types,
+             const std::shared_ptr<const coal::CollisionObject>& object,
+             const affordance::SemanticsDataPtr_t& data);
+
+  /// Move the analysis of an obstacle that was moved without being
+  /// analysed again.
+  ///
+  /// The reductions of the analysis are forgotten.
+  /// \param key, newKey fingerprint of the analysis before and after the
+  ///        motion, nothing is done if the stored analysis has another
+  ///        fingerprint than key,
+  /// \param pose new global pose of the obstacle.
+  void move(const std::string& name, uint64_t key, uint64_t newKey,
+            const coal::Transform3s& pose);
+
+  /// Get the affordance objects of an obstacle for a type, reduced by a
+  /// size.
+  ///
+  /// \param name name of the obstacle,
+  /// \param key fingerprint of the analysis of the obstacle,
+  /// \param type affordance type,
+  /// \param reduceSize size by which the affordance objects are reduced, see
+  ///        affordance::getReducedAffordanceObjects.
+  /// \retval objects reduced affordance objects.
+  /// \return false if no analysis of the obstacle with this fingerprint is
+  ///         stored, or if it has no operation of this type.
+  bool get(const std::string& name, uint64_t key, const std::string& type,
+           double reduceSize, affordance::CollisionObjects_t& objects);
+
+  /// Forget the analysis of an obstacle and its reductions.
+  void erase(const std::string& name);
+
+  void clear();
+
+ private:
+  struct Analysis {
+    uint64_t key;
+    std::vector<std::string> types;
+    std::shared_ptr<const coal::CollisionObject> object;
+    affordance::SemanticsDataPtr_t data;
+    std::size_t nbTriangles;
+    /// position in analysesLru_.
+    std::list<std::string>::iterator use;
+  };  // struct Analysis
+
+  /// obstacle name, affordance type and reduce size.
+  typedef std::tuple<std::string, std::string, double> VariantKey_t;
+
+  struct Variant {
+    uint64_t key;
+    affordance::CollisionObjects_t objects;
+    std::size_t nbTriangles;
+    /// position in lru_.
+    std::list<VariantKey_t>::iterator use;
+  };  // struct Variant
+
+  /// Remove least recently used variants, then analyses, until the limit is
+  /// respected.
+  void evict();
+
+  /// Forget an analysis and its variants.
+  void eraseAnalysis(const std::string& name);
+
+  void eraseVariant(std::map<VariantKey_t, Variant>::iterator variant);
+
+  std::size_t maxTriangles_;
+  std::size_t nbTriangles_;
+  std::map<std::string, Analysis> analyses_;
+  /// names of the analysed obstacles, most recently used first.
+  std::list<std::string> analysesLru_;
+  std::map<VariantKey_t, Variant> variants_;
+  /// keys of the variants, most recently used first.
+  std::list<VariantKey_t> lru_;
+  std::mutex mutex_;
+};  // class ReductionCache
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_REDUCTION_CACHE_HH
@@ -0,0 +1,132 @@
+// Copyright (C) 2026 CNRS
+//
+// This file is part of the hpp-affordance-corba.
+//
+// This software is provided "as is" without warranty of any kind,
+// either expressed or implied, including but not limited to the
+// implied warranties of fitness for a particular purpose.
+//
+// See the COPYING file for more information.
+
+#ifndef HPP_AFFORDANCE_CORBA_STATISTICS_HH
+#define HPP_AFFORDANCE_CORBA_STATISTICS_HH
+
+#include <stdint.h>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <mutex>
+
+namespace hpp {
+namespace affordanceCorba {
+/// Timers and counters of the stages of the affordance analysis.
+///
+/// Disabled by default. When disabled, recording a stage costs one atomic
+/// read. Methods can be called concurrently.
+class Statistics {
+ public:
+  enum Stage {
+    CreateOperations,
+    /// preprocessing of the obstacle meshes, see MeshCache.
+    Preprocessing,
+    /// classification and region growing.
+    Analysis,
+    /// computation of the reduced affordance objects.
+    Reduction,
+    /// registration of the affordance objects in the problem solver.
+    Registration,
+    /// conversion of the affordance objects to CORBA types.
+    Marshalling,
+    NbStages
+  };
+
+  struct Counters {
+    Counters() : calls(0), time(0), maxTime(0), triangles(0), objects(0) {}
+
+    uint64_t calls;
+    /// total and maximal duration of a call, in seconds.
+    double time;
+    double maxTime;
+    /// number of triangles and affordance objects processed.
+    uint64_t triangles;
+    uint64_t objects;
+  };  // struct Counters
+
+  Statistics() : enabled_(false) {}
+
+  static const char* name(Stage stage) {
+    static const char* names[NbStages] = {"createOperations", "preprocessing",
+                                          "analysis",         "reduction",
+                                          "registration",     "marshalling"};
+    return names[stage];
+  }
+
+  bool enabled() const { return enabled_; }
+
+  void setEnabled(bool enabled) { enabled_ = enabled; }
+
+  /// Record a call to a stage.
+  void add(Stage stage, double duration, uint64_t triangles, uint64_t objects) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    Counters& counters = counters_[stage];
+    ++counters.calls;
+    counters.time += duration;
+    counters.maxTime = std::max(counters.maxTime, duration);
+    counters.triangles += triangles;
+    counters.objects += objects;
+  }
+
+  Counters get(Stage stage) const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return counters_[stage];
+  }
+
+  void reset() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    for (int stage = 0; stage < NbStages; ++stage) {
+      counters_[stage] = Counters();
+    }
+  }
+
+ private:
+  std::atomic<bool> enabled_;
+  mutable std::mutex mutex_;
+  Counters counters_[NbStages];
+};  // class Statistics
+
+/// Record the duration of a scope in statistics, if enabled.
+class StageTimer {
+ public:
+  StageTimer(Statistics& statistics, Statistics::Stage stage)
+      : statistics_(statistics),
+        stage_(stage),
+        enabled_(statistics.enabled()),
+        triangles_(0),
+        objects_(0) {
+    if (enabled_) start_ = std::chrono::steady_clock::now();
+  }
+
+  ~StageTimer() {
+    if (!enabled_) return;
+    const std::chrono::duration<double> duration =
+        std::chrono::steady_clock::now() - start_;
+    statistics_.add(stage_, duration.count(), triangles_, objects_);
+  }
+
+  void addTriangles(uint64_t triangles) { triangles_ += triangles; }
+
+  void addObjects(uint64_t objects) { objects_ += objects; }
+
+ private:
+  Statistics& statistics_;
+  Statistics::Stage stage_;
+  bool enabled_;
+  uint64_t triangles_;
+  uint64_t objects_;
+  std::chrono::steady_clock::time_point start_;
+};  // class StageTimer
+}  // namespace affordanceCorba
+}  // namespace hpp
+
+#endif  // HPP_AFFORDANCE_CORBA_STATISTICS_HH
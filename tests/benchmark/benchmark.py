@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 CNRS
+#
+# This file is part of hpp-affordance-corba.
+# hpp-affordance-corba is free software: you can redistribute it
+# and/or modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either version
+# 3 of the License, or (at your option) any later version.
+#
+# hpp-affordance-corba is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Lesser Public License for more details.  You should have
+# received a copy of the GNU Lesser General Public License along with
+# hpp-affordance-corba.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""
+Headless benchmark of the affordance analysis on synthetic terrains.
+
+For each terrain and size, a terrain is generated (see terrain.py), loaded in
+an hppcorbaserver with the affordance-corba plugin, and the following
+operations are timed: analyseObject, analyseAll, getAffordancePoints,
+getAffordancePointsPacked, getAffordancePolygons, visualisation by
+AffordanceTool in a stub viewer, deleteAffordancesByType and
+deleteAffordances. Results are written in JSON.
+
+By default, a new hppcorbaserver is started for each terrain, so that
+analyseAll only analyses that terrain. With --no-server, the benchmark
+connects to a running server instead, on which terrains accumulate.
+
+Example:
+    python benchmark.py --terrains stairs heightfield --sizes 1000 100000 \\
+        --repeat 5 --output results.json
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import terrain
+
+affordanceTypes = ["Support", "Lean", "Support45"]
+
+
+class StubGui:
+    """
+    \\brief Stand-in for the gepetto-viewer client, keeping track of groups.
+
+     Calls are counted by method name; triangles sent to the viewer are
+     counted in nbTriangles.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.calls = {}
+        self.nbTriangles = 0
+
+    def _count(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def createGroup(self, name):
+        self._count("createGroup")
+        self.groups.setdefault(name, [])
+        return True
+
+    def addToGroup(self, name, group):
+        self._count("addToGroup")
+        self.groups.setdefault(group, []).append(name)
+        return True
+
+    def removeFromGroup(self, name, group):
+        self._count("removeFromGroup")
+        if name in self.groups.get(group, []):
+            self.groups[group].remove(name)
+        return True
+
+    def getGroupNodeList(self, group):
+        self._count("getGroupNodeList")
+        return list(self.groups.get(group, []))
+
+    def deleteNode(self, name, all):
+        self._count("deleteNode")
+        self.groups.pop(name, None)
+        for nodes in self.groups.values():
+            if name in nodes:
+                nodes.remove(name)
+        return True
+
+    def addTriangleFace(self, name, p1, p2, p3, colour):
+        self._count("addTriangleFace")
+        self.nbTriangles += 1
+        return True
+
+    def addCurve(self, name, points, colour):
+        self._count("addCurve")
+        self.nbTriangles += len(points) // 3
+        return True
+
+    def __getattr__(self, method):
+        # any other method of the viewer is accepted and only counted
+        def call(*args):
+            self._count(method)
+            return True
+
+        return call
+
+
+class StubViewer:
+    """
+    \\brief Stand-in for hpp.gepetto.Viewer, as used by AffordanceTool.
+    """
+
+    sceneName = "hpp_"
+
+    def __init__(self):
+        gui = StubGui()
+        gui.groups[self.sceneName] = []
+        self.client = type("StubClient", (), {})()
+        self.client.gui = gui
+
+
+def timeit(function, repeat, setup=None):
+    """
+    \\brief Call function repeat times and return its durations in seconds.
+
+     \\param setup function called before each call, not timed.
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min": min(durations),
+        "mean": sum(durations) / repeat,
+        "max": max(durations),
+    }
+
+
+class Server:
+    """
+    \\brief hppcorbaserver started for the benchmark, or a running one.
+    """
+
+    def __init__(self, command, port, timeout):
+        self.process = None
+        if command is not None:
+            self.process = subprocess.Popen(
+                command.split(),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        connected = False
+        try:
+            self.basic, self.afftool = self._connect(port, timeout)
+            connected = True
+        finally:
+            if not connected:
+                self.close()
+
+    def _connect(self, port, timeout):
+        from hpp.corbaserver.client import Client as BasicClient
+        from hpp_idl.hpp import Error
+        from omniORB import CORBA
+
+        deadline = time.time() + timeout
+        while True:
+            try:
+                basic = BasicClient(port=port)
+                basic.problem.loadServerPlugin("corbaserver", "affordance-corba.so")
+                from hpp.corbaserver.affordance.affordance import AffordanceTool
+
+                return basic, AffordanceTool(port=port)
+            except (CORBA.Exception, Error):
+                if self.process is not None and self.process.poll() is not None:
+                    raise RuntimeError("hppcorbaserver exited") from None
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+
+def benchmarkTerrain(server, name, size, triangles, prefix, directory, args):
+    """
+    \\brief Load a terrain in the server and time the affordance operations.
+    """
+    from hpp_idl.hpp import Error
+
+    afftool = server.afftool
+    client = afftool.client.affordance.affordance
+    meshFilename = os.path.join(directory, prefix + ".stl")
+    urdfFilename = os.path.join(directory, prefix + ".urdf")
+    terrain.writeStl(meshFilename, triangles)
+    with open(urdfFilename, "w") as f:
+        f.write(terrain.urdf(prefix, meshFilename))
+    start = time.perf_counter()
+    server.basic.obstacle.loadObstacleModel(urdfFilename, prefix)
+    loadTime = time.perf_counter() - start
+    obstacle = prefix + "/base_link_0"
+
+    result = {
+        "terrain": name,
+        "size": size,
+        "triangles": len(triangles),
+        "loadObstacle": loadTime,
+        "timings": {},
+    }
+    timings = result["timings"]
+
+    def clear():
+        client.deleteAffordances("")
+
+    afftool.setStatisticsEnabled(True)
+    afftool.resetStatistics()
+    timings["analyseObject"] = timeit(
+        lambda: afftool.analyseObject(obstacle, []), args.repeat, clear
+    )
+    timings["analyseAll"] = timeit(lambda: afftool.analyseAll(), args.repeat, clear)
+    result["statistics"] = afftool.getStatistics()
+    afftool.setStatisticsEnabled(False)
+
+    result["affordances"] = {}
+    for affType in affordanceTypes:
+        try:
+            names = afftool.getAffRefObstacles(affType)
+        except Error:
+            names = []
+        result["affordances"][affType] = len(names)
+    presentTypes = [t for t in affordanceTypes if result["affordances"][t]]
+
+    for affType in presentTypes:
+        timings["getAffordancePoints." + affType] = timeit(
+            lambda t=affType: client.getAffordancePoints(t), args.repeat
+        )
+        # the query cache is cleared so that each call reaches the server
+        timings["getAffordancePointsPacked." + affType] = timeit(
+            lambda t=affType: afftool.getAffordancePointsPacked(t),
+            args.repeat,
+            afftool.clearQueryCache,
+        )
+        timings["getAffordancePolygons." + affType] = timeit(
+            lambda t=affType: afftool.getAffordancePolygons(t, args.tolerance),
+            args.repeat,
+            afftool.clearQueryCache,
+        )
+
+    # the points are requested from the server each time, as after an
+    # analysis
+    viewer = StubViewer()
+    modes = ["object", "type", "polygon"]
+    if args.triangleMode:
+        modes.append("triangle")
+    for mode in modes:
+        timings["visualiseAllAffordances." + mode] = timeit(
+            lambda m=mode: [
+                afftool.visualiseAllAffordances(t, viewer, [0, 1, 0], m, args.tolerance)
+                for t in presentTypes
+            ],
+            args.repeat,
+            afftool.clearQueryCache,
+        )
+    result["viewerCalls"] = viewer.client.gui.calls
+
+    def analyseAndShow():
+        afftool.analyseObject(obstacle, [])
+        for affType in presentTypes:
+            afftool.visualiseAffordances(
+                affType, viewer, [0, 1, 0], obstacle, mode="object"
+            )
+
+    timings["deleteAffordancesByType"] = timeit(
+        lambda: [
+            afftool.deleteAffordancesByType(t, viewer, obstacle) for t in presentTypes
+        ],
+        args.repeat,
+        analyseAndShow,
+    )
+    timings["deleteAffordances"] = timeit(
+        lambda: afftool.deleteAffordances(viewer, obstacle),
+        args.repeat,
+        analyseAndShow,
+    )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--terrains",
+        nargs="+",
+        choices=sorted(terrain.terrains),
+        default=sorted(terrain.terrains),
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1000, 10000, 100000],
+        help="requested numbers of triangles of the terrains",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=13331)
+    parser.add_argument(
+        "--server",
+        default="hppcorbaserver",
+        help="command starting the server, run once per terrain",
+    )
+    parser.add_argument(
+        "--no-server",
+        dest="startServer",
+        action="store_false",
+        help="connect to a running server instead of starting one",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument(
+        "--threads", type=int, default=1, help="see AffordanceTool.setNumberOfThreads"
+    )
+    parser.add_argument(
+        "--triangle-mode",
+        dest="triangleMode",
+        action="store_true",
+        help='also time visualisation in "triangle" mode, one call per triangle',
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="simplification tolerance of getAffordancePolygons",
+    )
+    parser.add_argument("--output", help="JSON output file, standard output if not set")
+    args = parser.parse_args(argv)
+
+    report = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "arguments": dict(vars(args)),
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        for name in args.terrains:
+            generator = terrain.terrains[name]
+            # deterministic terrains take no seed
+            options = {}
+            if "seed" in inspect.signature(generator).parameters:
+                options["seed"] = args.seed
+            for size in args.sizes:
+                if server is None or args.startServer:
+                    server = Server(
+                        args.server if args.startServer else None,
+                        args.port,
+                        args.timeout,
+                    )
+                    server.afftool.setNumberOfThreads(args.threads)
+                try:
+                    start = time.perf_counter()
+                    triangles = generator(size, **options)
+                    generation = time.perf_counter() - start
+                    prefix = f"bench_{name}_{size}_{os.getpid()}"
+                    result = benchmarkTerrain(
+                        server, name, size, triangles, prefix, directory, args
+                    )
+                    result["generation"] = generation
+                    report["results"].append(result)
+                    print(
+                        f"{name} {len(triangles)} triangles: analyseObject "
+                        f"{result['timings']['analyseObject']['mean']:.3f} s",
+                        file=sys.stderr,
+                    )
+                finally:
+                    if args.startServer:
+                        server.close()
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
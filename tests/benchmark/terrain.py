@@ -0,0 +1,205 @@
+# Copyright (c) 2026 CNRS
+#
+# This file is part of hpp-affordance-corba.
+# hpp-affordance-corba is free software: you can redistribute it
+# and/or modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either version
+# 3 of the License, or (at your option) any later version.
+#
+# hpp-affordance-corba is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Lesser Public License for more details.  You should have
+# received a copy of the GNU Lesser General Public License along with
+# hpp-affordance-corba.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""
+Synthetic terrains for benchmarking the affordance analysis.
+
+Each generator returns the triangles of a terrain in an array of shape
+(nbTriangles, 3, 3), the vertices of which are ordered so that normals point
+out of the surfaces. The number of triangles is close to the requested one,
+within about 15% for the smallest terrains.
+"""
+
+import numpy as np
+
+
+def grid(origin, u, v, nu, nv):
+    """
+    \\brief Triangulate the parallelogram spanned by u and v from origin.
+
+     \\param nu, nv number of cells along u and v.
+     \\return 2 * nu * nv triangles with normal along u x v.
+    """
+    origin, u, v = (np.asarray(x, dtype=float) for x in (origin, u, v))
+    i, j = np.meshgrid(np.arange(nu), np.arange(nv), indexing="ij")
+    i, j = i.ravel()[:, None], j.ravel()[:, None]
+    p00 = origin + (i / nu) * u + (j / nv) * v
+    p10 = p00 + u / nu
+    p01 = p00 + v / nv
+    p11 = p10 + v / nv
+    return np.concatenate(
+        [np.stack([p00, p10, p11], axis=1), np.stack([p00, p11, p01], axis=1)]
+    )
+
+
+def box(halfExtents, resolution=1):
+    """
+    \\brief Triangulate the faces of a box centred at the origin.
+
+     \\param halfExtents half sizes of the box along x, y and z,
+     \\param resolution number of cells along each edge of a face.
+     \\return 12 * resolution ** 2 triangles with outward normals.
+    """
+    hx, hy, hz = halfExtents
+    x, y, z = (
+        np.array([2 * hx, 0, 0]),
+        np.array([0, 2 * hy, 0]),
+        np.array([0, 0, 2 * hz]),
+    )
+    faces = [
+        ((-hx, -hy, hz), x, y),
+        ((-hx, -hy, -hz), y, x),
+        ((hx, -hy, -hz), y, z),
+        ((-hx, -hy, -hz), z, y),
+        ((-hx, hy, -hz), z, x),
+        ((-hx, -hy, -hz), x, z),
+    ]
+    return np.concatenate([grid(o, u, v, resolution, resolution) for o, u, v in faces])
+
+
+def randomRotation(rng, maxAngle):
+    """
+    \\brief Rotation matrix of random axis and angle in [-maxAngle, maxAngle].
+    """
+    axis = rng.normal(size=3)
+    axis /= np.linalg.norm(axis)
+    angle = rng.uniform(-maxAngle, maxAngle)
+    K = np.array(
+        [[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]]
+    )
+    return np.eye(3) + np.sin(angle) * K + (1 - np.cos(angle)) * K @ K
+
+
+def stairs(nbTriangles, nbSteps=10, rise=0.15, run=0.3, width=2.0):
+    """
+    \\brief Straight staircase going up along x.
+
+     Treads and risers are subdivided so that the staircase has about
+     nbTriangles triangles.
+    """
+    # a step has a tread of r * r cells and a riser of 1 * r cells
+    r = max(1, round((-1 + np.sqrt(1 + 2 * nbTriangles / nbSteps)) / 2))
+    steps = []
+    for s in range(nbSteps):
+        steps.append(
+            grid((s * run, 0, (s + 1) * rise), (run, 0, 0), (0, width, 0), r, r)
+        )
+        steps.append(grid((s * run, 0, s * rise), (0, 0, rise), (0, width, 0), 1, r))
+    return np.concatenate(steps)
+
+
+def heightField(nbTriangles, size=10.0, amplitude=0.3, seed=0):
+    """
+    \\brief Smooth random terrain of given size, sampled on a regular grid.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(1, round(np.sqrt(nbTriangles / 2)))
+    tris = grid((0, 0, 0), (size, 0, 0), (0, size, 0), n, n)
+    # sum of a few random waves
+    height = np.zeros(tris.shape[:2])
+    for _ in range(6):
+        k = rng.normal(scale=2 * np.pi / size * 2, size=2)
+        phase = rng.uniform(0, 2 * np.pi)
+        height += np.sin(tris[:, :, 0] * k[0] + tris[:, :, 1] * k[1] + phase)
+    tris[:, :, 2] = amplitude / 3 * height
+    return tris
+
+
+def boxes(nbTriangles, nbBoxes=50, size=10.0, seed=0):
+    """
+    \\brief Axis-aligned boxes of random sizes standing on the ground.
+
+     The faces of the boxes are subdivided so that the terrain has about
+     nbTriangles triangles. Small terrains have more than nbBoxes boxes.
+    """
+    rng = np.random.default_rng(seed)
+    resolution = max(1, round(np.sqrt(nbTriangles / (12 * nbBoxes))))
+    # use more boxes if their faces cannot be subdivided less
+    nbBoxes = max(1, round(nbTriangles / (12 * resolution**2)))
+    result = []
+    for _ in range(nbBoxes):
+        halfExtents = rng.uniform([0.1, 0.1, 0.05], [0.6, 0.6, 0.5])
+        centre = np.array([rng.uniform(0, size), rng.uniform(0, size), halfExtents[2]])
+        result.append(box(halfExtents, resolution) + centre)
+    return np.concatenate(result)
+
+
+def rubble(nbTriangles, size=5.0, seed=0):
+    """
+    \\brief Heap of small boxes with random orientations.
+
+     Each piece is a box of 12 triangles, tilted by up to 30 degrees, so that
+     the terrain has many small surfaces of various orientations.
+    """
+    rng = np.random.default_rng(seed)
+    nbPieces = max(1, nbTriangles // 12)
+    piece = box((0.5, 0.5, 0.5))
+    result = np.empty((nbPieces, *piece.shape))
+    for idx in range(nbPieces):
+        scale = rng.uniform([0.05, 0.05, 0.02], [0.25, 0.25, 0.1])
+        centre = np.array(
+            [rng.uniform(0, size), rng.uniform(0, size), rng.uniform(0, 0.3)]
+        )
+        R = randomRotation(rng, np.pi / 6)
+        result[idx] = (piece * scale) @ R.T + centre
+    return result.reshape(-1, 3, 3)
+
+
+terrains = {
+    "stairs": stairs,
+    "rubble": rubble,
+    "heightfield": heightField,
+    "boxes": boxes,
+}
+
+
+def writeStl(filename, triangles):
+    """
+    \\brief Write triangles in a binary STL file.
+    """
+    triangles = np.asarray(triangles, dtype=float)
+    normals = np.cross(
+        triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    )
+    norms = np.linalg.norm(normals, axis=1)[:, None]
+    normals = np.divide(normals, norms, out=np.zeros_like(normals), where=norms > 0)
+    records = np.zeros(
+        len(triangles),
+        dtype=[("normal", "<f4", 3), ("vertices", "<f4", 9), ("attribute", "<u2")],
+    )
+    records["normal"] = normals
+    records["vertices"] = triangles.reshape(-1, 9)
+    with open(filename, "wb") as f:
+        f.write(b"hpp-affordance-corba benchmark terrain".ljust(80, b" "))
+        f.write(np.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+
+def urdf(name, meshFilename):
+    """
+    \\brief URDF model of a single link, the geometry of which is a mesh.
+
+     Once loaded with prefix p, the obstacle is named "p/base_link_0".
+    """
+    geometry = f'<geometry><mesh filename="{meshFilename}"/></geometry>'
+    return (
+        f'<robot name="{name}">\n'
+        '  <link name="base_link">\n'
+        f"    <visual>{geometry}</visual>\n"
+        f"    <collision>{geometry}</collision>\n"
+        "  </link>\n"
+        "</robot>\n"
+    )
@@ -67,3 +67,10 @@ afftool.deleteAffordances(r)
 afftool.setMargin("Support", 0.0681487)
 afftool.analyseAll()
 afftool.visualiseAffordances("Support", r, SupportColour)
+# To compare several configurations, they can also be evaluated in a single
+# call, without modifying the affordance objects found above. A summary of
+# the affordance objects found with each configuration is returned.
+for summary in afftool.sweepAffordanceConfig(
+    "Support", [[0.3, 0.3, 0.05], [0.3, 0.3, 0.1], [0.0681487, 0.3, 0.05]]
+):
+    print(summary["config"], summary["nbObjects"], summary["area"])